@@ -0,0 +1,239 @@
+import logging                    # Import logging to report records dropped by the size limits
+import sys                        # Import sys for command line arguments
+import time                       # Import time to expire alerts and vehicle positions
+import zlib                       # Import zlib for crc32, to recognise alerts that did not change
+
+import gtfs_realtime_pb2
+
+logger = logging.getLogger(__name__)
+
+MAX_ALERTS = 512                  # alerts kept over all feeds
+MAX_VEHICLES = 4096               # vehicle positions kept over all feeds
+MAX_INFORMED = 64                 # routes/stops kept per alert
+MAX_TEXT = 280                    # characters kept of an alert's header text
+VEHICLE_MAX_AGE = 300             # seconds after which a vehicle position is no longer shown
+
+EFFECT_NAMES = {value: name for name, value in gtfs_realtime_pb2.Alert.Effect.items()}
+
+
+def alert_text(translated, language='en'):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   alert_text
+    #   Input:      translated (TranslatedString) – e.g. alert.header_text
+    #               language (str)                – preferred language
+    #   Output:     str                           – the plain-text translation in that language (NYCT also sends
+    #                                               'en-html'), else the first one, cut to MAX_TEXT characters
+    # -----------------------------------------------------------------------------------------------------------------
+    fallback = ''
+    for translation in translated.translation:
+        if translation.language in (language, ''):
+            return translation.text[:MAX_TEXT]
+        fallback = fallback or translation.text
+    return fallback[:MAX_TEXT]
+
+
+class AlertRecord:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      AlertRecord
+    #   Input:      entity_id (str), feed_name (str), header (str), effect (str),
+    #               periods (tuple[(int, int)]) – active periods, 0 meaning open-ended
+    #               routes, stops (tuple[str])  – informed route_ids and stop_ids
+    #               checksum (int)              – crc32 of the encoded alert, to skip re-extraction
+    #   Output:     One service alert, reduced to what the display shows
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('entity_id', 'feed_name', 'header', 'effect', 'periods', 'routes', 'stops', 'checksum')
+
+    def __init__(self, entity_id, feed_name, header, effect, periods, routes, stops, checksum):
+        self.entity_id = entity_id
+        self.feed_name = feed_name
+        self.header = header
+        self.effect = effect
+        self.periods = periods
+        self.routes = routes
+        self.stops = stops
+        self.checksum = checksum
+
+    def is_active(self, now):
+        # No period means always active
+        return not self.periods or any((not start or start <= now) and (not end or now < end)
+                                       for start, end in self.periods)
+
+    def has_ended(self, now):
+        return bool(self.periods) and all(end and end <= now for _, end in self.periods)
+
+
+class VehicleRecord:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      VehicleRecord
+    #   Input:      entity_id, feed_name, trip_id, route_id, stop_id (str)
+    #               status (int)        – VehiclePosition.current_status (INCOMING_AT, STOPPED_AT, IN_TRANSIT_TO)
+    #               stop_sequence (int) – current_stop_sequence
+    #               timestamp (int)     – POSIX time of the position
+    #   Output:     Where one train is
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('entity_id', 'feed_name', 'trip_id', 'route_id', 'stop_id', 'status', 'stop_sequence', 'timestamp')
+
+    def __init__(self, entity_id, feed_name, trip_id, route_id, stop_id, status, stop_sequence, timestamp):
+        self.entity_id = entity_id
+        self.feed_name = feed_name
+        self.trip_id = trip_id
+        self.route_id = route_id
+        self.stop_id = stop_id
+        self.status = status
+        self.stop_sequence = stop_sequence
+        self.timestamp = timestamp
+
+
+class ServiceInfo:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ServiceInfo
+    #   Input:      alerts (list[AlertRecord]), vehicles (list[VehicleRecord])
+    #   Output:     An immutable view of the alerts and vehicle positions of one refresh, indexed by route and stop
+    #   Description: Built by ServiceInfoBuilder and published with each ArrivalSnapshot, so it is read the same
+    #                lock-free way. Alerts are filtered by their active periods at query time.
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('alerts', 'vehicles', 'alerts_by_route', 'alerts_by_stop', 'vehicles_by_route', 'vehicles_by_stop')
+
+    def __init__(self, alerts=(), vehicles=()):
+        self.alerts = tuple(alerts)
+        self.vehicles = tuple(vehicles)
+        self.alerts_by_route = {}
+        self.alerts_by_stop = {}
+        for alert in self.alerts:
+            for route_id in alert.routes:
+                self.alerts_by_route.setdefault(route_id, []).append(alert)
+            for stop_id in alert.stops:
+                self.alerts_by_stop.setdefault(stop_id, []).append(alert)
+        self.vehicles_by_route = {}
+        self.vehicles_by_stop = {}
+        for vehicle in self.vehicles:
+            self.vehicles_by_route.setdefault(vehicle.route_id, []).append(vehicle)
+            self.vehicles_by_stop.setdefault(vehicle.stop_id, []).append(vehicle)
+
+    def alerts_for(self, route_ids=(), stop_ids=(), now=None):
+        # Active alerts informing any of the routes or stops, each once, in feed order
+        now = time.time() if now is None else now
+        found = {}
+        for route_id in route_ids:
+            for alert in self.alerts_by_route.get(route_id, ()):
+                found.setdefault(alert.entity_id, alert)
+        for stop_id in stop_ids:
+            for alert in self.alerts_by_stop.get(stop_id, ()):
+                found.setdefault(alert.entity_id, alert)
+        return [alert for alert in found.values() if alert.is_active(now)]
+
+    def vehicles_on(self, route_id, now=None, max_age=VEHICLE_MAX_AGE):
+        now = time.time() if now is None else now
+        return [vehicle for vehicle in self.vehicles_by_route.get(route_id, ()) if now - vehicle.timestamp <= max_age]
+
+    def vehicles_at(self, stop_id, now=None, max_age=VEHICLE_MAX_AGE):
+        now = time.time() if now is None else now
+        return [vehicle for vehicle in self.vehicles_by_stop.get(stop_id, ()) if now - vehicle.timestamp <= max_age]
+
+
+class ServiceInfoBuilder:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ServiceInfoBuilder
+    #   Input:      max_alerts (int)    – alerts kept over all feeds
+    #               max_vehicles (int)  – vehicle positions kept over all feeds
+    #   Output:     Turns feed refreshes into ServiceInfo views
+    #   Description: update() makes one streaming pass over a feed's entities and looks only at alert and vehicle
+    #                entities. Records are keyed by (feed, entity id): an alert whose encoded bytes did not change
+    #                since the last refresh keeps its record instead of being extracted again, and an entity that
+    #                is gone from the feed is dropped with it. Alerts whose active periods have all ended are
+    #                expired. Memory is bounded whatever the feed size: at most max_alerts and max_vehicles
+    #                records, MAX_INFORMED routes/stops and MAX_TEXT characters per alert; anything beyond that
+    #                is counted in `dropped` and skipped.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, max_alerts=MAX_ALERTS, max_vehicles=MAX_VEHICLES):
+        self.max_alerts = max_alerts
+        self.max_vehicles = max_vehicles
+        self.alerts = {}      # (feed name, entity id) -> AlertRecord
+        self.vehicles = {}    # (feed name, entity id) -> VehicleRecord
+        self.extracted = 0
+        self.dropped = 0
+        self._warned = set()
+
+    def update(self, feed_name, feed, now=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   update
+        #   Input:      feed_name (str)                       – which feed refreshed
+        #               feed (gtfs_realtime_pb2.FeedMessage)  – its new contents
+        #               now (float)                           – POSIX time (default: now)
+        #   Output:     ServiceInfo                           – alerts and vehicles of every feed
+        # -------------------------------------------------------------------------------------------------------------
+        now = time.time() if now is None else now
+        previous_alerts = {key: alert for key, alert in self.alerts.items() if key[0] == feed_name}
+        previous_vehicles = {key: vehicle for key, vehicle in self.vehicles.items() if key[0] == feed_name}
+        for key in previous_alerts:
+            del self.alerts[key]
+        for key in previous_vehicles:
+            del self.vehicles[key]
+
+        dropped = 0
+        for entity in feed.entity:
+            if entity.is_deleted:
+                continue
+            if entity.HasField('alert'):
+                key = (feed_name, entity.id)
+                if len(self.alerts) >= self.max_alerts:
+                    dropped += 1
+                    continue
+                checksum = zlib.crc32(entity.alert.SerializeToString())
+                alert = previous_alerts.get(key)
+                if alert is None or alert.checksum != checksum:
+                    alert = self._alert_record(feed_name, entity, checksum)
+                if not alert.has_ended(now):
+                    self.alerts[key] = alert
+            elif entity.HasField('vehicle'):
+                if len(self.vehicles) >= self.max_vehicles:
+                    dropped += 1
+                    continue
+                position = entity.vehicle
+                if position.timestamp and now - position.timestamp > VEHICLE_MAX_AGE:
+                    continue
+                key = (feed_name, entity.id)
+                vehicle = previous_vehicles.get(key)
+                if (vehicle is None or vehicle.timestamp != position.timestamp or vehicle.stop_id != position.stop_id
+                        or vehicle.trip_id != position.trip.trip_id):
+                    vehicle = VehicleRecord(entity.id, feed_name, position.trip.trip_id, position.trip.route_id,
+                                            position.stop_id, position.current_status,
+                                            position.current_stop_sequence, position.timestamp or int(now))
+                self.vehicles[key] = vehicle
+        if dropped:
+            # Warn once per feed; a feed that is over the limits usually stays over them
+            log = logger.debug if feed_name in self._warned else logger.warning
+            log("Feed %s: %d alert/vehicle entities over the size limits were skipped", feed_name, dropped)
+            self._warned.add(feed_name)
+            self.dropped += dropped
+
+        # Alerts of other feeds may have ended since their last refresh
+        for key in [key for key, alert in self.alerts.items() if alert.has_ended(now)]:
+            del self.alerts[key]
+        return ServiceInfo(self.alerts.values(), self.vehicles.values())
+
+    def _alert_record(self, feed_name, entity, checksum):
+        alert = entity.alert
+        self.extracted += 1
+        routes, stops = [], []
+        for informed in alert.informed_entity[:MAX_INFORMED]:
+            route_id = informed.route_id or informed.trip.route_id
+            if route_id and route_id not in routes:
+                routes.append(route_id)
+            if informed.stop_id and informed.stop_id not in stops:
+                stops.append(informed.stop_id)
+        periods = tuple((period.start, period.end) for period in alert.active_period[:MAX_INFORMED])
+        return AlertRecord(entity.id, feed_name, alert_text(alert.header_text), EFFECT_NAMES.get(alert.effect, ''),
+                           periods, tuple(routes), tuple(stops), checksum)
+
+
+if __name__ == "__main__":
+    # Usage: python alerts.py <feed.pb> [route_id ...]
+    from core import parse_feed
+
+    with open(sys.argv[1], 'rb') as f:
+        info = ServiceInfoBuilder().update('feed', parse_feed(f.read()))
+    route_ids = sys.argv[2:] or sorted(info.alerts_by_route)
+    print(f"{len(info.alerts)} alerts, {len(info.vehicles)} vehicle positions")
+    for alert in info.alerts_for(route_ids):
+        print(f"[{', '.join(alert.routes)}] {alert.effect}: {alert.header}")
@@ -0,0 +1,535 @@
+import argparse                   # Import argparse for the command line
+import json                       # Import json for the file header
+import logging                    # Import logging to report series over the size limit
+import mmap                       # Import mmap to keep the history in a file without reading or writing it whole
+import os                         # Import os for file path handling
+import struct                     # Import struct for the fixed-size file preamble
+import sys                        # Import sys for the byte order
+import threading                  # Import threading to guard the history shared with the GUI and HTTP threads
+import time                       # Import time for the default query window
+from array import array           # Import array for the in-memory window totals
+
+from feed_diff import FeedDiffer
+from static_cache import ASSETS_DIR
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.path.join(ASSETS_DIR, "cache", "history.arrivals")
+
+MAGIC = b'ARRHIST1'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sII')  # magic, header capacity, header length
+
+BUCKET_SECONDS = 900              # 15-minute buckets
+BUCKETS = 96                      # buckets kept: 24 hours
+MAX_SERIES = 512                  # (route, stop) pairs kept
+MAX_HEADWAY = 2 * 3600            # a longer gap between two trains is a break in service, not a headway
+MIN_LEAD = 120                    # predictions made less than this (seconds) before the arrival are not scored
+ARRIVAL_SLACK = 60                # a stop dropped from the feed more than this before its time was not served
+
+# Upper edges (seconds) of the headway histogram bins; the last bin is open-ended up to MAX_HEADWAY
+HEADWAY_BINS = (60, 120, 180, 240, 300, 360, 480, 600, 720, 900, 1200, 1800, 3600)
+BIN_COUNT = len(HEADWAY_BINS) + 1
+
+# Column name -> (array type code, values per (bucket, series)), in file order
+COLUMNS = (('arrivals', 'I', 1), ('headways', 'I', 1), ('headway_sum', 'q', 1), ('headway_squares', 'q', 1),
+           ('errors', 'I', 1), ('error_sum', 'q', 1), ('error_abs_sum', 'q', 1), ('headway_bins', 'H', BIN_COUNT))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def headway_bin(headway):
+    for index, edge in enumerate(HEADWAY_BINS):
+        if headway <= edge:
+            return index
+    return BIN_COUNT - 1
+
+
+def bin_percentile(bins, fraction):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bin_percentile
+    #   Input:      bins (sequence[int]) – headway histogram, BIN_COUNT counts
+    #               fraction (float)     – e.g. 0.5 for the median
+    #   Output:     float or None        – the percentile, interpolated linearly inside its bin (so it is within
+    #                                      one bin width of the exact value), or None for an empty histogram
+    # -----------------------------------------------------------------------------------------------------------------
+    total = sum(bins)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(bins):
+        if count and seen + count >= rank:
+            lower = HEADWAY_BINS[index - 1] if index else 0
+            upper = HEADWAY_BINS[index] if index < len(HEADWAY_BINS) else MAX_HEADWAY
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(MAX_HEADWAY)
+
+
+class HeadwayStats:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      HeadwayStats
+    #   Input:      route_id, stop_id (str)
+    #               since (int)                      – start of the window the statistics cover (POSIX time)
+    #               totals (dict[str, int or list])  – column name -> sum over the window (see COLUMNS)
+    #   Output:     Service statistics of one route at one stop
+    #   Description: Headways are seconds between consecutive arrivals; errors are actual minus predicted
+    #                arrival time, so a positive error means the train came later than the feed said. Means and
+    #                percentiles are None when there is nothing to average.
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('route_id', 'stop_id', 'since', 'arrivals', 'headways', 'mean_headway', 'stdev_headway',
+                 'p50_headway', 'p90_headway', 'predictions', 'mean_error', 'mean_abs_error')
+
+    def __init__(self, route_id, stop_id, since, totals):
+        self.route_id = route_id
+        self.stop_id = stop_id
+        self.since = since
+        self.arrivals = totals['arrivals']
+        self.headways = count = totals['headways']
+        self.mean_headway = totals['headway_sum'] / count if count else None
+        self.stdev_headway = (max(0.0, totals['headway_squares'] / count - self.mean_headway ** 2) ** 0.5
+                              if count else None)
+        self.p50_headway = bin_percentile(totals['headway_bins'], 0.5)
+        self.p90_headway = bin_percentile(totals['headway_bins'], 0.9)
+        self.predictions = scored = totals['errors']
+        self.mean_error = totals['error_sum'] / scored if scored else None
+        self.mean_abs_error = totals['error_abs_sum'] / scored if scored else None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"HeadwayStats({self.route_id!r}, {self.stop_id!r}, arrivals={self.arrivals}, "
+                f"mean_headway={self.mean_headway}, mean_error={self.mean_error})")
+
+
+class ArrivalHistory:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ArrivalHistory
+    #   Input:      path (str)            – optional file to keep the history in across restarts (None: memory only)
+    #               bucket_seconds (int)  – width of one time bucket
+    #               buckets (int)         – buckets kept; the window is bucket_seconds * buckets long
+    #               max_series (int)      – (route, stop) pairs kept
+    #   Output:     A fixed-size ring buffer of observed arrivals with rolling headway and prediction statistics
+    #   Description: Arrivals are not stored one by one. Every (bucket, series) cell holds counts and sums -
+    #                arrivals, headways, their sum and sum of squares, a headway histogram, and the count, sum and
+    #                absolute sum of prediction errors - in typed columns laid out bucket-major, so one bucket is
+    #                one contiguous slice of each column. Memory is allocated once, whatever the traffic:
+    #                buckets * max_series cells, about 3.5 MB with the defaults.
+    #                observe() adds to its bucket and to running totals over the whole window. When time moves
+    #                into a new bucket the oldest one is subtracted from the totals and cleared, so the window
+    #                statistics cost O(1) per arrival and per query; a shorter window sums its buckets.
+    #                With a path the columns live in a shared memory-mapped file (same preamble + JSON header
+    #                layout as snapshot_cache), so the history survives restarts without ever being written out
+    #                in full. Series beyond max_series are counted in `dropped` and ignored.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, path=None, bucket_seconds=BUCKET_SECONDS, buckets=BUCKETS, max_series=MAX_SERIES):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.max_series = max_series
+        self.series = []          # slot -> (route_id, stop_id)
+        self.slots = {}           # (route_id, stop_id) -> slot
+        self.by_stop = {}         # stop_id -> [slot, ...]
+        self.current = -1         # newest bucket number seen (bucket = POSIX time // bucket_seconds)
+        self.observed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._mm = None
+
+        # File layout: columns of buckets * max_series cells, then bucket epochs and per-series last arrivals
+        self.layout = {}
+        offset = 0
+        for name, typecode, width in COLUMNS:
+            self.layout[name] = offset
+            offset = _align(offset + struct.calcsize(typecode) * width * buckets * max_series)
+        self.layout['epochs'] = offset
+        offset = _align(offset + 8 * buckets)
+        self.layout['last_arrival'] = offset
+        self.data_size = _align(offset + 8 * max_series)
+        self.header_capacity = _align(1024 + 64 * max_series)
+        self.data_start = _align(PREAMBLE.size + self.header_capacity)
+
+        storage = self._open(path) if path else None
+        if storage is None:
+            storage = bytearray(self.data_start + self.data_size)
+            self._map(storage)
+            for slot in range(buckets):
+                self.epochs[slot] = -1
+        self._rebuild()
+
+    def _header(self):
+        return {'version': FORMAT_VERSION, 'byteorder': sys.byteorder, 'bucket_seconds': self.bucket_seconds,
+                'buckets': self.buckets, 'max_series': self.max_series, 'layout': self.layout,
+                'series': [list(key) for key in self.series]}
+
+    def _open(self, path):
+        # Maps an existing history file with the same geometry, or creates a new one; None if neither works
+        size = self.data_start + self.data_size
+        header = None
+        try:
+            with open(path, 'r+b') as f:
+                magic, capacity, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+                if magic == MAGIC and capacity == self.header_capacity:
+                    header = json.loads(f.read(length))
+                    expected = self._header()
+                    if any(header.get(key) != expected[key] for key in expected if key != 'series'):
+                        header = None
+                if header is not None and os.fstat(f.fileno()).st_size == size:
+                    self._mm = mmap.mmap(f.fileno(), size)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error):
+            logger.warning("Arrival history %s is unreadable, starting a new one", path)
+            header = None
+
+        if self._mm is None:
+            if header is not None:
+                logger.warning("Arrival history %s has a different size, starting a new one", path)
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                with open(path, 'w+b') as f:
+                    f.truncate(size)
+                    self._mm = mmap.mmap(f.fileno(), size)
+            except OSError as exc:
+                logger.warning("Arrival history %s cannot be written (%s), keeping it in memory", path, exc)
+                return None
+            self._map(self._mm)
+            for slot in range(self.buckets):
+                self.epochs[slot] = -1
+            self._write_header()
+            return self._mm
+
+        self._map(self._mm)
+        for route_id, stop_id in header['series'][:self.max_series]:
+            self._add_series(route_id, stop_id)
+        return self._mm
+
+    def _map(self, storage):
+        data = memoryview(storage)[self.data_start:]
+        self._raw = data
+        self.columns = {}
+        for name, typecode, width in COLUMNS:
+            start = self.layout[name]
+            length = struct.calcsize(typecode) * width * self.buckets * self.max_series
+            self.columns[name] = data[start:start + length].cast(typecode)
+        self.epochs = data[self.layout['epochs']:self.layout['epochs'] + 8 * self.buckets].cast('q')
+        start = self.layout['last_arrival']
+        self.last_arrival = data[start:start + 8 * self.max_series].cast('q')
+
+    def _rebuild(self):
+        # Window totals from the buckets; cells of slots without a name (a crash between the two) are cleared
+        self.totals = {name: array('q', bytes(8 * width * self.max_series)) for name, _, width in COLUMNS}
+        named = len(self.series)
+        for slot in range(self.buckets):
+            if self.epochs[slot] < 0:
+                continue
+            self.current = max(self.current, self.epochs[slot])
+            for name, _, width in COLUMNS:
+                column, totals = self.columns[name], self.totals[name]
+                base = slot * self.max_series * width
+                for index in range(named * width):
+                    totals[index] += column[base + index]
+                self._clear(name, slot, start=named)
+        for series in range(named, self.max_series):
+            self.last_arrival[series] = 0
+
+    def _clear(self, name, slot, start=0):
+        _, typecode, width = next(column for column in COLUMNS if column[0] == name)
+        cell = struct.calcsize(typecode) * width
+        begin = self.layout[name] + cell * (slot * self.max_series + start)
+        end = self.layout[name] + cell * (slot + 1) * self.max_series
+        self._raw[begin:end] = bytes(end - begin)
+
+    def _write_header(self):
+        if self._mm is None:
+            return True
+        header = json.dumps(self._header(), separators=(',', ':')).encode('utf-8')
+        if len(header) > self.header_capacity:
+            return False
+        self._mm[PREAMBLE.size:PREAMBLE.size + len(header)] = header
+        self._mm[:PREAMBLE.size] = PREAMBLE.pack(MAGIC, self.header_capacity, len(header))
+        return True
+
+    def _add_series(self, route_id, stop_id):
+        slot = len(self.series)
+        self.series.append((route_id, stop_id))
+        self.slots[(route_id, stop_id)] = slot
+        self.by_stop.setdefault(stop_id, []).append(slot)
+        return slot
+
+    def _slot(self, route_id, stop_id):
+        slot = self.slots.get((route_id, stop_id))
+        if slot is not None:
+            return slot
+        if len(self.series) >= self.max_series:
+            if not self.dropped:
+                logger.warning("Arrival history is full (%d series), new routes/stops are ignored", self.max_series)
+            self.dropped += 1
+            return None
+        slot = self._add_series(route_id, stop_id)
+        # The name goes to disk before any of its cells, so a restart never attributes them to another series
+        if not self._write_header():
+            self.series.pop()
+            del self.slots[(route_id, stop_id)]
+            self.by_stop[stop_id].pop()
+            self.dropped += 1
+            return None
+        return slot
+
+    def _advance(self, bucket):
+        # Moves the window forward to end at bucket: buckets falling out of it leave the totals and are cleared
+        first = max(self.current + 1, bucket - self.buckets + 1)
+        named = len(self.series)
+        for number in range(first, bucket + 1):
+            slot = number % self.buckets
+            if self.epochs[slot] >= 0:
+                for name, _, width in COLUMNS:
+                    column, totals = self.columns[name], self.totals[name]
+                    base = slot * self.max_series * width
+                    for index in range(named * width):
+                        value = column[base + index]
+                        if value:
+                            totals[index] -= value
+                    self._clear(name, slot)
+            self.epochs[slot] = number
+        self.current = bucket
+
+    def observe(self, route_id, stop_id, arrival_time, predicted=None, predicted_at=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   observe
+        #   Input:      route_id, stop_id (str)
+        #               arrival_time (int)  – POSIX time the train arrived
+        #               predicted (int)     – optional arrival time an earlier prediction gave
+        #               predicted_at (int)  – when that prediction was made; it is only scored when it was made at
+        #                                     least MIN_LEAD seconds ahead
+        #   Output:     bool                – False when the arrival is older than the window or its series could
+        #                                     not be added
+        #   Description: The headway is measured from the series' previous arrival, so arrivals of one series
+        #                should come in time order (HistoryRecorder sorts each refresh); one that is not is counted
+        #                but gives no headway.
+        # -------------------------------------------------------------------------------------------------------------
+        arrival_time = int(arrival_time)
+        bucket = arrival_time // self.bucket_seconds
+        with self._lock:
+            if bucket > self.current:
+                self._advance(bucket)
+            elif bucket <= self.current - self.buckets:
+                return False
+            series = self._slot(route_id, stop_id)
+            if series is None:
+                return False
+            slot = bucket % self.buckets
+            columns, totals = self.columns, self.totals
+            cell = slot * self.max_series + series
+
+            columns['arrivals'][cell] += 1
+            totals['arrivals'][series] += 1
+
+            last = self.last_arrival[series]
+            headway = arrival_time - last
+            if last and 0 < headway <= MAX_HEADWAY:
+                squared = headway * headway
+                columns['headways'][cell] += 1
+                columns['headway_sum'][cell] += headway
+                columns['headway_squares'][cell] += squared
+                totals['headways'][series] += 1
+                totals['headway_sum'][series] += headway
+                totals['headway_squares'][series] += squared
+                index = headway_bin(headway)
+                columns['headway_bins'][cell * BIN_COUNT + index] += 1
+                totals['headway_bins'][series * BIN_COUNT + index] += 1
+            if arrival_time > last:
+                self.last_arrival[series] = arrival_time
+
+            if predicted is not None and predicted_at is not None and arrival_time - predicted_at >= MIN_LEAD:
+                error = arrival_time - int(predicted)
+                columns['errors'][cell] += 1
+                columns['error_sum'][cell] += error
+                columns['error_abs_sum'][cell] += abs(error)
+                totals['errors'][series] += 1
+                totals['error_sum'][series] += error
+                totals['error_abs_sum'][series] += abs(error)
+            self.observed += 1
+            return True
+
+    def _window(self, series, since):
+        # Column name -> sum over the buckets from since on (the running totals when they cover the whole window)
+        first = self.current - self.buckets + 1
+        if since is None or since // self.bucket_seconds <= first:
+            return {name: (self.totals[name][series * width:(series + 1) * width].tolist() if width > 1
+                           else self.totals[name][series])
+                    for name, _, width in COLUMNS}
+        start = since // self.bucket_seconds
+        sums = {name: [0] * width for name, _, width in COLUMNS}
+        for slot in range(self.buckets):
+            if self.epochs[slot] < start:
+                continue
+            for name, _, width in COLUMNS:
+                column, values = self.columns[name], sums[name]
+                base = (slot * self.max_series + series) * width
+                for index in range(width):
+                    values[index] += column[base + index]
+        return {name: values if len(values) > 1 else values[0] for name, values in sums.items()}
+
+    def window_start(self):
+        # POSIX time the window starts at
+        return max(0, self.current - self.buckets + 1) * self.bucket_seconds
+
+    def stats(self, route_id, stop_id, since=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   stats
+        #   Input:      route_id, stop_id (str)
+        #               since (int)          – optional POSIX time; only buckets from its bucket on are counted
+        #   Output:     HeadwayStats or None – None when the series was never observed
+        # -------------------------------------------------------------------------------------------------------------
+        with self._lock:
+            series = self.slots.get((route_id, stop_id))
+            if series is None:
+                return None
+            since = self.window_start() if since is None else max(since, self.window_start())
+            return HeadwayStats(route_id, stop_id, since, self._window(series, since))
+
+    def stats_at(self, stop_ids, route_id=None, since=None):
+        # HeadwayStats of every route observed at the stops (or only route_id), by stop and route
+        with self._lock:
+            keys = [self.series[series] for stop_id in stop_ids for series in self.by_stop.get(stop_id, ())]
+        return [self.stats(route, stop_id, since) for route, stop_id in sorted(keys, key=lambda key: key[::-1])
+                if route_id is None or route == route_id]
+
+    def timeline(self, route_id, stop_id):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   timeline
+        #   Input:      route_id, stop_id (str)
+        #   Output:     list[(int, int, float, float)] – (bucket start, arrivals, mean headway, mean error) of
+        #                                                every bucket in the window, oldest first; the means are
+        #                                                None where there is nothing to average
+        # -------------------------------------------------------------------------------------------------------------
+        with self._lock:
+            series = self.slots.get((route_id, stop_id))
+            rows = []
+            for number in range(max(0, self.current - self.buckets + 1), self.current + 1):
+                slot = number % self.buckets
+                if series is None or self.epochs[slot] != number:
+                    rows.append((number * self.bucket_seconds, 0, None, None))
+                    continue
+                cell = slot * self.max_series + series
+                headways, errors = self.columns['headways'][cell], self.columns['errors'][cell]
+                rows.append((number * self.bucket_seconds, self.columns['arrivals'][cell],
+                             self.columns['headway_sum'][cell] / headways if headways else None,
+                             self.columns['error_sum'][cell] / errors if errors else None))
+            return rows
+
+    def flush(self):
+        # Writes the mapped file's dirty pages back to disk (the kernel does this on its own, eventually)
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            if self._mm is None:
+                return
+            self._mm.flush()
+            self.columns = self.epochs = self.last_arrival = self._raw = None
+            self._mm.close()
+            self._mm = None
+
+
+class HistoryRecorder:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      HistoryRecorder
+    #   Input:      history (ArrivalHistory) – where the observed arrivals go
+    #               stop_ids (iterable[str]) – optional stops to record (default: every stop in the feeds)
+    #   Output:     Turns consecutive feed refreshes into observed arrivals
+    #   Description: The realtime feeds predict arrivals but never confirm them: a stop simply drops out of a
+    #                trip once the train has passed it. So an arrival is observed when FeedDiffer reports a
+    #                stop as removed at (or up to ARRIVAL_SLACK seconds before) its predicted time, and the last
+    #                prediction is taken as the actual arrival. A stop dropped well before its time was cancelled
+    #                or skipped and is only counted in `cancelled`. The first prediction seen for each (trip,
+    #                stop) is kept until then to score the feed's prediction error; those are bounded by what is
+    #                in the feed.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, history, stop_ids=None):
+        self.history = history
+        self.stop_ids = set(stop_ids) if stop_ids else None
+        self.differs = {}
+        self.first_predictions = {}   # (trip_id, stop_id) -> (predicted arrival time, feed time of the prediction)
+        self.cancelled = 0
+
+    def update(self, feed_name, feed):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   update
+        #   Input:      feed_name (str)                       – which feed refreshed
+        #               feed (gtfs_realtime_pb2.FeedMessage)  – its new contents
+        #   Output:     int                                   – arrivals recorded from this refresh
+        # -------------------------------------------------------------------------------------------------------------
+        differ = self.differs.get(feed_name)
+        if differ is None:
+            differ = self.differs[feed_name] = FeedDiffer()
+        diff = differ.diff(feed)
+        now = diff.timestamp or int(time.time())
+        observed = []
+        for stop_id, station in diff.stations.items():
+            if self.stop_ids is not None and stop_id not in self.stop_ids:
+                continue
+            for arrival in station.added:
+                self.first_predictions.setdefault((arrival['trip_id'], stop_id), (arrival['arrival_time'], now))
+            for arrival in station.removed:
+                first = self.first_predictions.pop((arrival['trip_id'], stop_id), (None, None))
+                if arrival['arrival_time'] > now + ARRIVAL_SLACK:
+                    self.cancelled += 1
+                    continue
+                observed.append((arrival['arrival_time'], arrival['route_id'], stop_id) + first)
+        # Time order within the refresh, so the headways between trains that left together are counted
+        observed.sort()
+        return sum(self.history.observe(route_id, stop_id, arrival_time, predicted, predicted_at)
+                   for arrival_time, route_id, stop_id, predicted, predicted_at in observed)
+
+
+def print_stats(history, stop_ids=None):
+    stop_ids = stop_ids or sorted(history.by_stop)
+    print(f"{'route':>5} {'stop':>6} {'arrivals':>8} {'headway':>8} {'p50':>6} {'p90':>6} {'error':>7} {'|error|':>7}")
+    for stats in history.stats_at(stop_ids):
+        def minutes(value):
+            return '-' if value is None else f"{value / 60:.1f}"
+        print(f"{stats.route_id:>5} {stats.stop_id:>6} {stats.arrivals:>8} {minutes(stats.mean_headway):>8} "
+              f"{minutes(stats.p50_headway):>6} {minutes(stats.p90_headway):>6} {minutes(stats.mean_error):>7} "
+              f"{minutes(stats.mean_abs_error):>7}")
+
+
+if __name__ == "__main__":
+    # Usage: python arrival_history.py [--recording DIR | --synthetic N] [--path FILE] [stop_id ...]
+    #        replays recorded (feed_recorder.py) or simulated refreshes and prints the statistics per route and stop
+    parser = argparse.ArgumentParser(description="Headway and prediction error statistics from feed refreshes")
+    parser.add_argument('stop_ids', nargs='*', help="stops to record and show (default: all)")
+    parser.add_argument('--recording', metavar='DIR', help="feed_recorder.py recording to replay")
+    parser.add_argument('--synthetic', type=int, default=480, metavar='N',
+                        help="simulated refreshes, 30 s apart, when there is no recording")
+    parser.add_argument('--path', help="history file to update (default: in memory only)")
+    args = parser.parse_args()
+
+    history = ArrivalHistory(args.path)
+    recorder = HistoryRecorder(history, args.stop_ids)
+    started = time.perf_counter()
+    if args.recording:
+        from core import parse_feed
+        from feed_recorder import Recording
+
+        refreshes = ((key, parse_feed(content)) for _, key, content in Recording(args.recording).snapshots())
+    else:
+        from synthetic_feed import make_snapshots
+
+        refreshes = (('synthetic', feed) for feed in make_snapshots(args.synthetic))
+    count = 0
+    for feed_name, feed in refreshes:
+        recorder.update(feed_name, feed)
+        count += 1
+    elapsed = time.perf_counter() - started
+    print(f"{count} refreshes, {history.observed} arrivals, {recorder.cancelled} cancelled stops, "
+          f"{len(history.series)} series in {elapsed:.2f} s")
+    print_stats(history, args.stop_ids)
+    history.close()
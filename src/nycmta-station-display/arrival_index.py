@@ -0,0 +1,88 @@
+import heapq                      # Import heapq to merge per-feed indexes
+from operator import itemgetter
+
+from core import stop_time
+
+_by_arrival_time = itemgetter('arrival_time')
+
+
+class ArrivalIndex:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ArrivalIndex
+    #   Input:      feed (gtfs_realtime_pb2.FeedMessage) – optional feed snapshot to index
+    #   Output:     A stop_id -> arrivals lookup table for one feed snapshot
+    #   Description: Walks every stop_time_update of the feed exactly once and groups the arrivals by stop_id,
+    #                each group sorted by arrival_time. Looking up a station afterwards is a dict access instead
+    #                of a scan of the whole feed, so serving many stations costs one pass per snapshot.
+    #                Arrival records are the same dicts core.get_upcoming_trains returns.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feed=None):
+        self.by_stop = {}
+        self.timestamp = 0
+        if feed is not None:
+            self.timestamp = feed.header.timestamp
+            self._build(feed)
+
+    def _build(self, feed):
+        by_stop = self.by_stop
+        for entity in feed.entity:
+            if not entity.HasField('trip_update'):
+                continue
+
+            trip = entity.trip_update.trip
+            trip_id = trip.trip_id
+            route_id = trip.route_id
+            for stu in entity.trip_update.stop_time_update:
+                arrival_time = stop_time(stu)
+                if not arrival_time:
+                    continue
+                arrivals = by_stop.get(stu.stop_id)
+                if arrivals is None:
+                    arrivals = by_stop[stu.stop_id] = []
+                arrivals.append({
+                    'trip_id': trip_id,
+                    'route_id': route_id,
+                    'arrival_time': arrival_time
+                })
+
+        for arrivals in by_stop.values():
+            arrivals.sort(key=_by_arrival_time)
+
+    @classmethod
+    def merge(cls, indexes):
+        # Combine the indexes of several feeds (e.g. one per line group) without re-sorting every station
+        merged = cls()
+        indexes = list(indexes)
+        stop_ids = set()
+        for index in indexes:
+            stop_ids.update(index.by_stop)
+            merged.timestamp = max(merged.timestamp, index.timestamp)
+        for stop_id in stop_ids:
+            lists = [index.by_stop[stop_id] for index in indexes if stop_id in index.by_stop]
+            if len(lists) == 1:
+                merged.by_stop[stop_id] = lists[0]
+            else:
+                merged.by_stop[stop_id] = list(heapq.merge(*lists, key=_by_arrival_time))
+        return merged
+
+    def arrivals(self, stop_id, limit=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   arrivals
+        #   Input:      stop_id (str) – GTFS stop_id, e.g. 'G35N'
+        #               limit (int)   – optional maximum number of arrivals to return
+        #   Output:     list[dict]    – arrivals at stop_id sorted by arrival_time; shared with the index, so
+        #                               callers must not modify it
+        # -------------------------------------------------------------------------------------------------------------
+        arrivals = self.by_stop.get(stop_id, [])
+        if limit is not None:
+            return arrivals[:limit]
+        return arrivals
+
+    def stop_ids(self):
+        return self.by_stop.keys()
+
+    def __contains__(self, stop_id):
+        return stop_id in self.by_stop
+
+    def __len__(self):
+        return len(self.by_stop)
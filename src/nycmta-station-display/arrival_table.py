@@ -0,0 +1,210 @@
+import heapq                      # Import heapq to merge the arrivals of several stops
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from core import stop_time
+
+
+class StringPool:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StringPool
+    #   Input:      None
+    #   Output:     A two-way mapping between strings and small integer codes
+    #   Description: Interns repeated identifiers (route_ids, stop_ids, trip_ids) so tables can store one integer
+    #                per row instead of one string object per row.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def intern(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def code(self, value):
+        # Code of an already interned string, or None
+        return self.codes.get(value)
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class ArrivalTable:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ArrivalTable
+    #   Input:      feeds (list[gtfs_realtime_pb2.FeedMessage]) – feed snapshots to load into one table
+    #               pools (ArrivalTable)                        – optional previous table whose string pools are
+    #                                                             reused, so identifiers seen in earlier refreshes
+    #                                                             are not allocated again; the pools only ever
+    #                                                             gain strings, so the previous table's codes stay
+    #                                                             valid (SnapshotBuilder bounds their growth)
+    #               tables (list[ArrivalTable])                 – optional tables whose rows are added as well,
+    #                                                             e.g. cached arrivals of feeds not refreshed yet
+    #   Output:     A columnar table of every arrival in the feeds
+    #   Description: Stores arrivals as four parallel typed arrays (stop code, route code, trip code, POSIX time)
+    #                backed by string pools, instead of one dict per arrival. Rows are sorted by (stop, time) and
+    #                an offsets array marks where each stop's rows begin, so:
+    #                  - filtering by station is a slice of the arrays,
+    #                  - a time window is two binary searches inside that slice,
+    #                  - the next K trains are the first K rows of the window (merged across stops if needed).
+    #                Nothing is allocated per arrival except while the table is being built.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feeds=(), pools=None, tables=()):
+        if pools is not None:
+            self.stops, self.routes, self.trips = pools.stops, pools.routes, pools.trips
+        else:
+            self.stops = StringPool()
+            self.routes = StringPool()
+            self.trips = StringPool()
+
+        self.stop_codes = array('I')
+        self.route_codes = array('H')
+        self.trip_codes = array('I')
+        self.times = array('q')
+        self.offsets = array('I', [0])
+        self.timestamp = 0
+
+        self._build(feeds, tables)
+
+    @classmethod
+    def from_columns(cls, stops, routes, trips, stop_codes, route_codes, trip_codes, times, offsets, timestamp=0):
+        # A table over columns that are already sorted and indexed (e.g. memory-mapped from snapshot_cache);
+        # the columns may be arrays or memoryviews of the same type codes
+        table = cls.__new__(cls)
+        table.stops, table.routes, table.trips = stops, routes, trips
+        table.stop_codes, table.route_codes, table.trip_codes = stop_codes, route_codes, trip_codes
+        table.times, table.offsets, table.timestamp = times, offsets, timestamp
+        return table
+
+    def _build(self, feeds, tables=()):
+        stop_codes = array('I')
+        route_codes = array('H')
+        trip_codes = array('I')
+        times = array('q')
+        intern_stop = self.stops.intern
+
+        for feed in feeds:
+            self.timestamp = max(self.timestamp, feed.header.timestamp)
+            for entity in feed.entity:
+                if not entity.HasField('trip_update'):
+                    continue
+                trip = entity.trip_update.trip
+                route_code = self.routes.intern(trip.route_id)
+                trip_code = self.trips.intern(trip.trip_id)
+                for stu in entity.trip_update.stop_time_update:
+                    arrival_time = stop_time(stu)
+                    if not arrival_time:
+                        continue
+                    stop_codes.append(intern_stop(stu.stop_id))
+                    route_codes.append(route_code)
+                    trip_codes.append(trip_code)
+                    times.append(arrival_time)
+
+        for table in tables:
+            self.timestamp = max(self.timestamp, table.timestamp)
+            stop_map = [intern_stop(stop_id) for stop_id in table.stops.strings]
+            route_map = [self.routes.intern(route_id) for route_id in table.routes.strings]
+            trip_map = [self.trips.intern(trip_id) for trip_id in table.trips.strings]
+            stop_codes.extend(stop_map[code] for code in table.stop_codes)
+            route_codes.extend(route_map[code] for code in table.route_codes)
+            trip_codes.extend(trip_map[code] for code in table.trip_codes)
+            times.extend(table.times)
+
+        # Counting sort of the rows by stop code; offsets[code] .. offsets[code + 1] is the row range of stop `code`
+        counts = [0] * (len(self.stops) + 1)
+        for code in stop_codes:
+            counts[code + 1] += 1
+        for code in range(len(self.stops)):
+            counts[code + 1] += counts[code]
+        self.offsets = array('I', counts)
+
+        order = array('I', bytes(4 * len(times)))
+        next_slot = counts[:-1]
+        for row, code in enumerate(stop_codes):
+            order[next_slot[code]] = row
+            next_slot[code] += 1
+
+        # Then by time within each stop (stable, so ties keep feed order)
+        by_time = times.__getitem__
+        for code in range(len(self.stops)):
+            lo, hi = counts[code], counts[code + 1]
+            if hi - lo > 1:
+                order[lo:hi] = array('I', sorted(order[lo:hi], key=by_time))
+
+        # Permute every column the same way
+        self.stop_codes = array('I', [stop_codes[row] for row in order])
+        self.route_codes = array('H', [route_codes[row] for row in order])
+        self.trip_codes = array('I', [trip_codes[row] for row in order])
+        self.times = array('q', [times[row] for row in order])
+
+    def __len__(self):
+        return len(self.times)
+
+    def pool_size(self):
+        # Strings interned by the table's pools, including those carried over from earlier refreshes
+        return len(self.stops) + len(self.routes) + len(self.trips)
+
+    def nbytes(self):
+        # Size of the column buffers; the string pools are not counted since refreshes can share them
+        columns = (self.stop_codes, self.route_codes, self.trip_codes, self.times, self.offsets)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def rows(self, stop_id, start=None, end=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   rows
+        #   Input:      stop_id (str)  – GTFS stop_id
+        #               start (int)    – optional earliest POSIX time (inclusive)
+        #               end (int)      – optional latest POSIX time (inclusive)
+        #   Output:     range          – row numbers of the matching arrivals, in time order
+        # -------------------------------------------------------------------------------------------------------------
+        code = self.stops.code(stop_id)
+        if code is None or code + 1 >= len(self.offsets):
+            return range(0)
+        lo, hi = self.offsets[code], self.offsets[code + 1]
+        if start is not None:
+            lo = bisect_left(self.times, start, lo, hi)
+        if end is not None:
+            hi = bisect_right(self.times, end, lo, hi)
+        return range(lo, hi)
+
+    def top_k(self, stop_ids, k, start=None, end=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   top_k
+        #   Input:      stop_ids (str or list[str]) – one stop_id or several (e.g. both platforms of a station)
+        #               k (int)                     – number of arrivals wanted
+        #               start, end (int)            – optional time window, as in rows()
+        #   Output:     list[int]                   – row numbers of the k earliest arrivals in the window
+        # -------------------------------------------------------------------------------------------------------------
+        if isinstance(stop_ids, str):
+            return list(self.rows(stop_ids, start, end)[:k])
+        times = self.times
+        ranges = [self.rows(stop_id, start, end) for stop_id in stop_ids]
+        return list(islice(heapq.merge(*ranges, key=times.__getitem__), k))
+
+    def routes_at(self, stop_id, start=None, end=None):
+        # route_ids with at least one arrival at stop_id in the window, however far down the stop's list
+        rows = self.rows(stop_id, start, end)
+        routes = self.routes
+        return {routes[code] for code in set(self.route_codes[rows.start:rows.stop])}
+
+    def record(self, row):
+        # Materializes one row as the dict core.get_upcoming_trains returns
+        return {
+            'trip_id': self.trips[self.trip_codes[row]],
+            'route_id': self.routes[self.route_codes[row]],
+            'arrival_time': self.times[row]
+        }
+
+    def arrivals(self, stop_id, limit=None, start=None, end=None):
+        # Drop-in for ArrivalIndex.arrivals; only the returned rows are turned into dicts
+        rows = self.rows(stop_id, start, end)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.record(row) for row in rows]
@@ -0,0 +1,779 @@
+import argparse                   # Import argparse for the benchmark command line
+import csv                        # Import csv for the plain-text GTFS baseline
+import datetime                   # Import datetime for the schedule service dates
+import gc                         # Import gc to count collections triggered by a workload
+import glob                       # Import glob to find recorded snapshot sequences
+import http.client                # Import http.client for the simulated display subscribers
+import json                       # Import json to save and compare pipeline baselines
+import multiprocessing            # Import multiprocessing to measure peak memory in a fresh process
+import os                         # Import os for file path handling
+import statistics                 # Import statistics to summarize repeated timings
+import threading                  # Import threading to run many simulated subscribers at once
+import time                       # Import time for high resolution timers
+import tracemalloc                # Import tracemalloc to measure allocations
+from collections import Counter
+
+import requests
+
+import core
+from alerts import ServiceInfoBuilder
+from arrival_index import ArrivalIndex
+from arrival_table import ArrivalTable
+from data_service import DataService
+from feed_diff import FeedDiffer
+from feed_poller import FeedPoller
+from feed_recorder import Recording
+from feed_server import FeedServer
+from route_graph import ROUTE_STATIONS_PATH, RouteGraph, parent_station_id
+from schedule import ScheduleEngine
+from selective_decoder import SelectiveDecoder
+from station_server import StationServer
+from static_cache import ASSETS_DIR, CACHE_PATH, TABLES, StaticGTFS
+from synthetic_feed import make_feed, make_snapshots
+
+
+def load_feeds(paths):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   load_feeds
+    #   Input:      paths (list[str])  – recorded .pb files; when empty a synthetic full-network feed is used
+    #   Output:     list[(str, bytes, gtfs_realtime_pb2.FeedMessage)] – name, raw bytes and parsed feed
+    # -----------------------------------------------------------------------------------------------------------------
+    feeds = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        feeds.append((path, content, core.parse_feed(content)))
+    if not feeds:
+        feed = make_feed()
+        feeds.append(('synthetic', feed.SerializeToString(), feed))
+    return feeds
+
+
+def measure(fn, repeat):
+    # Runs fn repeat times and returns the median wall time in seconds
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_memory(fn):
+    # Runs fn once and returns (result, bytes still allocated by the result, peak bytes, gc collections)
+    gc.collect()
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+    return result, retained, peak, collections
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of values (0 for an empty list)
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def _rss_kib(field):
+    # VmRSS / VmHWM (peak) of this process in KiB
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def _peak_rss_worker(decoder, content, stop_ids, queue):
+    # Runs in a spawned process: growth of the peak RSS (KiB) over the current RSS while decoding content once
+    gc.collect()
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')   # reset VmHWM to the current RSS
+    before = _rss_kib('VmRSS:')
+    if decoder == 'full':
+        ArrivalIndex(core.parse_feed(content))
+    else:
+        SelectiveDecoder(stop_ids).decode(content)
+    queue.put(_rss_kib('VmHWM:') - before)
+
+
+def measure_peak_rss(decoder, content, stop_ids):
+    # Peak memory including native allocations (the C protobuf runtime is invisible to tracemalloc); Linux only
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_peak_rss_worker, args=(decoder, content, stop_ids, queue))
+    process.start()
+    growth = queue.get()
+    process.join()
+    return growth
+
+
+def busiest_stops(feeds, count):
+    counts = Counter()
+    for _, _, feed in feeds:
+        for entity in feed.entity:
+            if entity.HasField('trip_update'):
+                counts.update(stu.stop_id for stu in entity.trip_update.stop_time_update)
+    return [stop_id for stop_id, _ in counts.most_common(count)]
+
+
+def bench_index(args):
+    # Per-station linear scan (core.get_upcoming_trains) versus one ArrivalIndex pass plus N lookups
+    feeds = load_feeds(args.feeds)
+    parsed = [feed for _, _, feed in feeds]
+    stu_count = sum(len(e.trip_update.stop_time_update) for f in parsed for e in f.entity)
+    print(f"{len(parsed)} feed(s), {stu_count} stop_time_updates, median of {args.repeat} runs")
+    print(f"{'stations':>10} {'scan ms':>10} {'index ms':>10} {'speedup':>8}")
+
+    for n in args.stations:
+        stations = busiest_stops(feeds, n)
+
+        def scan():
+            for station_id in stations:
+                trains = []
+                for feed in parsed:
+                    trains.extend(core.get_upcoming_trains(feed, station_id))
+                trains.sort(key=lambda x: x['arrival_time'])
+
+        def indexed():
+            index = ArrivalIndex.merge(ArrivalIndex(feed) for feed in parsed)
+            for station_id in stations:
+                index.arrivals(station_id)
+
+        scan_time = measure(scan, args.repeat)
+        index_time = measure(indexed, args.repeat)
+        print(f"{len(stations):>10} {scan_time * 1000:>10.2f} {index_time * 1000:>10.2f} "
+              f"{scan_time / index_time:>7.1f}x")
+
+
+def bench_table(args):
+    # Lists of per-arrival dicts (ArrivalIndex) versus the columnar ArrivalTable
+    feeds = load_feeds(args.feeds)
+    parsed = [feed for _, _, feed in feeds]
+    stations = busiest_stops(feeds, args.stations)
+    now = max(feed.header.timestamp for feed in parsed)
+    window = (now, now + 30 * 60)
+
+    def build_dicts():
+        return ArrivalIndex.merge(ArrivalIndex(feed) for feed in parsed)
+
+    def build_table():
+        return ArrivalTable(parsed)
+
+    index, index_retained, index_peak, index_gc = measure_memory(build_dicts)
+    table, table_retained, table_peak, table_gc = measure_memory(build_table)
+    print(f"{len(table)} arrivals at {len(table.stops)} stops, median of {args.repeat} runs")
+    print(f"{'':>22} {'dicts':>12} {'table':>12}")
+    print(f"{'retained KiB':>22} {index_retained / 1024:>12.1f} {table_retained / 1024:>12.1f}")
+    print(f"{'peak KiB during build':>22} {index_peak / 1024:>12.1f} {table_peak / 1024:>12.1f}")
+    print(f"{'gc runs during build':>22} {index_gc:>12} {table_gc:>12}")
+    print(f"{'build ms':>22} {measure(build_dicts, args.repeat) * 1000:>12.2f} "
+          f"{measure(build_table, args.repeat) * 1000:>12.2f}")
+
+    def query_dicts():
+        for station_id in stations:
+            arrivals = index.arrivals(station_id)
+            [a for a in arrivals if window[0] <= a['arrival_time'] <= window[1]][:args.top]
+
+    def query_table():
+        for station_id in stations:
+            table.top_k(station_id, args.top, *window)
+
+    print(f"{f'top-{args.top} x {len(stations)} ms':>22} {measure(query_dicts, args.repeat) * 1000:>12.3f} "
+          f"{measure(query_table, args.repeat) * 1000:>12.3f}")
+
+
+def bench_replay(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_replay
+    #   Description: Replays a sequence of snapshots through FeedDiffer, checks after every step that the board
+    #                patched with the diff equals a board rebuilt from scratch, and compares the cost of diffing
+    #                with a full rebuild. Exits non-zero on the first mismatch.
+    # -----------------------------------------------------------------------------------------------------------------
+    if args.directory:
+        paths = sorted(glob.glob(os.path.join(args.directory, '*.pb')))
+        snapshots = [feed for _, _, feed in load_feeds(paths)]
+    else:
+        snapshots = make_snapshots(args.snapshots)
+    if not snapshots:
+        raise SystemExit(f"No .pb snapshots found in {args.directory}")
+
+    def rebuild(feed):
+        board = {}
+        for stop_id, arrivals in ArrivalIndex(feed).by_stop.items():
+            board[stop_id] = {arrival['trip_id']: arrival for arrival in arrivals}
+        return board
+
+    differ = FeedDiffer()
+    board = {}
+    diff_times = []
+    rebuild_times = []
+    print(f"{'snapshot':>8} {'trips':>6} {'unchanged':>9} {'stations':>8} {'diff ms':>8} {'rebuild ms':>10}")
+    for number, feed in enumerate(snapshots):
+        start = time.perf_counter()
+        diff = differ.diff(feed)
+        diff_times.append(time.perf_counter() - start)
+        diff.apply(board)
+
+        start = time.perf_counter()
+        expected = rebuild(feed)
+        rebuild_times.append(time.perf_counter() - start)
+        if board != expected:
+            raise SystemExit(f"Snapshot {number}: patched board differs from a rebuild")
+
+        trips = diff.trips_added + diff.trips_changed + diff.trips_unchanged
+        print(f"{number:>8} {trips:>6} {diff.trips_unchanged:>9} {len(diff.stations):>8} "
+              f"{diff_times[-1] * 1000:>8.2f} {rebuild_times[-1] * 1000:>10.2f}")
+    print(f"{len(snapshots)} snapshots replayed, patched board matched every rebuild; "
+          f"median diff {statistics.median(diff_times[1:] or diff_times) * 1000:.2f} ms, "
+          f"median rebuild {statistics.median(rebuild_times) * 1000:.2f} ms")
+
+
+def bench_decode(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_decode
+    #   Description: Full FeedMessage parse + ArrivalIndex versus the SelectiveDecoder for a growing number of
+    #                watched stops. Checks that both return the same arrivals and exits non-zero otherwise.
+    # -----------------------------------------------------------------------------------------------------------------
+    feeds = load_feeds(args.feeds)
+    total_bytes = sum(len(content) for _, content, _ in feeds)
+    print(f"{len(feeds)} feed(s), {total_bytes / 1024:.0f} KiB, median of {args.repeat} runs")
+    print(f"{'stations':>8} {'full ms':>8} {'select ms':>9} {'full MB/s':>9} {'select MB/s':>11} "
+          f"{'full peak KiB':>13} {'select peak KiB':>15}")
+
+    for n in args.stations:
+        stations = busiest_stops(feeds, n)
+        decoder = SelectiveDecoder(stations)
+        for name, content, feed in feeds:
+            selected = decoder.decode(content)
+            for station_id in stations:
+                if selected.arrivals(station_id) != core.get_upcoming_trains(feed, station_id):
+                    raise SystemExit(f"{name}: selective decoder differs from the full parse at {station_id}")
+
+        def full():
+            for _, content, _ in feeds:
+                index = ArrivalIndex(core.parse_feed(content))
+                for station_id in stations:
+                    index.arrivals(station_id)
+
+        def selective():
+            for _, content, _ in feeds:
+                index = decoder.decode(content)
+                for station_id in stations:
+                    index.arrivals(station_id)
+
+        full_time = measure(full, args.repeat)
+        selective_time = measure(selective, args.repeat)
+        full_peak = max(measure_peak_rss('full', content, stations) for _, content, _ in feeds)
+        selective_peak = max(measure_peak_rss('selective', content, stations) for _, content, _ in feeds)
+        megabytes = total_bytes / 1e6
+        print(f"{len(stations):>8} {full_time * 1000:>8.2f} {selective_time * 1000:>9.2f} "
+              f"{megabytes / full_time:>9.1f} {megabytes / selective_time:>11.1f} "
+              f"{full_peak:>13} {selective_peak:>15}")
+
+
+PIPELINE_STAGES = ('fetch', 'parse', 'extract', 'sort', 'format')
+
+
+def run_pipeline(snapshots, stations, base_url, server, session, timings, peaks=None):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   run_pipeline
+    #   Input:      snapshots (list[(str, bytes)])  – feed key and body of every snapshot, in replay order
+    #               stations (list[str])            – stop_ids to extract arrivals for
+    #               base_url (str)                  – base URL of server
+    #               server (FeedServer)             – local stand-in the snapshots are published to
+    #               session (requests.Session)      – session used for the fetch stage
+    #               timings (dict[str, list])       – per-stage seconds, appended to
+    #               peaks (dict[str, int])          – optional per-stage peak traced bytes, updated (needs tracemalloc)
+    #   Output:     None
+    #   Description: Runs core.py's hot path once per snapshot: HTTP fetch, ParseFromString, the per-station scan
+    #                (find_trains), sorting and formatting, timing every stage separately.
+    # -----------------------------------------------------------------------------------------------------------------
+    def stage(name, fn, *args):
+        if peaks is not None:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[name].append(time.perf_counter() - start)
+        if peaks is not None:
+            peaks[name] = max(peaks[name], tracemalloc.get_traced_memory()[1] - before)
+        return result
+
+    def fetch(key):
+        response = session.get(base_url + key, timeout=10)
+        response.raise_for_status()
+        return response.content
+
+    for key, content in snapshots:
+        server.publish(key, content)
+        feed = stage('parse', core.parse_feed, stage('fetch', fetch, key))
+        found = stage('extract', lambda: [core.find_trains(feed, station_id) for station_id in stations])
+        ordered = stage('sort', lambda: [core.sort_trains(trains) for trains in found])
+        stage('format', lambda: [[core.format_arrival(train) for train in trains] for trains in ordered])
+
+
+def bench_pipeline(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_pipeline
+    #   Description: Replays a recording (or synthetic snapshots) through a local FeedServer and reports latency
+    #                percentiles and peak allocations for every stage of the hot path. --save writes the results
+    #                as a baseline; --baseline compares against one and exits non-zero when a stage's p50 or p95
+    #                got slower than the tolerance allows.
+    # -----------------------------------------------------------------------------------------------------------------
+    if args.recording:
+        recording = Recording(args.recording)
+        snapshots = [(key, content) for _, key, content in recording.snapshots()]
+        if not snapshots:
+            raise SystemExit(f"No recorded snapshots found in {args.recording}")
+    else:
+        snapshots = [('synthetic', feed.SerializeToString()) for feed in make_snapshots(args.snapshots)]
+    first = [(key, content, core.parse_feed(content)) for key, content in snapshots[:1]]
+    stations = busiest_stops(first, args.stations)
+
+    server = FeedServer()
+    base_url = server.start()
+    session = requests.Session()
+    timings = {name: [] for name in PIPELINE_STAGES}
+    peaks = {name: 0 for name in PIPELINE_STAGES}
+    try:
+        run_pipeline(snapshots, stations, base_url, server, session, {name: [] for name in PIPELINE_STAGES})
+        for _ in range(args.repeat):
+            run_pipeline(snapshots, stations, base_url, server, session, timings)
+        # Allocations are traced in a separate pass so tracemalloc does not slow down the timed runs
+        tracemalloc.start()
+        run_pipeline(snapshots, stations, base_url, server, session, {name: [] for name in PIPELINE_STAGES}, peaks)
+        tracemalloc.stop()
+    finally:
+        session.close()
+        server.stop()
+
+    results = {}
+    print(f"{len(snapshots)} snapshot(s) x {args.repeat} runs, {len(stations)} stations")
+    print(f"{'stage':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'peak KiB':>9}")
+    for name in PIPELINE_STAGES:
+        results[name] = {
+            'p50': percentile(timings[name], 0.50),
+            'p95': percentile(timings[name], 0.95),
+            'p99': percentile(timings[name], 0.99),
+            'max': max(timings[name]),
+            'peak_kib': peaks[name] / 1024,
+        }
+        row = results[name]
+        print(f"{name:>8} {row['p50'] * 1000:>8.3f} {row['p95'] * 1000:>8.3f} {row['p99'] * 1000:>8.3f} "
+              f"{row['max'] * 1000:>8.3f} {row['peak_kib']:>9.1f}")
+    print("(peak KiB counts Python allocations; the C protobuf runtime used by parse is not traced)")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [f"{name} {metric} {results[name][metric] * 1000:.3f} ms "
+                       f"(baseline {baseline[name][metric] * 1000:.3f} ms)"
+                       for name in PIPELINE_STAGES if name in baseline
+                       for metric in ('p50', 'p95')
+                       if results[name][metric] > baseline[name][metric] * (1 + args.tolerance)]
+        if regressions:
+            raise SystemExit("Regressions over {:.0%}:\n  ".format(args.tolerance) + "\n  ".join(regressions))
+        print(f"No stage slower than the baseline by more than {args.tolerance:.0%}")
+
+
+def bench_poller(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_poller
+    #   Description: Polls a local FeedServer through FeedPoller: a changed feed is parsed once, an unchanged one
+    #                costs a 304, and a corrupt body (a truncated snapshot) must not stop the feed from being parsed
+    #                again on the next poll. Reports the time of each kind of poll and exits non-zero if the
+    #                poller got any of them wrong.
+    # -----------------------------------------------------------------------------------------------------------------
+    snapshots = [feed.SerializeToString() for feed in make_snapshots(args.snapshots + 1)]
+    server = FeedServer()
+    poller = FeedPoller({'synthetic': server.start() + 'synthetic'})
+    timings = {'changed': [], 'unchanged': []}
+    failures = []
+
+    def poll(kind=None):
+        start = time.perf_counter()
+        try:
+            changed = poller.poll('synthetic')
+        except Exception:
+            return None
+        if kind:
+            timings[kind].append(time.perf_counter() - start)
+        return changed
+
+    try:
+        for content in snapshots[1:]:
+            server.publish('synthetic', content)
+            if not poll('changed'):
+                failures.append("a changed feed was not parsed")
+            for _ in range(args.repeat):
+                if poll('unchanged') is not False:
+                    failures.append("an unchanged feed was parsed again")
+
+        # A body cut short on the way must be fetched and parsed again, not answered with a 304
+        server.publish('synthetic', snapshots[0][:len(snapshots[0]) // 2])
+        state = poller.states['synthetic']
+        if poll() is not None:
+            failures.append("a truncated body was parsed without an error")
+        not_modified = state.not_modified_count
+        if poll() is not None or state.not_modified_count != not_modified:
+            failures.append("a failed parse was answered with a 304 on the next poll")
+        server.publish('synthetic', snapshots[0])
+        if not poll() or poller.latest('synthetic') is None:
+            failures.append("the feed did not recover after a failed parse")
+    finally:
+        poller.session.close()
+        server.stop()
+
+    print(f"{args.snapshots} snapshot(s), {args.repeat} unchanged polls each")
+    print(f"{'poll':>10} {'p50 ms':>8} {'max ms':>8}")
+    for kind, values in timings.items():
+        print(f"{kind:>10} {percentile(values, 0.50) * 1000:>8.3f} {max(values, default=0) * 1000:>8.3f}")
+    print(f"fetches: {state.fetch_count}, 304s: {state.not_modified_count}, parses: {state.parse_count}")
+    if failures:
+        raise SystemExit("Poller errors:\n  " + "\n  ".join(failures))
+    print("Unchanged feeds were not parsed again and a failed parse was retried on the next poll")
+
+
+def _subscriber(base_url, stop_id, received, ready, stopping):
+    # One simulated display: follows /stream/<stop_id> and records (version, receive time, bytes) per pushed
+    # change; the event sent on connect only reflects the state at that time and is not recorded
+    host, port = base_url.split('//', 1)[1].rstrip('/').split(':')
+    connection = http.client.HTTPConnection(host, int(port), timeout=30)
+    try:
+        connection.request('GET', f'/stream/{stop_id}')
+        response = connection.getresponse()
+        ready.release()
+        version, size, connected = None, 0, False
+        while not stopping.is_set():
+            line = response.fp.readline()
+            if not line:
+                break
+            size += len(line)
+            if line.startswith(b'id:'):
+                version = int(line[3:])
+            elif line == b'\n' and version is not None:
+                if connected:
+                    received.append((version, time.time(), size))
+                version, size, connected = None, 0, True
+    except OSError:
+        pass
+    finally:
+        connection.close()
+
+
+def bench_server(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_server
+    #   Description: Load test of station_server.py: synthetic feed refreshes are published to a local FeedServer,
+    #                one DataService polls and parses them, and --subscribers simulated displays follow the
+    #                event streams of --stations different stops. Reports how often the feed was parsed and the
+    #                payloads encoded (both should not grow with the number of displays) and the fan-out
+    #                latency from a snapshot being published to each display receiving it.
+    # -----------------------------------------------------------------------------------------------------------------
+    snapshots = [feed.SerializeToString() for feed in make_snapshots(args.updates + 1)]
+    stations = busiest_stops([(None, None, core.parse_feed(snapshots[0]))], args.stations)
+
+    feed_server = FeedServer()
+    feed_server.publish('synthetic', snapshots[0])
+    service = DataService({'synthetic': feed_server.start() + 'synthetic'}, default_interval=args.poll).start()
+    service.wait_for_update(0, timeout=10)
+    server = StationServer(service)
+    base_url = server.start()
+
+    published = {service.version: service.snapshot.created_at}
+    received = []
+    ready = threading.Semaphore(0)
+    stopping = threading.Event()
+    threads = [threading.Thread(target=_subscriber, args=(base_url, stations[i % len(stations)], received, ready,
+                                                          stopping), daemon=True)
+               for i in range(args.subscribers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            ready.acquire(timeout=10)
+
+        for content in snapshots[1:]:
+            version = service.version
+            feed_server.publish('synthetic', content)
+            snapshot = service.wait_for_update(version, timeout=10)
+            published[snapshot.version] = snapshot.created_at
+            time.sleep(args.interval)
+        subscribers = server.subscriber_count
+    finally:
+        stopping.set()
+        server.stop()
+        service.stop()
+        feed_server.stop()
+
+    latencies = [at - published[version] for version, at, _ in received if version in published]
+    print(f"{args.subscribers} subscribers ({subscribers} connected) on {len(stations)} stations, "
+          f"{args.updates} feed updates")
+    print(f"feed parses: {service.refresh_count}, payload encodes: {server.payloads.encode_count}, "
+          f"events pushed: {len(received)} ({sum(size for _, _, size in received) / 1024:.1f} KiB)")
+    print(f"fan-out latency ms: p50 {percentile(latencies, 0.50) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}  max {max(latencies, default=0) * 1000:.2f}")
+
+
+def bench_graph(args):
+    # "Does this train reach the destination": rescanning route_stations.txt per arrival vs. the RouteGraph
+    feeds = load_feeds(args.feeds)
+    stations = busiest_stops(feeds, args.stations)
+    arrivals = [(train['route_id'], station_id) for _, _, feed in feeds for station_id in stations
+                for train in core.get_upcoming_trains(feed, station_id)]
+    start = time.perf_counter()
+    graph = RouteGraph.from_csv()
+    load_time = time.perf_counter() - start
+    destination = args.destination
+
+    def rescan():
+        for route_id, station_id in arrivals:
+            with open(ROUTE_STATIONS_PATH, newline='', encoding='utf-8') as f:
+                sequence = {row['station_id']: int(row['stop_sequence'])
+                            for row in csv.DictReader(f) if row['route_id'] == route_id}
+            here, there = sequence.get(parent_station_id(station_id)), sequence.get(destination)
+            here is not None and there is not None and (there > here) == (station_id[-1] == 'S')
+
+    def indexed():
+        for route_id, station_id in arrivals:
+            graph.reaches(route_id, station_id[-1], station_id, destination)
+
+    print(f"{len(arrivals)} arrivals at {len(stations)} stations, graph built in {load_time * 1000:.1f} ms")
+    rescan_time = measure(rescan, args.repeat)
+    indexed_time = measure(indexed, args.repeat)
+    print(f"{'csv rescan ms':>16} {rescan_time * 1000:>10.2f}")
+    print(f"{'graph ms':>16} {indexed_time * 1000:>10.3f}   ({indexed_time / len(arrivals) * 1e6:.2f} us per arrival)")
+
+
+def bench_static(args):
+    # Start-up cost of the static GTFS tables: csv parsing into dicts versus opening the binary cache
+    StaticGTFS.load().close()
+
+    def parse_csv():
+        tables = {}
+        for name, (relative_path, key) in TABLES.items():
+            with open(os.path.join(ASSETS_DIR, relative_path), newline='', encoding='utf-8') as f:
+                tables[name] = {row[key]: row for row in csv.DictReader(f)}
+        return tables
+
+    def open_cache():
+        cache = StaticGTFS(CACHE_PATH)
+        cache.is_current()
+        return cache
+
+    tables = parse_csv()
+    cache = open_cache()
+    trip_ids = list(tables['trips'])[::max(1, len(tables['trips']) // args.lookups)][:args.lookups]
+    stop_ids = list(tables['stops'])[:args.lookups]
+
+    def lookup_csv():
+        for trip_id in trip_ids:
+            tables['trips'][trip_id]['trip_headsign']
+        for stop_id in stop_ids:
+            tables['stops'][stop_id]['stop_name']
+
+    def lookup_cache():
+        for trip_id in trip_ids:
+            cache.trips.get(trip_id, 'trip_headsign')
+        for stop_id in stop_ids:
+            cache.stop_name(stop_id)
+
+    print(f"median of {args.repeat} runs, {len(trip_ids) + len(stop_ids)} lookups")
+    print(f"{'':>16} {'csv':>10} {'cache':>10}")
+    print(f"{'startup ms':>16} {measure(parse_csv, args.repeat) * 1000:>10.2f} "
+          f"{measure(lambda: open_cache().close(), args.repeat) * 1000:>10.2f}")
+    print(f"{'lookups ms':>16} {measure(lookup_csv, args.repeat) * 1000:>10.2f} "
+          f"{measure(lookup_cache, args.repeat) * 1000:>10.2f}")
+    cache.close()
+
+
+def bench_alerts(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_alerts
+    #   Description: Alert and vehicle-position extraction over synthetic feeds with more and more alerts: time of
+    #                the first refresh, time of an unchanged refresh (records reused by entity id) and the memory
+    #                the builder retains, which stops growing once the size limits are reached.
+    # -----------------------------------------------------------------------------------------------------------------
+    print(f"{'alerts':>8} {'vehicles':>9} {'first ms':>9} {'repeat ms':>10} {'kept':>6} {'dropped':>8} "
+          f"{'retained KiB':>13}")
+    for count in args.alerts:
+        feed = make_feed(alerts=count)
+        vehicles = sum(entity.HasField('vehicle') for entity in feed.entity)
+
+        builder = ServiceInfoBuilder()
+        start = time.perf_counter()
+        builder.update('feed', feed)
+        first = time.perf_counter() - start
+        repeat = measure(lambda: builder.update('feed', feed), args.repeat)
+
+        traced = ServiceInfoBuilder()
+        info, retained, _, _ = measure_memory(lambda: traced.update('feed', feed))
+        print(f"{count:>8} {vehicles:>9} {first * 1000:>9.2f} {repeat * 1000:>10.2f} {len(info.alerts):>6} "
+              f"{traced.dropped:>8} {retained / 1024:>13.1f}")
+
+
+def check_fill(engine, stop_id, after, limit):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   check_fill
+    #   Input:      engine (ScheduleEngine), stop_id (str), after (int), limit (int) – as for ScheduleEngine.fill
+    #   Output:     bool – False if fill added scheduled trains for a route that has realtime arrivals
+    #   Description: Stands in the stop's scheduled departures for realtime arrivals and cuts the list off just
+    #                before the first train of its last route, as HomeScreen's limit does at a busy station. That
+    #                route still has realtime data (realtime_routes, from the uncut list) and must not be filled.
+    # -----------------------------------------------------------------------------------------------------------------
+    realtime = [dict(train, scheduled=False) for train in engine.departures(stop_id, after, 4 * limit)]
+    first = {}
+    for index, train in enumerate(realtime):
+        first.setdefault(train['route_id'], index)
+    cut = realtime[:max(first.values(), default=0)]
+    filled = engine.fill(cut, stop_id, after, limit, realtime_routes=set(first))
+    return not any(train['scheduled'] and train['route_id'] in first for train in filled)
+
+
+def bench_schedule(args):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_schedule
+    #   Description: Scheduled departures over the full trips table: loading the engine, building the per-stop
+    #                index of every service, and "next K departures at stop X after T" answered by scanning every
+    #                trip of the running services versus bisecting the per-stop index.
+    # -----------------------------------------------------------------------------------------------------------------
+    start = time.perf_counter()
+    engine = ScheduleEngine.from_csv()
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for service_id in engine.service_trips:
+        engine.stop_index(service_id)
+    index_time = time.perf_counter() - start
+    entries = engine.indexed_departures()
+
+    stop_ids = sorted({stop_id for pattern in engine.patterns.values() for stop_id, _ in pattern})
+    stop_ids = stop_ids[::max(1, len(stop_ids) // args.stops)][:args.stops]
+    after = int(time.time())
+
+    def scan(stop_id):
+        found = []
+        for date_offset in (-1, 0, 1):
+            date = datetime.datetime.fromtimestamp(after, engine.timezone).date() + datetime.timedelta(date_offset)
+            midnight = engine.midnight(date)
+            for service_id in engine.calendar.services_for(date):
+                for number, origin, pattern in engine.service_trips[service_id]:
+                    for pattern_stop, offset in pattern:
+                        if pattern_stop == stop_id and midnight + origin + offset >= after:
+                            found.append((midnight + origin + offset, number))
+        return sorted(found)[:args.k]
+
+    mismatches = sum([t for t, _ in scan(stop_id)] != [d['arrival_time'] for d in engine.departures(stop_id, after,
+                                                                                                      args.k)]
+                     for stop_id in stop_ids[:5])
+    filled_wrongly = [stop_id for stop_id in stop_ids if not check_fill(engine, stop_id, after, args.k)]
+    scan_times, index_times = [], []
+    for stop_id in stop_ids:
+        scan_times.append(measure(lambda: scan(stop_id), 1))
+        index_times.append(measure(lambda: engine.departures(stop_id, after, args.k), args.repeat))
+
+    print(f"{len(engine.trip_ids)} trips ({engine.skipped} on routes without stations), "
+          f"{len(engine.service_trips)} services, {entries} indexed departures")
+    print(f"load {load_time * 1000:.1f} ms, index every service {index_time * 1000:.1f} ms")
+    print(f"next {args.k} departures at {len(stop_ids)} stops:")
+    print(f"{'':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, timings in (("scan", scan_times), ("index", index_times)):
+        print(f"{label:>10} {percentile(timings, 0.50) * 1000:>8.3f} {percentile(timings, 0.99) * 1000:>8.3f} "
+              f"{max(timings) * 1000:>8.3f}")
+    if mismatches:
+        raise SystemExit(f"Index and scan disagree at {mismatches} stop(s)")
+    if filled_wrongly:
+        raise SystemExit("Scheduled departures added for routes with realtime arrivals at: "
+                         + ", ".join(filled_wrongly))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the feed processing hot path")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help="per-station scan vs. one-pass arrival index")
+    index_parser.add_argument('feeds', nargs='*', help="recorded .pb files (default: synthetic feed)")
+    index_parser.add_argument('--stations', type=int, nargs='+', default=[1, 10, 50, 200])
+    index_parser.add_argument('--repeat', type=int, default=5)
+    index_parser.set_defaults(run=bench_index)
+
+    table_parser = subparsers.add_parser('table', help="dict-based arrivals vs. columnar arrival table")
+    table_parser.add_argument('feeds', nargs='*', help="recorded .pb files (default: synthetic feed)")
+    table_parser.add_argument('--stations', type=int, default=200)
+    table_parser.add_argument('--top', type=int, default=10)
+    table_parser.add_argument('--repeat', type=int, default=5)
+    table_parser.set_defaults(run=bench_table)
+
+    replay_parser = subparsers.add_parser('replay', help="replay snapshots through the feed differ")
+    replay_parser.add_argument('directory', nargs='?', help="directory of recorded .pb snapshots, in name order "
+                                                            "(default: synthetic snapshots)")
+    replay_parser.add_argument('--snapshots', type=int, default=20)
+    replay_parser.set_defaults(run=bench_replay)
+
+    decode_parser = subparsers.add_parser('decode', help="full protobuf parse vs. selective decoding of watched stops")
+    decode_parser.add_argument('feeds', nargs='*', help="recorded .pb files (default: synthetic feed)")
+    decode_parser.add_argument('--stations', type=int, nargs='+', default=[1, 2, 10, 50])
+    decode_parser.add_argument('--repeat', type=int, default=5)
+    decode_parser.set_defaults(run=bench_decode)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help="per-stage latency of fetch, parse, extract, sort and "
+                                                             "format over a replayed recording")
+    pipeline_parser.add_argument('--recording', help="directory written by feed_recorder.py "
+                                                     "(default: synthetic snapshots)")
+    pipeline_parser.add_argument('--snapshots', type=int, default=10, help="number of synthetic snapshots")
+    pipeline_parser.add_argument('--stations', type=int, default=10)
+    pipeline_parser.add_argument('--repeat', type=int, default=5)
+    pipeline_parser.add_argument('--save', help="write the results to this JSON file")
+    pipeline_parser.add_argument('--baseline', help="JSON file from --save to compare against")
+    pipeline_parser.add_argument('--tolerance', type=float, default=0.25,
+                                 help="allowed slowdown over the baseline, e.g. 0.25 for 25%%")
+    pipeline_parser.set_defaults(run=bench_pipeline)
+
+    poller_parser = subparsers.add_parser('poller', help="conditional polling: parses, 304s and retries after a "
+                                                         "corrupt body")
+    poller_parser.add_argument('--snapshots', type=int, default=5, help="number of synthetic snapshots")
+    poller_parser.add_argument('--repeat', type=int, default=5, help="unchanged polls per snapshot")
+    poller_parser.set_defaults(run=bench_poller)
+
+    server_parser = subparsers.add_parser('server', help="load test of the station server with many subscribers")
+    server_parser.add_argument('--subscribers', type=int, default=200)
+    server_parser.add_argument('--stations', type=int, default=20)
+    server_parser.add_argument('--updates', type=int, default=10, help="number of feed refreshes to publish")
+    server_parser.add_argument('--interval', type=float, default=0.5, help="seconds between feed refreshes")
+    server_parser.add_argument('--poll', type=float, default=0.1, help="data service poll interval in seconds")
+    server_parser.set_defaults(run=bench_server)
+
+    graph_parser = subparsers.add_parser('graph', help="destination filtering: csv rescans vs. the route graph")
+    graph_parser.add_argument('feeds', nargs='*', help="recorded .pb files (default: synthetic feed)")
+    graph_parser.add_argument('--stations', type=int, default=10)
+    graph_parser.add_argument('--destination', default='A27', help="destination station id")
+    graph_parser.add_argument('--repeat', type=int, default=3)
+    graph_parser.set_defaults(run=bench_graph)
+
+    static_parser = subparsers.add_parser('static', help="csv parsing vs. the binary static GTFS cache")
+    static_parser.add_argument('--lookups', type=int, default=1000)
+    static_parser.add_argument('--repeat', type=int, default=5)
+    static_parser.set_defaults(run=bench_static)
+
+    alerts_parser = subparsers.add_parser('alerts', help="alert/vehicle extraction time and retained memory")
+    alerts_parser.add_argument('--alerts', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    alerts_parser.add_argument('--repeat', type=int, default=5)
+    alerts_parser.set_defaults(run=bench_alerts)
+
+    schedule_parser = subparsers.add_parser('schedule', help="scheduled departures: trip scans vs. per-stop index")
+    schedule_parser.add_argument('--stops', type=int, default=50)
+    schedule_parser.add_argument('--k', type=int, default=10, help="departures per query")
+    schedule_parser.add_argument('--repeat', type=int, default=20)
+    schedule_parser.set_defaults(run=bench_schedule)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
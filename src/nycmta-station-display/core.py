@@ -1,44 +1,155 @@
-import requests
-import gtfs_realtime_pb2
+import sys
+import time
+from functools import lru_cache
 
+FEED_BASE_URL = 'https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/'
 
+# One realtime feed per group of lines
+FEED_PATHS = {
+    '1234567S': 'nyct%2Fgtfs',
+    'ACE': 'nyct%2Fgtfs-ace',
+    'BDFM': 'nyct%2Fgtfs-bdfm',
+    'G': 'nyct%2Fgtfs-g',
+    'JZ': 'nyct%2Fgtfs-jz',
+    'L': 'nyct%2Fgtfs-l',
+    'NQRW': 'nyct%2Fgtfs-nqrw',
+    'SIR': 'nyct%2Fgtfs-si',
+}
 
-FEED_URL = 'https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-g'
+FEED_URL = FEED_BASE_URL + FEED_PATHS['G']
 
-# Fetch the data
-response = requests.get(FEED_URL)
 
-feed = gtfs_realtime_pb2.FeedMessage()
-feed.ParseFromString(response.content)
+def feed_urls(feed_names=None, base_url=FEED_BASE_URL):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   feed_urls
+    #   Input:      feed_names (list[str]) – keys of FEED_PATHS to include (default: all feeds)
+    #               base_url (str)         – URL prefix, e.g. a local stand-in server instead of the MTA endpoint
+    #   Output:     dict[str, str]         – feed name -> full feed URL
+    #   Description: Builds the URL of every requested feed on top of base_url.
+    # -----------------------------------------------------------------------------------------------------------------
+    if feed_names is None:
+        feed_names = list(FEED_PATHS)
+    if not base_url.endswith('/'):
+        base_url += '/'
+    return {name: base_url + FEED_PATHS[name] for name in feed_names}
+
+
+def parse_feed(content):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   parse_feed
+    #   Input:      content (bytes)                          – raw protobuf body of a feed response
+    #   Output:     feed (gtfs_realtime_pb2.FeedMessage)     – the decoded feed
+    #   Description: Decodes a GTFS-realtime feed. The generated protobuf module (and its descriptor pool) is
+    #                imported on the first call, so importing core for its constants stays cheap at start-up.
+    # -----------------------------------------------------------------------------------------------------------------
+    import gtfs_realtime_pb2
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    return feed
+
+
+def stop_time(stu):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   stop_time
+    #   Input:      stu (gtfs_realtime_pb2.TripUpdate.StopTimeUpdate) – one stop of a trip update
+    #   Output:     int or None                                       – POSIX time the train is at the stop
+    #   Description: Uses the departure time when present, otherwise the arrival time.
+    # -----------------------------------------------------------------------------------------------------------------
+    arrival_time = None
+    if stu.HasField('arrival') and stu.arrival.HasField('time'):
+        arrival_time = stu.arrival.time
+    if stu.HasField('departure') and stu.departure.HasField('time'):
+        arrival_time = stu.departure.time
+    return arrival_time
+
+
+def find_trains(feed, station_id):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   find_trains
+    #   Input:      feed (gtfs_realtime_pb2.FeedMessage) – a decoded feed
+    #               station_id (str)                     – GTFS stop_id, e.g. 'G35N'
+    #   Output:     list[dict]                           – trip_id, route_id and arrival_time of every train
+    #                                                      stopping at station_id, in feed order
+    #   Description: Scans every stop_time_update in the feed for the given station.
+    # -----------------------------------------------------------------------------------------------------------------
+    upcoming_trains = []
+
+    for entity in feed.entity:
+        if not entity.HasField('trip_update'):
+            continue
+
+        for stu in entity.trip_update.stop_time_update:
+            if stu.stop_id == station_id:
+                arrival_time = stop_time(stu)
+                if arrival_time:
+                    upcoming_trains.append({
+                        'trip_id': entity.trip_update.trip.trip_id,
+                        'route_id': entity.trip_update.trip.route_id,
+                        'arrival_time': arrival_time
+                    })
+    return upcoming_trains
+
+
+def sort_trains(trains):
+    # Sort by arrival time
+    trains.sort(key=lambda x: x['arrival_time'])
+    return trains
+
+
+def get_upcoming_trains(feed, station_id):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   get_upcoming_trains
+    #   Input:      feed (gtfs_realtime_pb2.FeedMessage) – a decoded feed
+    #               station_id (str)                     – GTFS stop_id, e.g. 'G35N'
+    #   Output:     list[dict]                           – trains stopping at station_id, sorted by arrival_time
+    # -----------------------------------------------------------------------------------------------------------------
+    return sort_trains(find_trains(feed, station_id))
+
+
+@lru_cache(maxsize=4096)
+def format_clock_time(timestamp):
+    # '%I:%M:%S %p' of a POSIX time; the same arrival times come back every refresh, so they are formatted once
+    return time.strftime('%I:%M:%S %p', time.localtime(timestamp))
 
-import time
 
-station_id = 'G35N'  # Replace with your station stop ID
-upcoming_trains = []
+def format_arrival(train):
+    return f"Route {train['route_id']} - Arriving at {format_clock_time(train['arrival_time'])}"
 
-for entity in feed.entity:
-    if not entity.HasField('trip_update'):
-        continue
 
-    for stu in entity.trip_update.stop_time_update:
-        if stu.stop_id == station_id:
-            arrival_time = None
-            if stu.HasField('arrival') and stu.arrival.HasField('time'):
-                arrival_time = stu.arrival.time
-            if stu.HasField('departure') and stu.departure.HasField('time'):
-                arrival_time = stu.departure.time
+def main(station_id='G35N', feed_names=('G',), base_url=FEED_BASE_URL):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   main
+    #   Input:      station_id (str)        – stop_id to print arrivals for
+    #               feed_names (list[str])  – feeds to poll
+    #               base_url (str)          – feed URL prefix
+    #   Output:     None
+    #   Description: Polls the requested feeds until interrupted and prints the upcoming trains at station_id
+    #                every time one of the feeds changes.
+    # -----------------------------------------------------------------------------------------------------------------
+    from feed_poller import FeedPoller
 
-            if arrival_time:
-                upcoming_trains.append({
-                    'trip_id': entity.trip_update.trip.trip_id,
-                    'route_id': entity.trip_update.trip.route_id,
-                    'arrival_time': arrival_time
-                })
+    def on_update(name, feed):
+        print(f"--- {name} feed updated ---")
+        for train in get_upcoming_trains(feed, station_id):
+            print(format_arrival(train))
 
-# Sort by arrival time
-upcoming_trains.sort(key=lambda x: x['arrival_time'])
+    poller = FeedPoller(feed_urls(feed_names, base_url), on_update=on_update)
+    poller.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
 
-# Print upcoming times
-for train in upcoming_trains:
-    print(f"Route {train['route_id']} - Arriving at {time.strftime('%I:%M:%S %p', time.localtime(train['arrival_time']))}")
 
+if __name__ == "__main__":
+    # Usage: python core.py [station_id] [feed_name ...]
+    if len(sys.argv) > 2:
+        main(sys.argv[1], sys.argv[2:])
+    elif len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,279 @@
+import multiprocessing            # Import multiprocessing for the subprocess worker
+import threading                  # Import threading for the worker/receiver threads
+import time                       # Import time for snapshot timestamps
+
+from alerts import ServiceInfo, ServiceInfoBuilder
+from arrival_history import HistoryRecorder
+from arrival_table import ArrivalTable
+from core import parse_feed
+from feed_poller import FeedPoller
+from snapshot_cache import SnapshotCache
+
+POOL_GROWTH = 2                   # pools are started anew once they hold this many times the strings in use
+MIN_POOL_SIZE = 4096              # ... but not before they hold POOL_GROWTH times this many
+
+
+class ArrivalSnapshot:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ArrivalSnapshot
+    #   Input:      table (ArrivalTable)            – arrivals of every feed at the time of the snapshot
+    #               version (int)                   – increases by one with every published snapshot
+    #               feed_timestamps (dict[str,int]) – header timestamp of each feed that went into the table
+    #               service_info (ServiceInfo)      – alerts and vehicle positions of the same feeds
+    #   Output:     An immutable view of the arrivals, safe to read from any thread
+    #   Description: The data service never modifies a snapshot after publishing it; it builds a new one and
+    #                swaps the reference, so the GUI can read whatever snapshot it holds without locking. The next
+    #                tables may add strings to the pools this one shares with them, but never change a code the
+    #                snapshot's rows refer to.
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('table', 'version', 'feed_timestamps', 'service_info', 'created_at')
+
+    def __init__(self, table=None, version=0, feed_timestamps=None, service_info=None):
+        self.table = table if table is not None else ArrivalTable()
+        self.version = version
+        self.feed_timestamps = dict(feed_timestamps or {})
+        self.service_info = service_info if service_info is not None else ServiceInfo()
+        self.created_at = time.time()
+
+    @property
+    def timestamp(self):
+        # Age of the data: the newest feed header timestamp (0 before the first refresh)
+        return max(self.feed_timestamps.values(), default=0)
+
+    def arrivals(self, stop_ids, limit=None, start=None, end=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   arrivals
+        #   Input:      stop_ids (str or list[str]) – stop(s) to look up, e.g. 'G35N' or ['G35N', 'G35S']
+        #               limit (int)                 – maximum number of arrivals
+        #               start, end (int)            – optional POSIX time window
+        #   Output:     list[dict]                  – trip_id, route_id, arrival_time, earliest first
+        # -------------------------------------------------------------------------------------------------------------
+        table = self.table
+        rows = table.top_k(stop_ids, limit if limit is not None else len(table), start, end)
+        return [table.record(row) for row in rows]
+
+    def routes_at(self, stop_id, start=None, end=None):
+        # route_ids with realtime arrivals at stop_id in the window, with no limit on the number of arrivals
+        return self.table.routes_at(stop_id, start, end)
+
+
+class SnapshotBuilder:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      SnapshotBuilder
+    #   Input:      cached (dict[str, (ArrivalTable, int)]) – optional arrivals and timestamps per feed from the
+    #                                                          snapshot cache, used until that feed is refreshed
+    #               history (ArrivalHistory)                – optional history to record observed arrivals in
+    #   Output:     Turns feed updates into ArrivalSnapshots
+    #   Description: Keeps the latest parsed message of every feed and rebuilds one ArrivalTable over all of them
+    #                whenever one changes. String pools are carried over from the previous table, but trip_ids
+    #                change all day, so once the pools hold POOL_GROWTH times the strings of the last fresh build
+    #                the next table starts new ones: memory stays bounded by the strings in use, and published
+    #                snapshots keep the pools they were built with.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, cached=None, history=None):
+        self.feeds = {}
+        self.cached = dict(cached or {})
+        self.table = None
+        self.fresh_pool_size = 0      # strings in the pools right after they were last started anew
+        self.info_builder = ServiceInfoBuilder()
+        self.recorder = HistoryRecorder(history) if history is not None else None
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def cached_snapshot(self):
+        # Snapshot of the cached arrivals alone, or None when there are none
+        with self._lock:
+            if not self.cached:
+                return None
+            tables = [table for table, _ in self.cached.values()]
+            # A single cached feed is used in place, straight from the mapped file
+            self.table = tables[0] if len(tables) == 1 else ArrivalTable(tables=tables)
+            self.fresh_pool_size = self.table.pool_size()
+            self.version += 1
+            timestamps = {feed_name: timestamp for feed_name, (_, timestamp) in self.cached.items()}
+            return ArrivalSnapshot(self.table, self.version, timestamps)
+
+    def update(self, name, feed):
+        with self._lock:
+            self.feeds[name] = feed
+            self.cached.pop(name, None)
+            pools = self.table
+            if pools is not None and pools.pool_size() > POOL_GROWTH * max(self.fresh_pool_size, MIN_POOL_SIZE):
+                pools = None
+            self.table = ArrivalTable(list(self.feeds.values()), pools=pools,
+                                      tables=[table for table, _ in self.cached.values()])
+            if pools is None:
+                self.fresh_pool_size = self.table.pool_size()
+            self.version += 1
+            timestamps = {feed_name: timestamp for feed_name, (_, timestamp) in self.cached.items()}
+            timestamps.update((feed_name, message.header.timestamp) for feed_name, message in self.feeds.items())
+            if self.recorder is not None:
+                self.recorder.update(name, feed)
+            return ArrivalSnapshot(self.table, self.version, timestamps, self.info_builder.update(name, feed))
+
+
+def _worker_main(conn, feeds, poller_options, cache_dir=None, version=0):
+    # Subprocess entry point: poll, parse and build snapshots here, send them to the parent through conn.
+    # The cache is loaded again here (memory-mapped tables do not pickle); version continues the parent's.
+    send_lock = threading.Lock()
+    cache = SnapshotCache(cache_dir) if cache_dir else None
+    builder = SnapshotBuilder(cache.load(feeds) if cache else None)
+    builder.version = version
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def parse(content):
+        send(('refreshing', None))
+        return parse_feed(content)
+
+    def on_update(name, feed):
+        send(('snapshot', builder.update(name, feed)))
+        if cache is not None:
+            cache.save(name, feed)
+
+    poller = FeedPoller(feeds, on_update=on_update, parse=parse, **poller_options)
+    poller.start()
+    try:
+        conn.recv()   # any message (or the parent going away) means stop
+    except (EOFError, OSError):
+        pass
+    finally:
+        poller.stop(wait=False)
+        conn.close()
+
+
+class DataService:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      DataService
+    #   Input:      feeds (dict[str, str])  – feed name -> URL (see core.feed_urls)
+    #               use_process (bool)      – run fetching, parsing and table building in a subprocess instead of
+    #                                         worker threads, so that work never competes with the GUI for the GIL
+    #               cache_dir (str)         – optional snapshot_cache directory: the last arrivals of every feed
+    #                                         are saved there and published as the first snapshot on start-up
+    #               history (ArrivalHistory)– optional history of observed arrivals, updated with every refresh
+    #                                         (worker threads only: it lives in this process, where it is queried)
+    #               **poller_options        – passed on to FeedPoller (intervals, timeout, backoff, ...)
+    #   Output:     A background source of ArrivalSnapshots for the GUI
+    #   Description: The GUI reads `service.snapshot` once per frame. That attribute is only ever replaced by a
+    #                single reference assignment, which is atomic, so reading it never blocks and never sees a
+    #                half-built table. `in_flight` is True while a refresh is being parsed and indexed, and
+    #                `version` tells the reader whether anything changed since it last looked. With a cache the
+    #                snapshot is populated before start() returns; its timestamp tells how old the arrivals are.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feeds, use_process=False, cache_dir=None, history=None, **poller_options):
+        if use_process and history is not None:
+            raise ValueError("an arrival history can only be recorded with use_process=False")
+        self.feeds = dict(feeds)
+        self.use_process = use_process
+        self.poller_options = poller_options
+        self.cache = SnapshotCache(cache_dir) if cache_dir else None
+        self.history = history
+        self.snapshot = ArrivalSnapshot()
+        self.in_flight = False
+        self.refresh_count = 0
+
+        self._published = threading.Condition()
+        self._stopping = False
+        self._poller = None
+        self._builder = None
+        self._process = None
+        self._conn = None
+        self._receiver = None
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def start(self):
+        # Last known arrivals first, so the display has something to show before the first fetch completes
+        self._stopping = False
+        self._builder = SnapshotBuilder(self.cache.load(self.feeds) if self.cache else None, self.history)
+        snapshot = self._builder.cached_snapshot()
+        if snapshot is not None:
+            self._publish(snapshot)
+        if self.use_process:
+            context = multiprocessing.get_context('spawn')
+            self._conn, child_conn = context.Pipe()
+            cache_dir = self.cache.directory if self.cache else None
+            self._process = context.Process(target=_worker_main, name="data-service",
+                                            args=(child_conn, self.feeds, self.poller_options, cache_dir,
+                                                  self.snapshot.version), daemon=True)
+            self._process.start()
+            child_conn.close()
+            self._receiver = threading.Thread(target=self._receive, name="data-service-receiver", daemon=True)
+            self._receiver.start()
+        else:
+            self._poller = FeedPoller(self.feeds, on_update=self._on_update, parse=self._parse,
+                                      **self.poller_options)
+            self._poller.start()
+        return self
+
+    def stop(self):
+        self._stopping = True
+        self.wake()
+        if self._poller:
+            self._poller.stop()
+            self._poller = None
+        if self._process:
+            try:
+                self._conn.send(('stop', None))
+            except (OSError, BrokenPipeError):
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._conn.close()
+            self._process = None
+        if self._receiver:
+            self._receiver.join(timeout=5)
+            self._receiver = None
+        if self.history is not None:
+            self.history.flush()
+
+    def wait_for_update(self, version=0, timeout=None, cancel=None):
+        # Block (outside the GUI loop) until a snapshot newer than `version` is published, the service stops or
+        # the optional threading.Event `cancel` is set (call wake() after setting it)
+        with self._published:
+            self._published.wait_for(lambda: (self.snapshot.version > version or self._stopping
+                                              or (cancel is not None and cancel.is_set())), timeout)
+        return self.snapshot
+
+    def wake(self):
+        # Makes every wait_for_update check its condition again, e.g. after setting its cancel event
+        with self._published:
+            self._published.notify_all()
+
+    def _publish(self, snapshot):
+        self.snapshot = snapshot
+        self.in_flight = False
+        self.refresh_count += 1
+        self.wake()
+
+    def _parse(self, content):
+        self.in_flight = True
+        try:
+            return parse_feed(content)
+        except Exception:
+            self.in_flight = False
+            raise
+
+    def _on_update(self, name, feed):
+        try:
+            self._publish(self._builder.update(name, feed))
+        finally:
+            self.in_flight = False
+        if self.cache is not None:
+            self.cache.save(name, feed)
+
+    def _receive(self):
+        while True:
+            try:
+                kind, payload = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'refreshing':
+                self.in_flight = True
+            elif kind == 'snapshot':
+                self._publish(payload)
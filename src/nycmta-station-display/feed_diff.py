@@ -0,0 +1,160 @@
+from core import stop_time
+
+
+class StationDiff:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StationDiff
+    #   Input:      stop_id (str) – station the changes apply to
+    #   Output:     The arrivals that appeared, disappeared or moved at one station between two snapshots
+    #   Description: added and removed hold arrival dicts (trip_id, route_id, arrival_time); changed holds
+    #                (old, new) pairs of arrival dicts for the same trip.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, stop_id):
+        self.stop_id = stop_id
+        self.added = []
+        self.removed = []
+        self.changed = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return (f"StationDiff({self.stop_id!r}, added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)})")
+
+
+class FeedDiff:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedDiff
+    #   Input:      timestamp (int) – header timestamp of the newer snapshot
+    #   Output:     Per-station changes between two snapshots of a feed
+    #   Description: stations maps stop_id -> StationDiff and only contains stations where something changed,
+    #                so a display can skip every station that is not in it.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, timestamp=0):
+        self.timestamp = timestamp
+        self.stations = {}
+        self.trips_added = 0
+        self.trips_removed = 0
+        self.trips_changed = 0
+        self.trips_unchanged = 0
+
+    def station(self, stop_id):
+        station = self.stations.get(stop_id)
+        if station is None:
+            station = self.stations[stop_id] = StationDiff(stop_id)
+        return station
+
+    def get(self, stop_id):
+        # StationDiff for stop_id, or None when nothing changed there
+        return self.stations.get(stop_id)
+
+    def __bool__(self):
+        return bool(self.stations)
+
+    def apply(self, board):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   apply
+        #   Input:      board (dict[str, dict[str, dict]]) – stop_id -> trip_id -> arrival, as built from the older
+        #                                                     snapshot; updated in place
+        #   Output:     None
+        #   Description: Brings a board built from the older snapshot up to date with the newer one.
+        # -------------------------------------------------------------------------------------------------------------
+        for stop_id, station in self.stations.items():
+            arrivals = board.setdefault(stop_id, {})
+            for arrival in station.removed:
+                arrivals.pop(arrival['trip_id'], None)
+            for _, arrival in station.changed:
+                arrivals[arrival['trip_id']] = arrival
+            for arrival in station.added:
+                arrivals[arrival['trip_id']] = arrival
+            if not arrivals:
+                del board[stop_id]
+
+
+class FeedDiffer:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedDiffer
+    #   Input:      None
+    #   Output:     A stateful differ that is fed consecutive snapshots of one feed
+    #   Description: Remembers every trip of the previous snapshot keyed on trip_update.trip.trip_id, together with
+    #                the serialized trip_update. A trip whose bytes did not change since the last snapshot, which
+    #                is most of them between two refreshes, is skipped without looking at its stops; the others
+    #                are compared stop by stop to produce added, removed and changed arrivals per station.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.trips = {}   # trip_id -> (serialized trip_update, {stop_id: arrival})
+
+    def diff(self, feed):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   diff
+        #   Input:      feed (gtfs_realtime_pb2.FeedMessage) – the next snapshot
+        #   Output:     FeedDiff                             – changes since the previous call (everything is
+        #                                                      "added" on the first call)
+        # -------------------------------------------------------------------------------------------------------------
+        result = FeedDiff(feed.header.timestamp)
+        previous = self.trips
+        current = {}
+
+        for entity in feed.entity:
+            if not entity.HasField('trip_update'):
+                continue
+            trip_update = entity.trip_update
+            trip_id = trip_update.trip.trip_id
+            serialized = trip_update.SerializeToString(deterministic=True)
+
+            old = previous.pop(trip_id, None)
+            if old is not None and old[0] == serialized:
+                current[trip_id] = old
+                result.trips_unchanged += 1
+                continue
+
+            stops = self._stops(trip_update)
+            current[trip_id] = (serialized, stops)
+            if old is None:
+                result.trips_added += 1
+                for stop_id, arrival in stops.items():
+                    result.station(stop_id).added.append(arrival)
+                continue
+
+            result.trips_changed += 1
+            old_stops = old[1]
+            for stop_id, arrival in stops.items():
+                old_arrival = old_stops.pop(stop_id, None)
+                if old_arrival is None:
+                    result.station(stop_id).added.append(arrival)
+                elif old_arrival != arrival:
+                    result.station(stop_id).changed.append((old_arrival, arrival))
+            for stop_id, old_arrival in old_stops.items():
+                result.station(stop_id).removed.append(old_arrival)
+
+        # Whatever is left from the previous snapshot has gone away
+        for _, stops in previous.values():
+            result.trips_removed += 1
+            for stop_id, arrival in stops.items():
+                result.station(stop_id).removed.append(arrival)
+
+        self.trips = current
+        return result
+
+    def board(self):
+        # The current state as stop_id -> trip_id -> arrival, for consumers that start from scratch
+        board = {}
+        for trip_id, (_, stops) in self.trips.items():
+            for stop_id, arrival in stops.items():
+                board.setdefault(stop_id, {})[trip_id] = arrival
+        return board
+
+    def _stops(self, trip_update):
+        trip_id = trip_update.trip.trip_id
+        route_id = trip_update.trip.route_id
+        stops = {}
+        for stu in trip_update.stop_time_update:
+            arrival_time = stop_time(stu)
+            if arrival_time:
+                stops[stu.stop_id] = {
+                    'trip_id': trip_id,
+                    'route_id': route_id,
+                    'arrival_time': arrival_time
+                }
+        return stops
@@ -0,0 +1,233 @@
+import hashlib                    # Import hashlib to detect unchanged feed bodies
+import heapq                      # Import heapq for the per-feed refresh schedule
+import logging                    # Import logging to report fetch errors without stopping the poller
+import random                     # Import random for jittered backoff
+import threading                  # Import threading for the scheduler thread
+import time                       # Import time for monotonic deadlines
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core import parse_feed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 30.0   # seconds between refreshes of a healthy feed
+DEFAULT_TIMEOUT = 10.0            # seconds before a request is abandoned
+BACKOFF_BASE = 2.0                # first retry delay after an error, in seconds
+BACKOFF_MAX = 300.0               # upper bound on the retry delay, in seconds
+
+
+class FeedState:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedState
+    #   Input:      name (str)        – feed name, e.g. 'G'
+    #               url (str)         – feed URL
+    #               interval (float)  – refresh interval in seconds
+    #   Output:     A record of everything the poller knows about one feed
+    #   Description: Holds the conditional-request validators (ETag / Last-Modified), the hash of the last body
+    #                that was parsed, the latest parsed feed and error/backoff bookkeeping.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, name, url, interval):
+        self.name = name
+        self.url = url
+        self.interval = interval
+
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+
+        self.feed = None
+        self.last_success = None   # time.time() of the last 200 or 304
+        self.last_change = None    # time.time() of the last body that differed from the previous one
+        self.failures = 0
+        self.last_error = None
+
+        self.fetch_count = 0
+        self.not_modified_count = 0
+        self.parse_count = 0
+
+
+class FeedPoller:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedPoller
+    #   Input:      feeds (dict[str, str])        – feed name -> URL (see core.feed_urls)
+    #               on_update (callable)          – called as on_update(name, feed) every time a feed changes
+    #               intervals (dict[str, float])  – optional per-feed refresh interval in seconds
+    #               default_interval (float)      – refresh interval for feeds missing from intervals
+    #               timeout (float)               – request timeout in seconds
+    #               backoff_base (float)          – first retry delay after an error
+    #               backoff_max (float)           – upper bound on the retry delay
+    #               max_workers (int)             – number of concurrent fetches (default: one per feed)
+    #               session (requests.Session)    – optional session to use instead of a new pooled one
+    #               parse (callable)              – turns a response body into the object handed to on_update
+    #   Output:     A long-running poller that keeps every feed fresh in the background
+    #   Description: Fetches all feeds concurrently over one pooled HTTP session. Every request carries
+    #                If-None-Match / If-Modified-Since, so a feed that has not changed costs a 304 and is never
+    #                downloaded or parsed again; bodies identical to the previous one are not re-parsed either.
+    #                Failed feeds are retried with exponential backoff and random jitter so they do not retry in
+    #                lock step.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feeds, on_update=None, intervals=None, default_interval=DEFAULT_REFRESH_INTERVAL,
+                 timeout=DEFAULT_TIMEOUT, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 max_workers=None, session=None, parse=parse_feed):
+        intervals = intervals or {}
+        self.states = {name: FeedState(name, url, intervals.get(name, default_interval))
+                       for name, url in feeds.items()}
+        self.on_update = on_update
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.parse = parse
+
+        self.max_workers = max_workers or max(1, len(self.states))
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._stopped = True
+        self._thread = None
+        self._executor = None
+
+    def latest(self, name):
+        # Most recent parsed feed, or None before the first successful fetch
+        return self.states[name].feed
+
+    def backoff_delay(self, failures):
+        # Exponential backoff with "equal jitter": somewhere between half and all of the capped delay
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, failures - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def poll(self, name):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   poll
+        #   Input:      name (str) – feed to fetch
+        #   Output:     bool       – True if the feed changed and on_update was called
+        #   Description: Performs one conditional fetch of a feed. Raises on network, HTTP or parse errors after
+        #                recording them in the feed's state.
+        # -------------------------------------------------------------------------------------------------------------
+        state = self.states[name]
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        try:
+            state.fetch_count += 1
+            response = self.session.get(state.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                state.not_modified_count += 1
+                self._mark_success(state)
+                return False
+            response.raise_for_status()
+
+            content = response.content
+            # The validators are only kept once the body they describe has been parsed: saved before a failed
+            # parse, they would turn every later request into a 304 and the feed would never be parsed again
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+            # Servers without validators still send the same body; skip the parse in that case too
+            content_hash = hashlib.sha1(content).digest()
+            if content_hash == state.content_hash:
+                state.etag, state.last_modified = etag, last_modified
+                self._mark_success(state)
+                return False
+
+            feed = self.parse(content)
+            state.parse_count += 1
+        except Exception as exc:
+            state.failures += 1
+            state.last_error = exc
+            raise
+
+        state.feed = feed
+        state.etag, state.last_modified = etag, last_modified
+        state.content_hash = content_hash
+        state.last_change = time.time()
+        self._mark_success(state)
+
+        if self.on_update:
+            try:
+                self.on_update(name, feed)
+            except Exception:
+                logger.exception("on_update failed for feed %s", name)
+        return True
+
+    def poll_all(self):
+        # One concurrent round over every feed, ignoring schedules; returns the names of feeds that changed
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {name: executor.submit(self.poll, name) for name in self.states}
+        changed = []
+        for name, future in futures.items():
+            try:
+                if future.result():
+                    changed.append(name)
+            except Exception as exc:
+                logger.warning("Fetching feed %s failed: %s", name, exc)
+        return changed
+
+    def start(self):
+        if not self._stopped:
+            return
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feed-poller")
+        now = time.monotonic()
+        with self._cond:
+            self._heap = [(now, name) for name in self.states]
+            heapq.heapify(self._heap)
+        self._thread = threading.Thread(target=self._run, name="feed-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread and wait:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+        self._thread = None
+        self._executor = None
+
+    def _mark_success(self, state):
+        state.failures = 0
+        state.last_error = None
+        state.last_success = time.time()
+
+    def _run(self):
+        # Scheduler thread: hands each feed to the worker pool when its deadline comes up
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, name = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                self._executor.submit(self._poll_and_reschedule, name)
+
+    def _poll_and_reschedule(self, name):
+        state = self.states[name]
+        try:
+            self.poll(name)
+            delay = state.interval
+        except Exception as exc:
+            delay = self.backoff_delay(state.failures)
+            logger.warning("Fetching feed %s failed (%d in a row), retrying in %.1fs: %s",
+                           name, state.failures, delay, exc)
+
+        with self._cond:
+            if not self._stopped:
+                heapq.heappush(self._heap, (time.monotonic() + delay, name))
+                self._cond.notify()
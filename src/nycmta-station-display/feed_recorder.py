@@ -0,0 +1,209 @@
+import argparse                   # Import argparse for the record/replay command line
+import glob                       # Import glob to list recorded snapshots
+import heapq                      # Import heapq to interleave the snapshots of several feeds
+import os                         # Import os for file path handling
+import threading                  # Import threading to replay in the background
+import time                       # Import time for capture timestamps and replay pacing
+
+from core import FEED_BASE_URL, FEED_PATHS, feed_urls
+from feed_poller import FeedPoller
+from feed_server import FeedServer, feed_key
+
+
+def snapshot_name(fetched_at):
+    # File name of a snapshot captured at fetched_at (POSIX seconds); sorts in capture order
+    return f"{int(fetched_at * 1000):013d}.pb"
+
+
+class FeedRecorder:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedRecorder
+    #   Input:      feeds (dict[str, str])  – feed name -> URL (see core.feed_urls)
+    #               directory (str)         – where the recording is written
+    #               **poller_options        – passed on to FeedPoller (intervals, timeout, backoff, ...)
+    #   Output:     A poller that saves every new feed body to disk
+    #   Description: Writes the raw bytes of every body that differs from the previous one to
+    #                '<directory>/<feed key>/<capture time in ms>.pb'. The feed key is the last segment of the
+    #                feed URL (see feed_server.feed_key), so a recording can be served by FeedServer and read by
+    #                Recording without any extra metadata.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feeds, directory, **poller_options):
+        self.directory = directory
+        self.keys = {name: feed_key(url) for name, url in feeds.items()}
+        self.snapshot_count = 0
+        self.byte_count = 0
+        # parse=bytes hands the raw body to on_update instead of a decoded FeedMessage
+        self.poller = FeedPoller(feeds, on_update=self.save, parse=bytes, **poller_options)
+
+    def save(self, name, content, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        feed_directory = os.path.join(self.directory, self.keys[name])
+        os.makedirs(feed_directory, exist_ok=True)
+        path = os.path.join(feed_directory, snapshot_name(fetched_at))
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+        self.snapshot_count += 1
+        self.byte_count += len(content)
+        return path
+
+    def start(self):
+        self.poller.start()
+        return self
+
+    def stop(self):
+        self.poller.stop()
+
+
+class Recording:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Recording
+    #   Input:      directory (str) – a directory written by FeedRecorder
+    #   Output:     Read access to the recorded snapshots of every feed
+    #   Description: `feeds` maps each feed key to its [(fetched_at, path), ...] in capture order. Snapshots are
+    #                read from disk on demand, so a long recording does not have to fit in memory.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, directory):
+        self.directory = directory
+        self.feeds = {}
+        for feed_directory in sorted(glob.glob(os.path.join(directory, '*', ''))):
+            snapshots = []
+            for path in sorted(glob.glob(os.path.join(feed_directory, '*.pb'))):
+                try:
+                    fetched_at = int(os.path.basename(path)[:-3]) / 1000
+                except ValueError:
+                    continue
+                snapshots.append((fetched_at, path))
+            if snapshots:
+                self.feeds[os.path.basename(os.path.dirname(feed_directory))] = snapshots
+
+    def __len__(self):
+        return sum(len(snapshots) for snapshots in self.feeds.values())
+
+    @property
+    def start_time(self):
+        return min((snapshots[0][0] for snapshots in self.feeds.values()), default=0)
+
+    @property
+    def duration(self):
+        end = max((snapshots[-1][0] for snapshots in self.feeds.values()), default=0)
+        return end - self.start_time
+
+    def snapshots(self, key=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   snapshots
+        #   Input:      key (str)   – feed key, e.g. 'gtfs-g' (default: every feed, interleaved by capture time)
+        #   Output:     iterator of (fetched_at, key, content) in capture order
+        # -------------------------------------------------------------------------------------------------------------
+        keys = [key] if key is not None else list(self.feeds)
+        streams = [[(fetched_at, feed, path) for fetched_at, path in self.feeds[feed]] for feed in keys]
+        for fetched_at, feed, path in heapq.merge(*streams):
+            with open(path, 'rb') as f:
+                yield fetched_at, feed, f.read()
+
+
+class FeedReplayer:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedReplayer
+    #   Input:      recording (Recording)  – what to replay
+    #               server (FeedServer)    – server to publish to (default: a new one on a free local port)
+    #               speed (float)          – 1 replays in real time, 10 ten times faster
+    #               loop (bool)            – start over at the end of the recording
+    #   Output:     A local stand-in for the MTA endpoint that plays a recording back
+    #   Description: Publishes every snapshot to the server at its recorded offset from the start of the
+    #                recording, divided by speed. Point core.feed_urls (or app.py --feed-url) at base_url and
+    #                the poller sees the same sequence of bodies the recorder saw.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, recording, server=None, speed=1.0, loop=False):
+        self.recording = recording
+        self.server = server or FeedServer()
+        self.speed = speed
+        self.loop = loop
+        self.published_count = 0
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return self.server.base_url
+
+    def run(self):
+        # Blocking replay; start() runs this in a background thread
+        while not self._stop.is_set():
+            started = time.monotonic()
+            start_time = self.recording.start_time
+            for fetched_at, key, content in self.recording.snapshots():
+                delay = started + (fetched_at - start_time) / self.speed - time.monotonic()
+                if self._stop.wait(max(0, delay)):
+                    return
+                self.server.publish(key, content)
+                self.published_count += 1
+            if not self.loop:
+                break
+        self.finished.set()
+
+    def start(self):
+        self.server.start()
+        self._thread = threading.Thread(target=self.run, name="feed-replayer", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record live feeds to disk and replay them offline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="poll feeds and save every new body")
+    record_parser.add_argument('directory')
+    record_parser.add_argument('feeds', nargs='*', default=['G'], help=f"any of {', '.join(FEED_PATHS)}")
+    record_parser.add_argument('--interval', type=float, default=30)
+    record_parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    record_parser.add_argument('--feed-url', default=FEED_BASE_URL)
+
+    replay_parser = subparsers.add_parser('replay', help="serve a recording over local HTTP")
+    replay_parser.add_argument('directory')
+    replay_parser.add_argument('--speed', type=float, default=1.0, help="replay speed, e.g. 10 for ten times faster")
+    replay_parser.add_argument('--port', type=int, default=8000)
+    replay_parser.add_argument('--loop', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        recorder = FeedRecorder(feed_urls(args.feeds, args.feed_url), args.directory,
+                                default_interval=args.interval).start()
+        print(f"Recording {', '.join(args.feeds)} to {args.directory}")
+        try:
+            if args.duration:
+                time.sleep(args.duration)
+            else:
+                threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorder.stop()
+        print(f"{recorder.snapshot_count} snapshots, {recorder.byte_count / 1024:.0f} KiB")
+    else:
+        recording = Recording(args.directory)
+        replayer = FeedReplayer(recording, FeedServer(port=args.port), speed=args.speed, loop=args.loop)
+        print(f"Replaying {len(recording)} snapshots of {', '.join(recording.feeds)} "
+              f"({recording.duration:.0f} s at {args.speed}x) at {replayer.start()}")
+        try:
+            while not replayer.finished.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            replayer.stop()
+
+
+if __name__ == "__main__":
+    # Usage: python feed_recorder.py record <directory> [feed ...] [--interval s] [--duration s]
+    #        python feed_recorder.py replay <directory> [--speed x] [--port n] [--loop]
+    main()
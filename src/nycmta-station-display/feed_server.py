@@ -0,0 +1,139 @@
+import hashlib                    # Import hashlib to build ETags
+import os                         # Import os for file path handling
+import sys                        # Import sys for command line arguments
+import threading                  # Import threading to serve in the background
+import time                       # Import time for Last-Modified bookkeeping
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+
+def feed_key(path):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   feed_key
+    #   Input:      path (str) – request path, e.g. '/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-g'
+    #   Output:     str        – the last path segment, e.g. 'gtfs-g'
+    #   Description: Maps an MTA-style feed URL onto the name of a recorded file, so core.feed_urls can simply
+    #                be pointed at the stand-in server.
+    # -----------------------------------------------------------------------------------------------------------------
+    path = unquote(path.split('?', 1)[0])
+    return path.rstrip('/').rsplit('/', 1)[-1]
+
+
+class _FeedRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        entry = self.server.feed_server.lookup(feed_key(self.path))
+        if entry is None:
+            self.send_error(404)
+            return
+        content, etag, modified = entry
+        last_modified = formatdate(modified, usegmt=True)
+
+        if self._not_modified(etag, modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _not_modified(self, etag, modified):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FeedServer:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FeedServer
+    #   Input:      directory (str)  – optional directory of recorded feeds named '<feed key>.pb', e.g. 'gtfs-g.pb'
+    #               host (str)       – interface to bind
+    #               port (int)       – port to bind (0 picks a free port)
+    #   Output:     A local HTTP stand-in for the MTA feed endpoint
+    #   Description: Serves recorded .pb files (or bytes published in memory) with ETag and Last-Modified headers
+    #                and answers conditional requests with 304, like the real endpoint. Used to exercise the
+    #                poller without network access.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, directory=None, host='127.0.0.1', port=0):
+        self.directory = directory
+        self.request_count = 0
+        self._published = {}
+        self._file_cache = {}
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), _FeedRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.feed_server = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def publish(self, key, content, modified=None):
+        # Replace the body served for a feed key, e.g. to step through a sequence of snapshots
+        entry = (content, f'"{hashlib.sha1(content).hexdigest()}"', modified or time.time())
+        with self._lock:
+            self._published[key] = entry
+
+    def lookup(self, key):
+        with self._lock:
+            self.request_count += 1
+            entry = self._published.get(key)
+        if entry is not None or not self.directory:
+            return entry
+
+        path = os.path.join(self.directory, key + '.pb')
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._file_cache.get(path)
+        if cached is None or cached[2] != modified:
+            with open(path, 'rb') as f:
+                content = f.read()
+            cached = (content, f'"{hashlib.sha1(content).hexdigest()}"', modified)
+            self._file_cache[path] = cached
+        return cached
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="feed-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    # Usage: python feed_server.py <directory of .pb files> [port]
+    server = FeedServer(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    print(f"Serving {sys.argv[1]} at {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
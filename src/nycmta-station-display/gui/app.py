@@ -1,32 +1,153 @@
+import argparse
+import os
+import sys
+import threading
 import pygame
+from screens.frame_scheduler import FrameScheduler
+from screens.profiler import FrameProfiler, ProfilerOverlay
 from screens.screen_manager import ScreenManager
 
+# The feed pipeline lives one directory up, next to core.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core import FEED_BASE_URL, feed_urls
+from snapshot_cache import SNAPSHOT_DIR
+
 WIDTH, HEIGHT = 1600, 900
 FRAME_RATE = 60
+IDLE_FRAME_RATE = 1
+
+def run_frame(manager, profiler, events, overlay=None):
+    # One frame of the main loop, timed stage by stage; returns False when the window was closed
+    profiler.begin_frame()
+    running = True
+    for event in events:
+        if event.type == pygame.QUIT:
+            running = False
+        else:
+            manager.handle_event(event)
+    profiler.mark('events')
+
+    manager.update()
+    profiler.mark('update')
+
+    rects = manager.render()
+    if overlay:
+        rects = overlay.draw(manager.screen, rects)
+    profiler.mark('render')
+
+    manager.present(rects)
+    profiler.mark('present')
+    profiler.end_frame()
+    return running
+
+
+def start_data_service(station_id='G35N', feed_names=('G',), base_url=FEED_BASE_URL, data_process=False,
+                       server_url=None, cache_dir=SNAPSHOT_DIR):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   start_data_service
+    #   Input:      see main()
+    #   Output:     DataService or RemoteDataService – started; the loop only ever reads its latest snapshot
+    #   Description: The feed pipeline (requests, the protobuf descriptors) is imported here rather than at the top
+    #                of the file, so kiosk.py can put a splash frame on the display before paying for it.
+    # -----------------------------------------------------------------------------------------------------------------
+    if server_url:
+        # Another process (or another Pi) runs the feed pipeline; subscribe to this station's arrivals
+        from station_server import RemoteDataService
+        return RemoteDataService(server_url, [station_id]).start()
+    # With a cache the last known arrivals are on screen from the first frame, even without a network
+    from data_service import DataService
+    return DataService(feed_urls(feed_names, base_url), use_process=data_process, cache_dir=cache_dir).start()
+
+
+def load_schedule(manager):
+    # The static schedule fills in for stale or missing realtime data; run off the main loop
+    from schedule import ScheduleEngine
+    manager.set_schedule(ScheduleEngine.from_csv().prepare())
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("MTA + Weather Display")
-    clock = pygame.time.Clock()
-    frame_rate = 60
 
-    manager = ScreenManager(screen, frame_rate)
+def load_static(manager):
+    # Route colors and headsigns for the arrival board; the cache is memory-mapped, but it is rebuilt from the GTFS
+    # text files when they changed, so run off the main loop
+    from static_cache import StaticGTFS
+    try:
+        manager.set_static(StaticGTFS.load())
+    except OSError:
+        pass  # no GTFS files: the board keeps the default route color and shows no headsigns
+
+
+def run_loop(manager, scheduler, profiler, overlay=None):
+    # Main loop, until the window is closed
     running = True
+    preloading = True
 
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            else:
-                manager.handle_event(event)
+        # Full frame rate while the screen animates, otherwise sleep until an event or its next deadline
+        events = scheduler.wait(manager.current_screen)
+
+        # F3 toggles the profiling overlay
+        if any(event.type == pygame.KEYDOWN and event.key == pygame.K_F3 for event in events):
+            overlay = None if overlay else ProfilerOverlay(profiler, pos=(10, int(HEIGHT * 0.10) + 10))
+            manager.current_screen.invalidate()
+
+        running = run_frame(manager, profiler, events, overlay)
 
-        manager.update()
-        manager.render()
-        pygame.display.flip()
-        clock.tick(frame_rate)
+        # Build the remaining screens one per frame once something is on the display
+        if preloading:
+            preloading = manager.preload_next()
+
+
+def main(dirty_rects=False, adaptive=True, station_id='G35N', feed_names=('G',), base_url=FEED_BASE_URL,
+         data=True, data_process=False, profile=False, server_url=None, cache_dir=SNAPSHOT_DIR, schedule=False):
+    # Fetching and parsing run in the background; the loop only ever reads the latest published snapshot
+    data_service = None
+    if data:
+        data_service = start_data_service(station_id, feed_names, base_url, data_process, server_url, cache_dir)
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("MTA + Weather Display")
+    frame_rate = FRAME_RATE
+
+    manager = ScreenManager(screen, frame_rate, dirty_rects=dirty_rects,
+                            data_service=data_service, station_id=station_id)
+    scheduler = FrameScheduler(frame_rate, IDLE_FRAME_RATE, adaptive=adaptive)
+    threading.Thread(target=load_static, args=(manager,), name="static-loader", daemon=True).start()
+    if schedule:
+        threading.Thread(target=load_schedule, args=(manager,), name="schedule-loader", daemon=True).start()
+    profiler = FrameProfiler()
+    overlay = ProfilerOverlay(profiler, pos=(10, int(HEIGHT * 0.10) + 10)) if profile else None
+    run_loop(manager, scheduler, profiler, overlay)
 
     pygame.quit()
+    if data_service:
+        data_service.stop()
+
+def build_parser(description="MTA station display"):
+    # Command line shared by app.py and kiosk.py
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="only repaint and push the regions that changed each frame")
+    parser.add_argument('--fixed-fps', action='store_true',
+                        help=f"always run at {FRAME_RATE} FPS, even when nothing is animating")
+    parser.add_argument('--profile', action='store_true', help="show per-stage frame times (toggle with F3)")
+    parser.add_argument('--station', default='G35N', help="stop_id to show arrivals for")
+    parser.add_argument('--feeds', nargs='+', default=['G'], help="feeds to poll (keys of core.FEED_PATHS)")
+    parser.add_argument('--feed-url', default=FEED_BASE_URL, help="feed URL prefix, e.g. a local feed_server.py")
+    parser.add_argument('--no-data', action='store_true', help="run without fetching any feeds")
+    parser.add_argument('--data-process', action='store_true',
+                        help="fetch and parse feeds in a subprocess instead of a background thread")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="do not load or save the last known arrivals (see snapshot_cache.py)")
+    parser.add_argument('--schedule', action='store_true',
+                        help="show scheduled departures when realtime data is stale or lacks a route")
+    parser.add_argument('--server', metavar='URL',
+                        help="subscribe to a station_server.py instead of polling the feeds, e.g. http://pi:8100/")
+    return parser
+
 
 if __name__ == "__main__":
-    main()
+    args = build_parser().parse_args()
+    main(dirty_rects=args.dirty_rects, adaptive=not args.fixed_fps, station_id=args.station,
+         feed_names=args.feeds, base_url=args.feed_url, data=not args.no_data, data_process=args.data_process,
+         profile=args.profile, server_url=args.server, cache_dir=None if args.no_cache else SNAPSHOT_DIR,
+         schedule=args.schedule)
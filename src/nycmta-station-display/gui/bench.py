@@ -0,0 +1,417 @@
+import argparse                   # Import argparse for the benchmark command line
+import os                         # Import os to select the SDL video driver
+import statistics                 # Import statistics to summarize frame times
+import sys                        # Import sys to reach the feed modules one directory up
+import threading                  # Import threading to publish synthetic feeds in the background
+import time                       # Import time for high resolution timers
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")   # Headless unless a driver was chosen explicitly
+
+import pygame
+from screens.home_screen import HomeScreen
+from screens.settings_screen import SettingsScreen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCREENS = {
+    "HomeScreen": HomeScreen,
+    "SettingsScreen": SettingsScreen,
+}
+
+
+def bench_screen(screen_class, display, frames, frame_rate=60, dirty_rects=False):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_screen
+    #   Input:      screen_class (type)       – BaseScreen subclass to run
+    #               display (pygame.Surface)  – display surface
+    #               frames (int)              – number of frames to time
+    #               dirty_rects (bool)        – use render_dirty() and display.update(rects) instead of a full flip
+    #   Output:     list[float]               – seconds spent in update + render + flip for every frame
+    # -----------------------------------------------------------------------------------------------------------------
+    screen = screen_class(display, frame_rate)
+    timings = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        screen.update()
+        if dirty_rects:
+            rects = screen.render_dirty()
+            if rects is None:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+        else:
+            screen.render()
+            pygame.display.flip()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_hover(screen_class, display, frames, frame_rate=60, dirty_rects=False):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_hover
+    #   Input:      screen_class (type)       – BaseScreen subclass to run
+    #               display (pygame.Surface)  – display surface
+    #               frames (int)              – number of frames to time
+    #               dirty_rects (bool)        – use render_dirty() and display.update(rects) instead of a full flip
+    #   Output:     list[float]               – seconds spent in events + update + render + present for every frame
+    #   Description: Like bench_screen, but every frame hands the screen a MOUSEMOTION event from a pointer that
+    #                sweeps the display row by row, so hover changes on and off the buttons are part of the cost.
+    # -----------------------------------------------------------------------------------------------------------------
+    screen = screen_class(display, frame_rate)
+    width, height = display.get_size()
+    step = max(1, (width * height) // (frames * 40))
+    timings = []
+    for frame in range(frames):
+        offset = frame * step * 40
+        pos = ((offset % width), (offset // width * 40) % height)
+        start = time.perf_counter()
+        screen.handle_event(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+        screen.update()
+        if dirty_rects:
+            rects = screen.render_dirty()
+            if rects is None:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+        else:
+            screen.render()
+            pygame.display.flip()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_blits(display, frames, frame_rate=60):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_blits
+    #   Input:      display (pygame.Surface)  – display surface
+    #               frames (int)              – frames per variant
+    #   Output:     dict[str, list[float]]    – seconds spent drawing the trains for every frame, per variant
+    #   Description: Draws HomeScreen's two trains at the same positions three ways: filling the screen and
+    #                alpha-blitting the scaled images (the old full-screen approach), filling the screen and
+    #                blitting the prepared sprites, and the SpriteLayer restoring only the rects under the trains.
+    # -----------------------------------------------------------------------------------------------------------------
+    from screens.sprites import SpriteLayer
+
+    screen = HomeScreen(display, frame_rate)
+    background = pygame.Surface(display.get_size()).convert()
+    background.fill(screen.SCREEN_BG)
+    train1_y, train2_y = screen.lane1.y, screen.lane2.y
+    layer = SpriteLayer()
+    results = {"fill + alpha blit": [], "fill + sprite blit": [], "sprite layer": []}
+    for name, timings in results.items():
+        display.blit(background, (0, 0))
+        layer.forget()
+        for frame in range(frames):
+            x1 = screen.train1_path[frame % len(screen.train1_path)]
+            x2 = screen.train2_path[frame % len(screen.train2_path)]
+            start = time.perf_counter()
+            if name == "fill + alpha blit":
+                display.fill(screen.SCREEN_BG)
+                display.blit(screen.train_flipped, (x1, train1_y))
+                display.blit(screen.train_image, (x2, train2_y))
+            elif name == "fill + sprite blit":
+                display.fill(screen.SCREEN_BG)
+                display.blit(screen.train_flipped_sprite, (x1, train1_y))
+                display.blit(screen.train_sprite, (x2, train2_y))
+            else:
+                layer.set_sprites(((screen.train_flipped_sprite, x1, train1_y),
+                                   (screen.train_sprite, x2, train2_y)))
+                layer.draw(display, background)
+            timings.append(time.perf_counter() - start)
+    return results
+
+
+def bench_stages(display, frames, screen_name, dirty_rects=False, frame_rate=60):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_stages
+    #   Input:      display (pygame.Surface)  – display surface
+    #               frames (int)              – number of frames to time
+    #               screen_name (str)         – screen to run, e.g. "HomeScreen"
+    #               dirty_rects (bool)        – run the ScreenManager in dirty-rect mode
+    #   Output:     dict[str, tuple]          – FrameProfiler.summary(): stage (and 'frame') -> (p50, p95, p99, max)
+    #   Description: Runs app.py's own main-loop stages (events, update, render, present) through a ScreenManager
+    #                and FrameProfiler, without frame pacing or feeds, so the per-stage split is the one the
+    #                --profile overlay shows on the display.
+    # -----------------------------------------------------------------------------------------------------------------
+    import app
+    from screens.profiler import FrameProfiler
+    from screens.screen_manager import ScreenManager
+
+    manager = ScreenManager(display, frame_rate, dirty_rects=dirty_rects)
+    manager.change_screen(screen_name)
+    profiler = FrameProfiler(capacity=frames)
+    for _ in range(frames):
+        app.run_frame(manager, profiler, pygame.event.get())
+    return profiler.summary()
+
+
+BOARD_ROUTES = ('1', '2', '3', '4', 'A', 'C', 'E', 'G', 'L', 'N', 'Q', '7')
+
+
+def board_trains(count, now, frame=0, change='none'):
+    # Synthetic upcoming trains for bench_board; 'countdowns' moves every countdown by a minute each frame, 'rows'
+    # moves every train up the board by one row each frame
+    shift = frame % len(BOARD_ROUTES) if change == 'rows' else 0
+    minute = 60 * (frame % 2) if change == 'countdowns' else 0
+    return [{'trip_id': f"{i:06d}_{BOARD_ROUTES[(i + shift) % len(BOARD_ROUTES)]}..N",
+             'route_id': BOARD_ROUTES[(i + shift) % len(BOARD_ROUTES)],
+             'arrival_time': now + 30 + 90 * i + minute} for i in range(count)]
+
+
+def bench_board(display, frames, rows, change='none', dirty_rects=False, cached=True, frame_rate=60):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_board
+    #   Input:      display (pygame.Surface)  – display surface
+    #               frames (int)              – number of frames to time
+    #               rows (int)                – rows on the board, which is stretched over the whole display (far
+    #                                           larger than HomeScreen's board; run with --size 1510 358 to match
+    #                                           the board rect of a 1600x900 HomeScreen)
+    #               change (str)              – what changes every frame: 'none' (a frame between two minutes),
+    #                                           'countdowns' (every countdown, as when a minute passes) or 'rows'
+    #                                           (every row's train, as after a refresh)
+    #               dirty_rects (bool)        – present only the rects the board redrew instead of a full flip
+    #               cached (bool)             – False renders every row with font renders each frame, the way a
+    #                                           board without the row cache and the digit atlas would
+    #   Output:     list[float]               – seconds spent in tick + draw + present for every frame
+    # -----------------------------------------------------------------------------------------------------------------
+    from screens.arrival_board import ArrivalBoard, RouteStyles
+    from screens.layout import SCREEN_BG, Box, Layout
+    from screens.utils import get_font
+
+    try:
+        from static_cache import StaticGTFS
+        styles = RouteStyles(StaticGTFS.load())
+    except OSError:
+        styles = RouteStyles()
+    board = ArrivalBoard(rows, styles)
+    layout = Layout(Box([board]))
+    layout.resize(display.get_size())
+    now = int(time.time())
+    timings = []
+    for frame in range(frames):
+        trains = board_trains(rows, now, frame, change)
+        start = time.perf_counter()
+        if cached:
+            if change != 'none' or frame == 0:
+                board.set_trains(trains, 'G35N')
+            board.tick(now)
+            background, rects = layout.compose()
+            if dirty_rects and rects is not None:
+                for rect in rects:
+                    display.blit(background, rect, rect)
+                pygame.display.update(rects)
+            else:
+                layout.repaint(display)
+                pygame.display.flip()
+        else:
+            display.fill(SCREEN_BG)
+            height = display.get_height() // rows
+            font, headsign_font = get_font(board.font_name, int(height * 0.55)), get_font(board.font_name, height // 2)
+            for index, train in enumerate(trains):
+                y = index * height
+                color, text_color = styles.colors(train['route_id'])
+                pygame.draw.circle(display, color, (height // 2, y + height // 2), int(height * 0.4))
+                label = font.render(train['route_id'], True, text_color)
+                display.blit(label, label.get_rect(center=(height // 2, y + height // 2)))
+                headsign = styles.headsign(train['trip_id'], train['route_id'], 'G35N')
+                display.blit(headsign_font.render(headsign, True, board.text_color), (height, y))
+                countdown = font.render(f"{(train['arrival_time'] - now) // 60} min", True, board.text_color)
+                display.blit(countdown, (display.get_width() - countdown.get_width() - height // 4, y))
+            pygame.display.flip()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def bench_data_service(display, frames, use_process=False, interval=0.5, routes=None, frame_rate=60):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_data_service
+    #   Input:      display (pygame.Surface)  – display surface
+    #               frames (int)              – number of frames to time
+    #               use_process (bool)        – run the DataService worker in a subprocess instead of a thread
+    #               interval (float)          – seconds between synthetic feed refreshes (also the poll interval)
+    #               routes (list[str])        – routes in the synthetic feed (default: every route)
+    #   Output:     (list[float], list[bool]) – frame times, and whether a refresh was in flight during each frame
+    #   Description: Runs HomeScreen at its normal frame rate against a DataService that polls a local FeedServer,
+    #                which publishes a new synthetic feed every `interval` seconds, so the frames that overlap a
+    #                fetch/parse/index can be compared with the rest.
+    # -----------------------------------------------------------------------------------------------------------------
+    from data_service import DataService
+    from feed_server import FeedServer
+    from synthetic_feed import make_feed
+
+    server = FeedServer()
+    base_url = server.start()
+    stop = threading.Event()
+
+    def publish():
+        seed = 0
+        while not stop.is_set():
+            feed = make_feed(routes, seed=seed, now=int(time.time()))
+            server.publish('all', feed.SerializeToString())
+            seed += 1
+            stop.wait(interval)
+
+    publisher = threading.Thread(target=publish, daemon=True)
+    publisher.start()
+    service = DataService({'all': base_url + 'all'}, use_process=use_process, default_interval=interval).start()
+    service.wait_for_update(timeout=30)
+
+    screen = HomeScreen(display, frame_rate)
+    screen.data_service = service
+    screen.station_id = 'G35N'
+    clock = pygame.time.Clock()
+    timings, in_flight = [], []
+    try:
+        for _ in range(frames):
+            clock.tick(frame_rate)
+            busy = service.in_flight
+            start = time.perf_counter()
+            screen.update()
+            screen.render()
+            pygame.display.flip()
+            timings.append(time.perf_counter() - start)
+            in_flight.append(busy or service.in_flight)
+    finally:
+        stop.set()
+        service.stop()
+        server.stop()
+    return timings, in_flight
+
+
+def bench_first_frame(display, cache_dir, offline=False, timeout=10.0, routes=None, frame_rate=60):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   bench_first_frame
+    #   Input:      display (pygame.Surface)  – display surface
+    #               cache_dir (str)           – snapshot cache directory (empty for a cold start)
+    #               offline (bool)            – point the data service at a port nobody listens on
+    #               timeout (float)           – give up after this many seconds
+    #               routes (list[str])        – routes in the synthetic feed (default: every route)
+    #   Output:     float or None             – seconds from creating the DataService to the first frame that
+    #                                           shows arrivals, or None if none was shown within the timeout
+    #   Description: Starts the data service the way app.py does, builds HomeScreen and renders frames until
+    #                the banner shows trains. The feed is served by a local FeedServer; after an online run the
+    #                cache directory holds the snapshot a warm start loads.
+    # -----------------------------------------------------------------------------------------------------------------
+    from data_service import DataService
+    from feed_server import FeedServer
+    from synthetic_feed import make_feed
+
+    server = FeedServer()
+    url = server.start() + 'all'
+    server.publish('all', make_feed(routes, now=int(time.time())).SerializeToString())
+    if offline:
+        server.stop()
+
+    start = time.perf_counter()
+    service = DataService({'all': url}, cache_dir=cache_dir, timeout=1).start()
+    screen = HomeScreen(display, frame_rate)
+    screen.data_service = service
+    screen.station_id = 'G35N'
+    elapsed = None
+    try:
+        while time.perf_counter() - start < timeout:
+            screen.update()
+            screen.render()
+            pygame.display.flip()
+            if screen.arrivals:
+                elapsed = time.perf_counter() - start
+                break
+            time.sleep(0.001)
+    finally:
+        service.stop()
+        if not offline:
+            server.stop()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmark of the GUI screens")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--size', type=int, nargs=2, default=[1600, 900], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--dirty-rects', action='store_true', help="benchmark the dirty-rect rendering mode")
+    parser.add_argument('--data-service', choices=['thread', 'process'],
+                        help="time HomeScreen while a DataService refreshes synthetic feeds in the background")
+    parser.add_argument('--refresh', type=float, default=0.5, help="seconds between feed refreshes (--data-service)")
+    parser.add_argument('--blits', action='store_true',
+                        help="compare the cost of drawing the trains: alpha blits vs. prepared sprites")
+    parser.add_argument('--first-frame', action='store_true',
+                        help="time to the first frame with arrivals, with a cold and a warm snapshot cache")
+    parser.add_argument('--hover', action='store_true',
+                        help="move a pointer across the screen every frame, so hover changes are timed too")
+    parser.add_argument('--board', type=int, nargs='+', metavar='ROWS',
+                        help="time the arrival board, stretched over the whole display, with these row counts: steady "
+                             "frames, a minute passing and a refresh, against rendering every row from fonts each "
+                             "frame")
+    parser.add_argument('--stages', action='store_true',
+                        help="split every screen's frame time into app.py's main-loop stages (p50/p95/p99/max)")
+    parser.add_argument('screens', nargs='*', default=list(SCREENS))
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    display = pygame.display.set_mode(tuple(args.size))
+    if args.blits:
+        print(f"{'trains':>20} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8}")
+        for name, timings in bench_blits(display, args.frames).items():
+            print(f"{name:>20} {statistics.mean(timings) * 1000:>8.2f} {statistics.median(timings) * 1000:>8.2f} "
+                  f"{max(timings) * 1000:>8.2f}")
+        pygame.quit()
+        return
+    if args.first_frame:
+        import tempfile
+        with tempfile.TemporaryDirectory() as cache_dir:
+            runs = (("cold cache", False), ("warm cache", False), ("warm, offline", True))
+            # Offline with a cold cache never shows arrivals; it gets a directory of its own and a short timeout
+            with tempfile.TemporaryDirectory() as empty_dir:
+                results = [("cold, offline", bench_first_frame(display, empty_dir, offline=True, timeout=3))]
+            results += [(label, bench_first_frame(display, cache_dir, offline)) for label, offline in runs]
+        print(f"{'start':>16} {'first frame ms':>15}")
+        for label, elapsed in results:
+            print(f"{label:>16} {elapsed * 1000 if elapsed is not None else float('nan'):>15.1f}"
+                  f"{'' if elapsed is not None else '  (no arrivals shown)'}")
+        pygame.quit()
+        return
+    if args.board:
+        print(f"{'rows':>5} {'frames':>12} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8}")
+        runs = (("steady", 'none', True), ("minute", 'countdowns', True), ("refresh", 'rows', True),
+                ("uncached", 'countdowns', False))
+        for rows in args.board:
+            for label, change, cached in runs:
+                timings = bench_board(display, args.frames, rows, change, args.dirty_rects, cached)
+                print(f"{rows:>5} {label:>12} {statistics.mean(timings) * 1000:>8.2f} "
+                      f"{statistics.median(timings) * 1000:>8.2f} {max(timings) * 1000:>8.2f}")
+        pygame.quit()
+        return
+    if args.stages:
+        for name in args.screens:
+            print(f"{name} - {args.frames} frames{' (dirty rects)' if args.dirty_rects else ''}")
+            print(f"{'stage':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for stage, timings in bench_stages(display, args.frames, name, args.dirty_rects).items():
+                print(f"{stage:>10} " + " ".join(f"{value * 1000:>8.3f}" for value in timings))
+        pygame.quit()
+        return
+    if args.data_service:
+        timings, in_flight = bench_data_service(display, args.frames, args.data_service == 'process', args.refresh)
+        print(f"{'frames':>16} {'count':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for label, flag in (("refreshing", True), ("idle", False)):
+            selected = [t for t, busy in zip(timings, in_flight) if busy == flag]
+            print(f"{label:>16} {len(selected):>8} {percentile(selected, 0.5) * 1000:>8.2f} "
+                  f"{percentile(selected, 0.99) * 1000:>8.2f} {max(selected, default=0) * 1000:>8.2f}")
+        pygame.quit()
+        return
+
+    print(f"{'screen':>16} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8}")
+    for name in args.screens:
+        bench = bench_hover if args.hover else bench_screen
+        timings = bench(SCREENS[name], display, args.frames, dirty_rects=args.dirty_rects)
+        print(f"{name:>16} {statistics.mean(timings) * 1000:>8.2f} {statistics.median(timings) * 1000:>8.2f} "
+              f"{max(timings) * 1000:>8.2f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
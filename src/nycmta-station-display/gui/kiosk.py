@@ -0,0 +1,230 @@
+import time                       # Import time first, to time everything that follows
+START = time.perf_counter()
+
+import os                         # Import os for the process start time
+import sys                        # Import sys to hide pkg_resources while pygame is imported
+import threading                  # Import threading for the background loader
+from contextlib import contextmanager
+
+SPLASH_BUDGET = 0.5               # seconds from process start to the splash frame
+SPLASH_FPS = 20                   # splash refresh rate while the loader runs
+SPLASH_BG = (0, 0, 0)
+SPLASH_FG = (255, 255, 255)
+
+
+def process_age():
+    # Seconds since the process was started (0.0 where /proc is not available), so interpreter start-up and
+    # site imports count toward time-to-first-frame too
+    try:
+        with open('/proc/self/stat', 'rb') as f:
+            fields = f.read().rsplit(b')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return max(0.0, time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+class StartupProfile:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StartupProfile
+    #   Input:      start (float) – time.perf_counter() at the top of this file
+    #   Output:     Timings of the start-up stages and milestones, printed like `python -X importtime`
+    #   Description: stage(name) is a context manager; stages nest (per thread) and, like -X importtime, every
+    #                stage is reported with its self time and its cumulative time, children before parents.
+    #                mark(name) records a milestone (splash, first frame) relative to the process start.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, start):
+        self.start = start
+        self.offset = max(0.0, process_age() - (time.perf_counter() - start))
+        self.rows = []          # (depth, name, self seconds, cumulative seconds)
+        self.milestones = []    # (name, seconds since process start)
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._local.__dict__.setdefault('stack', [])
+        if threading.current_thread() is not threading.main_thread():
+            name = f"{threading.current_thread().name}: {name}"
+        stack.append(0.0)
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.rows.append((len(stack), name, elapsed - children, elapsed))
+
+    def elapsed(self):
+        # Seconds since the process was started
+        return self.offset + time.perf_counter() - self.start
+
+    def mark(self, name):
+        at = self.elapsed()
+        self.milestones.append((name, at))
+        return at
+
+    def report(self, file=None, budget=SPLASH_BUDGET):
+        file = file or sys.stderr
+        print("startup time: self [us] | cumulative | stage", file=file)
+        for depth, name, self_time, cumulative in self.rows:
+            print(f"startup time: {self_time * 1e6:>9.0f} | {cumulative * 1e6:>10.0f} | {'  ' * depth}{name}",
+                  file=file)
+        print(f"startup time: interpreter and site imports {self.offset * 1000:.1f} ms", file=file)
+        for name, at in self.milestones:
+            over = " (over the splash budget)" if name == 'splash' and at > budget else ""
+            print(f"startup time: {name} at {at * 1000:.1f} ms{over}", file=file)
+
+
+def import_pygame():
+    # pygame.pkgdata imports pkg_resources (all of setuptools' vendored packages) only to locate pygame's bundled
+    # default font and icon, and falls back to plain file access when it is missing. Hiding it while pygame is
+    # imported takes most of the import time off every start; other modules can still import it later.
+    hidden = 'pkg_resources' not in sys.modules
+    if hidden:
+        sys.modules['pkg_resources'] = None
+    try:
+        import pygame
+    finally:
+        if hidden and sys.modules.get('pkg_resources', 0) is None:
+            del sys.modules['pkg_resources']
+    return pygame
+
+
+def draw_splash(pygame, screen, status):
+    # Title and loading status in pygame's bundled default font, which needs no font lookup
+    width, height = screen.get_size()
+    screen.fill(SPLASH_BG)
+    title = pygame.font.Font(None, height // 8).render("MTA Station Display", True, SPLASH_FG)
+    screen.blit(title, title.get_rect(center=(width // 2, height // 2 - title.get_height() // 2)))
+    line = pygame.font.Font(None, height // 20).render(status, True, SPLASH_FG)
+    screen.blit(line, line.get_rect(center=(width // 2, height // 2 + line.get_height())))
+    pygame.display.flip()
+
+
+class StartupLoader:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StartupLoader
+    #   Input:      profile (StartupProfile) – where the loader's stages are recorded
+    #               args (Namespace)         – parsed command line (see app.build_parser)
+    #   Output:     A background thread that does the slow part of the start-up behind the splash
+    #   Description: Starts the data service, which imports requests and the protobuf descriptors and loads the
+    #                snapshot cache. Nothing here touches the display, which stays with the main thread.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, profile, args):
+        self.profile = profile
+        self.args = args
+        self.status = "Loading..."
+        self.data_service = None
+        self.error = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="loader", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        import app
+
+        args = self.args
+        try:
+            if not args.no_data:
+                with self.profile.stage('data service'):
+                    self.status = "Loading arrivals..."
+                    self.data_service = app.start_data_service(
+                        args.station, args.feeds, args.feed_url, args.data_process, args.server,
+                        None if args.no_cache else app.SNAPSHOT_DIR)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.done.set()
+
+
+def main(args, profile, budget=SPLASH_BUDGET, exit_after_first_frame=False):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   main
+    #   Input:      args (Namespace)              – parsed command line (see app.build_parser)
+    #               profile (StartupProfile)      – start-up timings so far
+    #               budget (float)                – seconds from process start within which the splash should show
+    #               exit_after_first_frame (bool) – stop after the first real frame, to measure the start-up
+    #   Output:     None
+    #   Description: Same display as app.py, ordered for the shortest boot: the display and a splash frame come
+    #                first; the feed pipeline then loads in a StartupLoader thread while the main thread resolves
+    #                the fonts (screens/fonts.py) and builds the first screen, and keeps the splash handling events
+    #                until the loader is done. The start-up timings are printed once the first frame is on the
+    #                display.
+    # -----------------------------------------------------------------------------------------------------------------
+    import app
+    import pygame
+    from screens import fonts
+    from screens.frame_scheduler import FrameScheduler
+    from screens.profiler import FrameProfiler, ProfilerOverlay
+    from screens.screen_manager import ScreenManager
+
+    with profile.stage('display'):
+        pygame.display.init()
+        pygame.font.init()
+        screen = pygame.display.set_mode((app.WIDTH, app.HEIGHT))
+        pygame.display.set_caption("MTA + Weather Display")
+    loader = StartupLoader(profile, args).start()
+    with profile.stage('splash'):
+        status = loader.status
+        draw_splash(pygame, screen, status)
+    profile.mark('splash')
+
+    # The rest of pygame (mixer, joystick, ...) is initialized once the splash is up
+    with profile.stage('pygame.init'):
+        pygame.init()
+    with profile.stage('fonts'):
+        fonts.preload()
+    with profile.stage('first screen'):
+        manager = ScreenManager(screen, app.FRAME_RATE, dirty_rects=args.dirty_rects, station_id=args.station)
+
+    running = True
+    while running and not loader.done.wait(1 / SPLASH_FPS):
+        running = not any(event.type == pygame.QUIT for event in pygame.event.get())
+        if loader.status != status:
+            status = loader.status
+            draw_splash(pygame, screen, status)
+    loader.done.wait()
+    if loader.error is not None:
+        raise loader.error
+    data_service = loader.data_service
+    manager.set_data_service(data_service)
+
+    if running:
+        threading.Thread(target=app.load_static, args=(manager,), name="static-loader", daemon=True).start()
+        if args.schedule:
+            threading.Thread(target=app.load_schedule, args=(manager,), name="schedule-loader", daemon=True).start()
+        profiler = FrameProfiler()
+        overlay = ProfilerOverlay(profiler, pos=(10, int(app.HEIGHT * 0.10) + 10)) if args.profile else None
+        with profile.stage('first frame'):
+            running = app.run_frame(manager, profiler, pygame.event.get(), overlay)
+        profile.mark('first frame')
+        profile.report(budget=budget)
+
+        if running and not exit_after_first_frame:
+            scheduler = FrameScheduler(app.FRAME_RATE, app.IDLE_FRAME_RATE, adaptive=not args.fixed_fps)
+            app.run_loop(manager, scheduler, profiler, overlay)
+
+    pygame.quit()
+    if data_service:
+        data_service.stop()
+
+
+if __name__ == "__main__":
+    # Usage: python kiosk.py [app.py options] [--splash-budget SECONDS] [--startup-only]
+    profile = StartupProfile(START)
+    with profile.stage('import pygame'):
+        import_pygame()
+    with profile.stage('import app'):
+        import app
+    parser = app.build_parser("MTA station display, fast start for kiosks")
+    parser.add_argument('--splash-budget', type=float, default=SPLASH_BUDGET, metavar='SECONDS',
+                        help="time from process start within which the splash frame should be on the display")
+    parser.add_argument('--startup-only', action='store_true',
+                        help="exit after the first frame, e.g. with SDL_VIDEODRIVER=dummy to measure the start-up")
+    args = parser.parse_args()
+    main(args, profile, budget=args.splash_budget, exit_after_first_frame=args.startup_only)
@@ -0,0 +1,63 @@
+import argparse                   # Import argparse for the command line
+import os                         # Import os to select the SDL video driver and remove stale variants
+import time                       # Import time to time the variant builds
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")   # Headless unless a driver was chosen explicitly
+
+import pygame
+from screens import assets
+from screens.screen_manager import SCREEN_CLASSES
+
+import app
+
+# Displays the kiosks are built with, besides app.py's own window size
+DISPLAY_SIZES = ((800, 480), (1024, 600), (1280, 720), (1920, 1080))
+
+
+def parse_size(text):
+    # '800x480' -> (800, 480)
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def prepare(sizes, frame_rate=app.FRAME_RATE):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   prepare
+    #   Input:      sizes (iterable[(int, int)]) – display sizes to prepare for
+    #               frame_rate (int)             – frame rate passed to the screens
+    #   Output:     list[(size, int, int, float)] – per size: variants loaded from the cache, variants built, seconds
+    #   Description: Builds every screen at every display size. Each screen asks the asset cache for exactly the
+    #                cropped, scaled and flipped variants it shows at that size, so whatever is missing from
+    #                assets/cache/images is built and saved along the way, and the next start at any of these sizes
+    #                only reads raw pixels.
+    # -----------------------------------------------------------------------------------------------------------------
+    results = []
+    for size in sizes:
+        display = pygame.display.set_mode(size)
+        assets.clear_asset_cache()
+        before = dict(assets.variant_counts)
+        start = time.perf_counter()
+        for screen_class in SCREEN_CLASSES.values():
+            screen_class(display, frame_rate)
+        elapsed = time.perf_counter() - start
+        results.append((size, assets.variant_counts['loaded'] - before['loaded'],
+                        assets.variant_counts['built'] - before['built'], elapsed))
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python prepare_assets.py [WIDTHxHEIGHT ...] [--clean]
+    parser = argparse.ArgumentParser(description="Precompute the scaled image variants for display sizes")
+    parser.add_argument('sizes', nargs='*', type=parse_size, metavar='WIDTHxHEIGHT',
+                        help=f"display sizes (default: {app.WIDTH}x{app.HEIGHT} and "
+                             f"{', '.join(f'{w}x{h}' for w, h in DISPLAY_SIZES)})")
+    parser.add_argument('--clean', action='store_true', help="remove every cached variant first")
+    args = parser.parse_args()
+
+    if args.clean and os.path.isdir(assets.VARIANT_DIR):
+        for file_name in os.listdir(assets.VARIANT_DIR):
+            os.remove(os.path.join(assets.VARIANT_DIR, file_name))
+    pygame.init()
+    for (width, height), loaded, built, elapsed in prepare(args.sizes or [(app.WIDTH, app.HEIGHT), *DISPLAY_SIZES]):
+        print(f"{width:>5}x{height:<5} {loaded:>3} cached, {built:>3} built   screens ready in {elapsed * 1000:7.1f} ms")
+    pygame.quit()
@@ -0,0 +1,264 @@
+import pygame                 # Import pygame library for surfaces, rects and shapes
+from screens.layout import SCREEN_BG, TEXT_COLOR, FONT_NAME, Widget
+from screens.time_format import MAX_COUNTDOWN_MINUTES
+from screens.utils import get_font, render_text
+
+DEFAULT_ROUTE_COLOR = (128, 129, 131)   # routes without a route_color (e.g. shuttles)
+DARK_TEXT = (0, 0, 0)
+LIGHT_TEXT = (255, 255, 255)
+ATLAS_CHARS = "0123456789~"             # countdown glyphs; '~' marks a scheduled (not realtime) arrival
+COUNTDOWN_SUFFIX = " min"
+
+
+def hex_color(value, default=None):
+    # 'EE352E' -> (238, 53, 46); default for an empty or malformed value
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4)) if value and len(value) == 6 else default
+    except ValueError:
+        return default
+
+
+def readable_text_color(color):
+    # Black on light route colors (the yellow N/Q/R/W), white on the others, as on the station signs
+    red, green, blue = color
+    return DARK_TEXT if 0.299 * red + 0.587 * green + 0.114 * blue > 186 else LIGHT_TEXT
+
+
+class RouteStyles:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      RouteStyles
+    #   Input:      static (StaticGTFS) – optional static GTFS cache (routes.txt, trips.txt); without it every route
+    #                                     gets the default color and no headsign
+    #   Output:     Bullet colors and headsigns for the arrival board, looked up once per route / trip
+    #   Description: A trip the static schedule does not know (added service, reroutes) gets the usual headsign of
+    #                its route in the direction of the stop (StaticGTFS.route_headsign).
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, static=None):
+        self.static = static
+        self._colors = {}     # route_id -> (bullet color, text color)
+        self._headsigns = {}  # (trip_id, route_id, direction) -> headsign
+
+    def colors(self, route_id):
+        colors = self._colors.get(route_id)
+        if colors is None:
+            color = text_color = None
+            if self.static is not None:
+                color = hex_color(self.static.route_color(route_id))
+                text_color = hex_color(self.static.route_text_color(route_id))
+            color = color or DEFAULT_ROUTE_COLOR
+            colors = self._colors[route_id] = (color, text_color or readable_text_color(color))
+        return colors
+
+    def headsign(self, trip_id, route_id, stop_id):
+        key = (trip_id, route_id, stop_id[-1:])
+        headsign = self._headsigns.get(key)
+        if headsign is None:
+            headsign = ""
+            if self.static is not None:
+                headsign = self.static.headsign(trip_id) or self.static.route_headsign(route_id, key[2]) or ""
+            # Trip ids come and go with the feed; the table only ever holds a few hundred of them
+            if len(self._headsigns) > 4096:
+                self._headsigns.clear()
+            self._headsigns[key] = headsign
+        return headsign
+
+
+class DigitAtlas:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      DigitAtlas
+    #   Input:      font_name (str)       – font of the countdowns
+    #               size (int)            – font size
+    #               color, background     – RGB text and background colors
+    #   Output:     The countdown glyphs rendered once into one surface, drawn by copying areas of it
+    #   Description: Every glyph sits in a cell as wide as the widest digit (tabular figures), so a countdown
+    #                keeps its width and position as it counts down, and drawing "12" is two area blits instead
+    #                of a font render. The glyphs are rendered on the opaque background color, which makes
+    #                every copy a plain blit.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, font_name, size, color=TEXT_COLOR, background=SCREEN_BG, chars=ATLAS_CHARS):
+        font = get_font(font_name, size)
+        glyphs = [font.render(char, True, color, background) for char in chars]
+        self.cell_width = max(glyph.get_width() for glyph in glyphs)
+        self.height = font.get_linesize()
+        self.surface = pygame.Surface((self.cell_width * len(chars), self.height)).convert()
+        self.surface.fill(background)
+        self.areas = {}
+        for index, (char, glyph) in enumerate(zip(chars, glyphs)):
+            x = index * self.cell_width
+            self.surface.blit(glyph, (x + (self.cell_width - glyph.get_width()) // 2, 0))
+            self.areas[char] = pygame.Rect(x, 0, self.cell_width, self.height)
+
+    def width(self, text):
+        return self.cell_width * len(text)
+
+    def draw(self, target, text, right, y):
+        # Draws text right-aligned at right; returns the rect covered
+        x = right - self.width(text)
+        for char in text:
+            target.blit(self.surface, (x, y), self.areas[char])
+            x += self.cell_width
+        return pygame.Rect(right - self.width(text), y, self.width(text), self.height)
+
+
+class ArrivalBoard(Widget):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ArrivalBoard
+    #   Input:      rows (int)                    – rows shown; the row height is the board height / rows
+    #               styles (RouteStyles)          – route colors and headsigns
+    #               background_color, text_color  – RGB colors
+    #               size, name                    – see Widget
+    #   Output:     A list of upcoming trains: route bullet, headsign and minutes away, one train per row
+    #   Description: A row is two parts. The static part - the bullet in the route color and the headsign - is
+    #                rendered once per (route, headsign) and kept in `row_cache`, so a row that moves up the board
+    #                is a single blit. The countdown is drawn from a DigitAtlas next to a pre-rendered " min".
+    #                tick() works out the minutes only when a countdown can have changed, and draw() redraws
+    #                only the rows whose train or countdown changed since they were last drawn: a minute passing
+    #                costs a few glyph blits per row, and a frame in between costs nothing. draw() returns the
+    #                bounding rect of what it redrew, for Layout's dirty rects.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, rows=6, styles=None, background_color=SCREEN_BG, text_color=TEXT_COLOR, size=None, name=None,
+                 font_name=FONT_NAME):
+        super().__init__(size, name)
+        self.rows = rows
+        self.styles = styles or RouteStyles()
+        self.background_color = background_color
+        self.text_color = text_color
+        self.font_name = font_name
+        self.stop_id = ""
+        self.trains = []          # (trip_id, route_id, arrival_time, scheduled) of the trains shown, in order
+        self.shown = [None] * rows  # per row: ((route_id, headsign), countdown text) as of the last tick
+        self.drawn = [None] * rows  # per row: what is on the target
+        self.drawn_on = None
+        self.next_change = 0.0
+        self.row_cache = {}       # (route_id, headsign) -> rendered static part of a row
+        self.row_height = 0
+        self.atlas = None
+        self.suffix = None
+        self.blank = None         # background of one row, to clear rows and countdowns with
+        self.countdown_width = 0
+
+    def invalidate(self):
+        super().invalidate()
+        self.row_cache.clear()
+        self.atlas = None
+        self.drawn_on = None
+
+    def set_styles(self, styles):
+        # New route colors / headsigns (e.g. once the static GTFS cache is loaded): every row is rendered again
+        self.styles = styles
+        self.row_cache.clear()
+        self.next_change = 0.0
+        self.drawn_on = None
+        self.dirty = True
+
+    def set_trains(self, arrivals, stop_id):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   set_trains
+        #   Input:      arrivals (list[dict]) – upcoming arrivals in time order (trip_id, route_id, arrival_time and
+        #                                       optionally 'scheduled'), as DataService snapshots return them
+        #               stop_id (str)         – stop they arrive at, for the direction of unknown trips
+        #   Output:     None; the rows are worked out by the next tick()
+        # -------------------------------------------------------------------------------------------------------------
+        self.trains = [(train['trip_id'], train['route_id'], train['arrival_time'], bool(train.get('scheduled')))
+                       for train in arrivals]
+        self.stop_id = stop_id
+        self.next_change = 0.0
+
+    def tick(self, now):
+        # Works out the row contents when a countdown may have changed; marks the board dirty if one did
+        if now < self.next_change:
+            return
+        upcoming = [train for train in self.trains if train[2] >= now][:self.rows]
+        shown = []
+        next_change = float('inf')
+        for trip_id, route_id, arrival_time, scheduled in upcoming:
+            remaining = arrival_time - now
+            minutes = min(int(remaining) // 60, MAX_COUNTDOWN_MINUTES)
+            next_change = min(next_change, now + remaining % 60 + 0.001)
+            shown.append(((route_id, self.styles.headsign(trip_id, route_id, self.stop_id)),
+                          f"{'~' if scheduled else ''}{minutes}"))
+        # A train also leaves the board when its arrival time passes
+        self.next_change = min(next_change, upcoming[0][2] + 0.001) if upcoming else float('inf')
+        shown += [None] * (self.rows - len(shown))
+        if shown != self.shown:
+            self.shown = shown
+            self.dirty = True
+
+    def prepare(self):
+        # Fonts, the digit atlas and the column widths for the current row height
+        self.row_height = max(1, self.rect.height // self.rows)
+        size = max(8, int(self.row_height * 0.55))
+        self.atlas = DigitAtlas(self.font_name, size, self.text_color, self.background_color)
+        # Everything drawn per row is opaque: on a Pi a plain blit is much cheaper than an alpha blit or a fill
+        self.suffix = get_font(self.font_name, size).render(COUNTDOWN_SUFFIX, True, self.text_color,
+                                                            self.background_color).convert()
+        self.countdown_width = self.atlas.width("~180") + self.suffix.get_width() + self.row_height // 2
+        self.blank = pygame.Surface((self.rect.width, self.row_height)).convert()
+        self.blank.fill(self.background_color)
+
+    def row_surface(self, key):
+        # Static part of a row: route bullet and headsign, rendered once per (route, headsign)
+        surface = self.row_cache.get(key)
+        if surface is not None:
+            return surface
+        route_id, headsign = key
+        height = self.row_height
+        width = max(1, self.rect.width - self.countdown_width)
+        surface = pygame.Surface((width, height)).convert()
+        surface.fill(self.background_color)
+
+        color, text_color = self.styles.colors(route_id)
+        radius = int(height * 0.4)
+        center = (height // 2 + height // 10, height // 2)
+        pygame.draw.circle(surface, color, center, radius)
+        label = render_text(self.font_name, int(radius * (1.3 if len(route_id) < 2 else 0.9)), route_id, text_color)
+        surface.blit(label, label.get_rect(center=center))
+
+        x = center[0] + radius + height // 3
+        text = get_font(self.font_name, int(height * 0.5)).render(headsign, True, self.text_color,
+                                                                  self.background_color)
+        surface.blit(text, (x, (height - text.get_height()) // 2), pygame.Rect(0, 0, width - x, text.get_height()))
+        self.row_cache[key] = surface
+        return surface
+
+    def draw_row(self, target, index, row):
+        # Draws one row over whatever was there; returns its rect
+        rect = pygame.Rect(self.rect.x, self.rect.y + index * self.row_height, self.rect.width, self.row_height)
+        previous = self.drawn[index]
+        if row is None:
+            target.blit(self.blank, rect)
+            return rect
+        key, countdown = row
+        cell = pygame.Rect(rect.right - self.countdown_width, rect.y, self.countdown_width, rect.height)
+        if previous is None or previous[0] != key:
+            target.blit(self.row_surface(key), rect.topleft)
+        else:
+            rect = cell   # same route and headsign: only the countdown changed
+        target.blit(self.blank, cell, pygame.Rect((0, 0), cell.size))
+        right = cell.right - self.suffix.get_width() - self.row_height // 4
+        y = cell.y + (cell.height - self.atlas.height) // 2
+        self.atlas.draw(target, countdown, right, y)
+        target.blit(self.suffix, (right, cell.y + (cell.height - self.suffix.get_height()) // 2))
+        return rect
+
+    def draw(self, target):
+        if self.atlas is None:
+            self.prepare()
+        full = target is not self.drawn_on
+        if full:
+            target.fill(self.background_color, self.rect)
+            self.drawn = [None] * self.rows
+            self.drawn_on = target
+        redrawn = None
+        for index, row in enumerate(self.shown):
+            if row == self.drawn[index] and not full:
+                continue
+            if row is None and self.drawn[index] is None:
+                continue
+            rect = self.draw_row(target, index, row)
+            self.drawn[index] = row
+            redrawn = rect if redrawn is None else redrawn.union(rect)
+        self.dirty = False
+        if full:
+            return pygame.Rect(self.rect)
+        return redrawn or pygame.Rect(self.rect.topleft, (0, 0))
@@ -0,0 +1,154 @@
+import hashlib                # Import hashlib to fingerprint source images
+import json                   # Import json for the variant header
+import os                     # Import os for file path handling and atomic renames
+import struct                 # Import struct for the fixed-size file preamble
+from functools import lru_cache # Import lru_cache to share decoded and scaled images between screens
+import pygame                 # Import pygame library for image loading and transforms
+from screens.utils import crop_transparent_border
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../assets")
+IMAGES_DIR = os.path.join(ASSETS_DIR, "images")
+VARIANT_DIR = os.path.join(ASSETS_DIR, "cache", "images")
+
+MAGIC = b'IMGRAW01'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sI')  # magic, header length
+
+# Variants read from the disk cache and built from the source image in this process (see prepare_assets.py)
+variant_counts = {'loaded': 0, 'built': 0}
+
+
+def source_fingerprint(path, digest=True):
+    # Size and mtime of a source image, plus the sha1 of its contents unless digest is False
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if digest:
+        with open(path, 'rb') as f:
+            fingerprint['sha1'] = hashlib.sha1(f.read()).hexdigest()
+    return fingerprint
+
+
+def variant_path(name, height, crop, flipped, directory=VARIANT_DIR):
+    # assets/cache/images/r211.png-120-crop-flip.rgba; the source hash is checked against the file's header
+    flags = ("-crop" if crop else "") + ("-flip" if flipped else "")
+    return os.path.join(directory, f"{name}-{height}{flags}.rgba")
+
+
+def save_variant(image, path, source):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   save_variant
+    #   Input:      image (pygame.Surface) – finished variant
+    #               path (str)             – file to write (see variant_path)
+    #               source (dict)          – source_fingerprint of the image it was made from
+    #   Output:     None
+    #   Description: Writes preamble + JSON header (source fingerprint, width, height) + raw RGBA pixels to a
+    #                temporary file renamed over the old one, so a power cut never leaves half a variant behind.
+    # -----------------------------------------------------------------------------------------------------------------
+    width, height = image.get_size()
+    header = json.dumps({'version': FORMAT_VERSION, 'source': source, 'width': width, 'height': height},
+                        separators=(',', ':')).encode('utf-8')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(pygame.image.tobytes(image, 'RGBA'))
+    os.replace(tmp_path, path)
+
+
+def load_variant(path, source_path):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   load_variant
+    #   Input:      path (str)              – file written by save_variant
+    #               source_path (str)       – the source image it must have been made from
+    #   Output:     pygame.Surface or None  – the variant, or None when it is missing, unreadable or out of date
+    #   Description: One read of the file and a stat of the source: a source whose size and mtime match the
+    #                header is not read at all; otherwise its sha1 decides (a copied or touched file still hits).
+    # -----------------------------------------------------------------------------------------------------------------
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, header_length = PREAMBLE.unpack_from(data, 0)
+        if magic != MAGIC:
+            return None
+        header = json.loads(data[PREAMBLE.size:PREAMBLE.size + header_length])
+        if header['version'] != FORMAT_VERSION:
+            return None
+        source = source_fingerprint(source_path, digest=False)
+        cached = header['source']
+        if (cached['size'], cached['mtime_ns']) != (source['size'], source['mtime_ns']):
+            if cached['sha1'] != source_fingerprint(source_path)['sha1']:
+                return None
+        size = (header['width'], header['height'])
+        pixels = memoryview(data)[PREAMBLE.size + header_length:]
+        if len(pixels) != size[0] * size[1] * 4:
+            return None
+        return pygame.image.frombuffer(pixels, size, 'RGBA').convert_alpha()
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_image(name, crop=False):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   load_image
+    #   Input:      name (str)       – file name inside assets/images, e.g. "r211.png"
+    #               crop (bool)      – remove the transparent border (see crop_transparent_border)
+    #   Output:     pygame.Surface   – decoded, display-format image; decoded once per process
+    # -----------------------------------------------------------------------------------------------------------------
+    image = pygame.image.load(os.path.join(IMAGES_DIR, name)).convert_alpha()
+    if crop:
+        image = crop_transparent_border(image)
+    return image
+
+
+def scaled_image(name, height, crop=True, flipped=False, directory=VARIANT_DIR):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   scaled_image
+    #   Input:      name (str)       – file name inside assets/images
+    #               height (int)     – target height; the width keeps the aspect ratio
+    #               crop (bool)      – crop the transparent border before scaling
+    #               flipped (bool)   – mirror horizontally
+    #               directory (str)  – disk cache of finished variants (None: always build them)
+    #   Output:     pygame.Surface   – shared scaled variant; every screen asking for the same variant gets the
+    #                                  same surface, so callers must not draw onto it
+    #   Description: A variant depends only on the source image and the display size, so the finished pixels are
+    #                kept on disk under assets/cache/images (see prepare_assets.py to build them ahead of time).
+    #                A start at a known resolution reads one raw file per variant; decoding the PNG, the mask
+    #                behind crop_transparent_border and smoothscale only run for a variant that is not cached
+    #                yet, or whose source image changed, and the result is saved for the next start.
+    # -----------------------------------------------------------------------------------------------------------------
+    # One positional key per variant, however the arguments were passed
+    return _scaled_image(name, height, crop, flipped, directory)
+
+
+@lru_cache(maxsize=None)
+def _scaled_image(name, height, crop, flipped, directory):
+    source_path = os.path.join(IMAGES_DIR, name)
+    path = variant_path(name, height, crop, flipped, directory) if directory else None
+    if path is not None:
+        image = load_variant(path, source_path)
+        if image is not None:
+            variant_counts['loaded'] += 1
+            return image
+
+    if flipped:
+        image = pygame.transform.flip(_scaled_image(name, height, crop, False, directory), True, False)
+    else:
+        image = load_image(name, crop)
+        orig_width, orig_height = image.get_size()
+        target_width = int(orig_width * (height / orig_height))
+        image = pygame.transform.smoothscale(image, (target_width, height))
+    variant_counts['built'] += 1
+    if path is not None:
+        try:
+            save_variant(image, path, source_fingerprint(source_path))
+        except OSError:
+            pass  # a read-only assets directory only costs building the variant again on the next start
+    return image
+
+
+def clear_asset_cache():
+    # Surfaces depend on the display format; call this after changing the display mode
+    _scaled_image.cache_clear()
+    load_image.cache_clear()
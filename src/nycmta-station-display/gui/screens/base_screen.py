@@ -2,6 +2,11 @@ class BaseScreen:
     def __init__(self, screen):
         self.screen = screen
         self.next_screen = None
+        self.full_redraw = True   # dirty-rect mode: the next frame must repaint the whole screen
+        self.data_service = None  # DataService publishing arrival snapshots, set by the ScreenManager
+        self.station_id = None    # stop_id this display shows arrivals for
+        self.schedule = None      # ScheduleEngine filling in for stale or missing realtime data, if loaded
+        self.static = None        # StaticGTFS with route colors and headsigns, if loaded
 
     def handle_event(self, event):
         pass
@@ -11,3 +16,35 @@ class BaseScreen:
 
     def render(self):
         pass
+
+    def is_animating(self):
+        # True while something on screen moves by itself and needs the full frame rate
+        return False
+
+    def next_deadline(self):
+        # time.time() at which the screen changes without any input (e.g. the next clock minute), or None
+        return None
+
+    def on_enter(self):
+        # Called every time the screen becomes the current one; screens keep their state in between
+        self.invalidate()
+
+    def on_exit(self):
+        # Called when another screen replaces this one
+        pass
+
+    def invalidate(self):
+        # Forget whatever is on the display; the next render_dirty() repaints everything
+        self.full_redraw = True
+
+    def render_dirty(self):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   render_dirty
+        #   Input:      None
+        #   Output:     list[pygame.Rect] or None – regions changed since the previous frame (None = whole screen)
+        #   Description: Dirty-rect counterpart of render(). Screens that only repaint what changed override this;
+        #                the default falls back to a full render.
+        # -------------------------------------------------------------------------------------------------------------
+        self.render()
+        self.full_redraw = False
+        return None
@@ -0,0 +1,75 @@
+import json                   # Import json for the font manifest file
+import os                     # Import os for file path handling and atomic renames
+import sys                    # Import sys for command line arguments
+import threading              # Import threading to guard the manifest shared with the loader thread
+import pygame                 # Import pygame for its system font lookup
+
+FONT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../assets/cache/fonts.json")
+
+# System fonts the screens ask for, resolved ahead of the first screen by kiosk.py
+FONT_NAMES = ("Helvetica",)
+
+_lock = threading.Lock()
+_manifest = None
+
+
+def load_manifest(path=FONT_MANIFEST):
+    # Font name -> file path (None: not installed, pygame's default font is used), or {} without a manifest
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(manifest, path=FONT_MANIFEST):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def font_path(font_name, path=FONT_MANIFEST):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   font_path
+    #   Input:      font_name (str)  – system font name, e.g. "Helvetica", or None for pygame's default font
+    #               path (str)       – manifest file
+    #   Output:     str or None      – the font's file, for pygame.font.Font; None means pygame's default font
+    #   Description: pygame.font.SysFont scans every installed font (through fc-list on Linux) the first time it
+    #                is called, which is a noticeable part of a Pi's boot to first frame. Names are resolved with
+    #                that scan once and kept in a JSON manifest under assets/cache; later starts only read the
+    #                manifest. An entry whose file has disappeared is resolved again. A font that was not found
+    #                is remembered as None - delete the manifest (or run this file) after installing fonts.
+    # -----------------------------------------------------------------------------------------------------------------
+    global _manifest
+    if font_name is None:
+        return None
+    with _lock:
+        if _manifest is None:
+            _manifest = load_manifest(path)
+        if font_name in _manifest:
+            file_path = _manifest[font_name]
+            if file_path is None or os.path.exists(file_path):
+                return file_path
+        file_path = pygame.sysfont.match_font(font_name)
+        _manifest[font_name] = file_path
+        try:
+            save_manifest(_manifest, path)
+        except OSError:
+            pass  # a read-only assets directory only costs the scan on the next start
+        return file_path
+
+
+def preload(font_names=FONT_NAMES, path=FONT_MANIFEST):
+    # Resolves every font the screens use; returns font name -> file path
+    return {font_name: font_path(font_name, path) for font_name in font_names}
+
+
+if __name__ == "__main__":
+    # Usage: python fonts.py [font name ...]   – rescan the system fonts and rewrite the manifest
+    if os.path.exists(FONT_MANIFEST):
+        os.remove(FONT_MANIFEST)
+    for name, file_path in preload(sys.argv[1:] or FONT_NAMES).items():
+        print(f"{name:>20} {file_path or '(not installed, pygame default font)'}")
@@ -0,0 +1,51 @@
+import time                   # Import time for wall-clock deadlines
+import pygame                 # Import pygame library for the clock and event queue
+
+
+class FrameScheduler:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FrameScheduler
+    #   Input:      frame_rate (int)       – frames per second while the current screen is animating
+    #               idle_frame_rate (int)  – minimum frames per second while it is not (a safety net)
+    #               adaptive (bool)        – False keeps the old behaviour of ticking at frame_rate forever
+    #   Output:     A main-loop pacer that sleeps instead of rendering identical frames
+    #   Description: Before every frame the main loop calls wait(screen). While the screen reports
+    #                is_animating() this ticks the clock at the full frame rate. Otherwise it blocks on the event
+    #                queue until an event arrives, the screen's next_deadline() (e.g. the next clock minute) is
+    #                reached, or the idle interval runs out - whichever comes first.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, frame_rate=60, idle_frame_rate=1, adaptive=True):
+        self.frame_rate = frame_rate
+        self.idle_frame_rate = idle_frame_rate
+        self.adaptive = adaptive
+        self.clock = pygame.time.Clock()
+        self.idle_frames = 0
+
+    def idle_timeout(self, screen):
+        # Milliseconds the loop may sleep before the screen needs another frame
+        timeout = 1.0 / self.idle_frame_rate
+        deadline = screen.next_deadline()
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.time())
+        return max(0, int(timeout * 1000))
+
+    def wait(self, screen):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   wait
+        #   Input:      screen (BaseScreen)      – the screen about to be rendered
+        #   Output:     list[pygame.event.Event] – events to handle before the next frame
+        # -------------------------------------------------------------------------------------------------------------
+        if not self.adaptive or screen.is_animating():
+            self.clock.tick(self.frame_rate)
+            return pygame.event.get()
+
+        self.idle_frames += 1
+        timeout = self.idle_timeout(screen)
+        events = []
+        if timeout > 0:
+            event = pygame.event.wait(timeout)
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        self.clock.tick()
+        return events
@@ -1,7 +1,9 @@
-import pygame
-import os
-from datetime import datetime
-from screens.utils import crop_transparent_border, draw_banner, Button
+import time                   # Import time to show how old cached arrivals are
+from screens.arrival_board import ArrivalBoard, RouteStyles
+from screens.assets import scaled_image
+from screens.sprites import SpriteLayer, prepare_sprite, scroll_path
+from screens.time_format import TimeFormatter
+from screens.layout import SCREEN_BG, SPACER_FRACTION, Banner, Box, banner_button, screen_layout, to_pixels
 from screens.base_screen import BaseScreen  # You’ll create this base class
 
 class HomeScreen(BaseScreen):
@@ -9,93 +11,234 @@ class HomeScreen(BaseScreen):
         super().__init__(screen)
         self.screen = screen
         self.frame_rate = frame_rate
-        self.WIDTH, self.HEIGHT = screen.get_size()
-
-        # Layout constants
-        self.BANNER_HEIGHT = int(self.HEIGHT * 0.10)
-        self.SPACER = int(self.HEIGHT * 0.05)
-        self.TRAIN_HEIGHT = (self.HEIGHT - self.BANNER_HEIGHT - 3 * self.SPACER) // 2
-
-        # Colors
-        self.SCREEN_BG = (0, 0, 0)
-        self.BANNER_BG = (40, 40, 40)
-        self.BORDER_COLOR = (255, 255, 255)
-        self.BORDER_THICKNESS = 2
+        self.SCREEN_BG = SCREEN_BG
 
         # Train speed
         self.TRAIN_SPEED = 4.0  # seconds to cross screen
-
-        # Fonts
-        self.banner_font = pygame.font.SysFont("Helvetica", int(self.BANNER_HEIGHT * 0.6))
+        self.animate_trains = True
+        self.sprite_layer = SpriteLayer()
+
+        # Live mode: trains approach the middle of the screen, reaching it at their arrival time
+        self.ARRIVAL_WINDOW = 600  # seconds until arrival at which a train enters the screen
+
+        # Latest arrivals picked up from the data service
+        self.arrivals = []
+        self.snapshot_version = -1
+        self.arrivals_source = None
+        # Service alert shown in the middle of the banner, re-checked on new data and every minute
+        self.MAX_ALERT_CHARS = 60
+        self.alert_key = None
+        self.alert_line = ""
+        self.ARRIVALS_SHOWN = 3
+        # Arrival board between the train lanes; route colors and headsigns once the static GTFS is loaded
+        self.BOARD_ROWS = 6
+        self.LANE_FRACTION = 0.15
+        self.route_styles = RouteStyles()
+        # Arrivals from a feed older than this (e.g. the snapshot cache after a reboot, or the network is down)
+        # are marked with the time they date from
+        self.STALE_AFTER = 120
+        self.data_timestamp = 0
+        self.data_age_text = ""
+
+        # Clock and countdown text, advanced once per frame by update()
+        self.time_format = TimeFormatter()
+
+        # Banner texts are set by update(); the banner is only rendered again when one of them changed
+        self.banner = Banner()
+        self.settings_button = banner_button("goto:SettingsScreen")
+        self.board = ArrivalBoard(self.BOARD_ROWS, self.route_styles, name='board')
+        self.layout = screen_layout(self.banner, self.settings_button,
+                                    Box([Box(name='lane1', size=self.LANE_FRACTION), self.board,
+                                         Box(name='lane2', size=self.LANE_FRACTION)],
+                                        padding=SPACER_FRACTION, spacing=SPACER_FRACTION))
+        self.layout.resize(screen.get_size())
+        self.apply_layout()
+
+    def apply_layout(self):
+        # Everything derived from the geometry; runs again only when the display size changes
+        self.WIDTH, self.HEIGHT = self.layout.size
+        self.BANNER_HEIGHT = self.banner.rect.height
+        self.SPACER = to_pixels(SPACER_FRACTION, self.HEIGHT)
+        self.lane1, self.lane2 = self.layout['lane1'].rect, self.layout['lane2'].rect
+        self.TRAIN_HEIGHT = self.lane1.height
 
         # Load and scale images
         self.load_images()
 
-        # Train positions
-        self.train1_x = -self.train_width
-        self.train2_x = self.WIDTH
-
-        self.settings_button = Button(
-            text="S",  # icon-only button
-            pos=(self.WIDTH - self.BANNER_HEIGHT, 0),  # top-right corner
-            size=(self.BANNER_HEIGHT,self.BANNER_HEIGHT),    # square button
-            font=self.banner_font,
-            bg_color=(200, 30, 30),
-            text_color=(255, 255, 255),
-            hover_color=(50, 50, 50),
-            icon=None  # must be a pygame.Surface
-        )
+        # Train positions: one animation cycle of x positions per direction, precomputed
+        pixels_per_frame = (self.WIDTH + 2 * self.train_width) / (self.TRAIN_SPEED * self.frame_rate)
+        self.train1_path = scroll_path(-self.train_width, self.WIDTH, pixels_per_frame)
+        self.train2_path = scroll_path(self.WIDTH, -self.train_width, -pixels_per_frame)
+        self.train1_frame = self.train2_frame = 0
+        self.train1_x = self.train1_path[0]
+        self.train2_x = self.train2_path[0]
+        self.invalidate()
 
     def load_images(self):
-        assets_dir = os.path.join(os.path.dirname(__file__), "../../../../assets/images")
-        image_path = os.path.join(assets_dir, "r211.png")
-        train_image = pygame.image.load(image_path).convert_alpha()
-        train_image = crop_transparent_border(train_image)
-
-        orig_width, orig_height = train_image.get_size()
-        scale_factor = self.TRAIN_HEIGHT / orig_height
-        target_width = int(orig_width * scale_factor)
-
-        self.train_image = pygame.transform.smoothscale(train_image, (target_width, self.TRAIN_HEIGHT))
-        self.train_flipped = pygame.transform.flip(self.train_image, True, False)
+        # Cropped, scaled and flipped variants for this size come from the disk cache (see prepare_assets.py)
+        # and are shared through the asset cache
+        self.train_image = scaled_image("r211.png", self.TRAIN_HEIGHT)
+        self.train_flipped = scaled_image("r211.png", self.TRAIN_HEIGHT, flipped=True)
         self.train_width, self.train_height = self.train_image.get_size()
+        # Opaque, display-format copies for drawing; the alpha images stay shared with the asset cache
+        self.train_sprite = prepare_sprite(self.train_image, self.SCREEN_BG)
+        self.train_flipped_sprite = prepare_sprite(self.train_flipped, self.SCREEN_BG)
+
+    def on_exit(self):
+        # The settings button was just tapped; don't come back to it highlighted
+        self.layout.set_hover(None)
 
     def handle_event(self, event):
-        if self.settings_button.handle_event(event):
-            return "goto:SettingsScreen"
-        return None
+        return self.layout.handle_event(event)
+
+    def is_animating(self):
+        # Live trains move a few pixels per second; the idle frame rate is enough for them
+        return self.animate_trains and not self.live_trains()
+
+    def next_deadline(self):
+        # The banner clock changes at the top of every minute, each countdown a minute before its arrival
+        return self.time_format.next_countdown_change(train['arrival_time'] for train in self.arrivals)
+
+    def poll_arrivals(self):
+        # Non-blocking: reads whatever snapshot the data service last published
+        if self.data_service is None or self.station_id is None:
+            return
+        snapshot = self.data_service.snapshot
+        now = self.time_format.now
+        # With a schedule, stale data or the schedule becoming available also calls for new arrivals; while the
+        # data stays stale no new snapshot comes in, so the scheduled departures are filled again every minute
+        stale = self.schedule is not None and now - snapshot.timestamp > self.STALE_AFTER
+        source = (snapshot.version, stale, self.schedule is not None, self.time_format.next_minute() if stale else None)
+        if source != self.arrivals_source:
+            self.arrivals_source = source
+            self.snapshot_version = snapshot.version
+            # Twice what is shown, so the board stays full while trains leave it between refreshes
+            limit = 2 * max(self.ARRIVALS_SHOWN, self.BOARD_ROWS)
+            self.arrivals = snapshot.arrivals(self.station_id, limit=limit, start=int(now))
+            if self.schedule is not None:
+                # A route whose next train is past the limit still has realtime data; it gets no scheduled trains
+                routes = snapshot.routes_at(self.station_id, start=int(now))
+                self.arrivals = self.schedule.fill(self.arrivals, self.station_id, now, limit, stale, routes)
+            self.board.set_trains(self.arrivals, self.station_id)
+            self.data_timestamp = snapshot.timestamp
+            self.data_age_text = (f"   (as of {time.strftime('%I:%M %p', time.localtime(snapshot.timestamp))})"
+                                  if snapshot.timestamp else "")
+
+    def arrivals_text(self):
+        if self.data_service is None:
+            return "right text"
+        now = self.time_format.now
+        upcoming = [train for train in self.arrivals if train['arrival_time'] >= now][:self.ARRIVALS_SHOWN]
+        if not upcoming:
+            return "No trains" if self.snapshot_version > 0 else "Loading..."
+        countdowns = self.time_format.countdowns(train['arrival_time'] for train in upcoming)
+        # Scheduled departures (see ScheduleEngine.fill) are marked as approximate
+        text = "   ".join(f"{train['route_id']} {'~' if train.get('scheduled') else ''}{countdown}"
+                           for train, countdown in zip(upcoming, countdowns))
+        if now - self.data_timestamp > self.STALE_AFTER:
+            text += self.data_age_text
+        return text
+
+    def alert_text(self):
+        # Header of the first active alert for this stop or the routes arriving here, "+N" more
+        if self.data_service is None:
+            return "test"
+        key = (self.snapshot_version, self.time_format.next_minute())
+        if key != self.alert_key:
+            self.alert_key = key
+            service_info = getattr(self.data_service.snapshot, 'service_info', None)
+            routes = {train['route_id'] for train in self.arrivals}
+            if self.schedule is not None:
+                routes.update(self.schedule.graph.routes_at(self.station_id))
+            alerts = (service_info.alerts_for(sorted(routes), (self.station_id, self.station_id[:-1]),
+                                              self.time_format.now) if service_info else [])
+            line = alerts[0].header if alerts else ""
+            if len(line) > self.MAX_ALERT_CHARS:
+                line = line[:self.MAX_ALERT_CHARS - 3].rstrip() + "..."
+            if len(alerts) > 1:
+                line += f"  (+{len(alerts) - 1})"
+            self.alert_line = line
+        return self.alert_line
 
     def update(self):
-        pixels_per_frame = (self.WIDTH + 2 * self.train_width) / (self.TRAIN_SPEED * self.frame_rate)
-        self.train1_x += pixels_per_frame
-        self.train2_x -= pixels_per_frame
-
-        if self.train1_x > self.WIDTH:
-            self.train1_x = -self.train_width
-
-        if self.train2_x < -self.train_width:
-            self.train2_x = self.WIDTH
+        self.time_format.tick()
+        self.poll_arrivals()
+        self.banner.set_texts(self.time_format.clock(), self.alert_text(), self.arrivals_text())
+        if self.static is not self.route_styles.static:
+            self.route_styles = RouteStyles(self.static)
+            self.board.set_styles(self.route_styles)
+        self.board.tick(self.time_format.now)
+        if not self.animate_trains or self.live_trains():
+            return
+        self.train1_frame = (self.train1_frame + 1) % len(self.train1_path)
+        self.train2_frame = (self.train2_frame + 1) % len(self.train2_path)
+        self.train1_x = self.train1_path[self.train1_frame]
+        self.train2_x = self.train2_path[self.train2_frame]
+
+    def live_trains(self):
+        # Upcoming arrivals close enough to be drawn
+        now = self.time_format.now
+        return [train for train in self.arrivals[:self.ARRIVALS_SHOWN]
+                if 0 <= train['arrival_time'] - now <= self.ARRIVAL_WINDOW]
+
+    def train_positions(self):
+        train1_y = self.lane1.y
+        train2_y = self.lane2.y
+        live = self.live_trains()
+        if not live:
+            return ((self.train_flipped_sprite, self.train1_x, train1_y),
+                    (self.train_sprite, self.train2_x, train2_y))
+
+        # One train per live arrival: northbound in the top lane moving right, southbound in the bottom one
+        pixels_per_second = (self.WIDTH / 2) / self.ARRIVAL_WINDOW
+        center = self.WIDTH // 2
+        now = self.time_format.now
+        positions = []
+        for train in reversed(live):   # nearest train drawn last, on top
+            offset = (train['arrival_time'] - now) * pixels_per_second
+            if self.station_id.endswith('S'):
+                positions.append((self.train_sprite, center + offset, train2_y))
+            else:
+                positions.append((self.train_flipped_sprite, center - self.train_width - offset, train1_y))
+        return positions
 
     def render(self):
-        self.screen.fill(self.SCREEN_BG)
-
-        now_str = datetime.now().strftime("%A, %B %d   %I:%M %p")
-        draw_banner(
-            screen=self.screen,
-            screen_width=self.WIDTH,
-            banner_height=self.BANNER_HEIGHT,
-            banner_font=self.banner_font,
-            banner_background_color=self.BANNER_BG,
-            banner_border_color=self.BORDER_COLOR,
-            banner_border_thickness=self.BORDER_THICKNESS,
-            left_text=now_str,
-            center_text="test",
-            right_text="right text",
-            right_button=self.settings_button
-        )
-
-        train1_y = self.BANNER_HEIGHT + self.SPACER
-        train2_y = train1_y + self.train_height + self.SPACER
-
-        self.screen.blit(self.train_flipped, (self.train1_x, train1_y))
-        self.screen.blit(self.train_image, (self.train2_x, train2_y))
\ No newline at end of file
+        if self.layout.resize(self.screen.get_size()):
+            self.apply_layout()
+        self.layout.repaint(self.screen)
+
+        self.sprite_layer.set_sprites(self.train_positions())
+        self.sprite_layer.draw_full(self.screen)
+
+    def render_dirty(self):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   render_dirty
+        #   Input:      None
+        #   Output:     list[pygame.Rect] or None – changed regions (None after a full repaint)
+        #   Description: The layout keeps the widgets (banner, button) drawn on a background; only those whose texts
+        #                or hover state changed are drawn again and copied to the display. Every frame the trains
+        #                are erased by copying the background back over their previous rects and drawn at their new
+        #                positions; only those rects are reported.
+        # -------------------------------------------------------------------------------------------------------------
+        if self.layout.resize(self.screen.get_size()):
+            self.apply_layout()
+        background, rects = self.layout.compose()
+        full = self.full_redraw or rects is None
+        dirty = []
+
+        if full:
+            self.layout.repaint(self.screen)
+            self.sprite_layer.forget()
+        else:
+            for rect in rects:
+                self.screen.blit(background, rect, rect)
+                dirty.append(rect)
+
+        self.sprite_layer.set_sprites(self.train_positions())
+        if full:
+            self.sprite_layer.draw_full(self.screen)
+        else:
+            dirty.extend(self.sprite_layer.draw(self.screen, background))
+
+        self.full_redraw = False
+        return None if full else dirty
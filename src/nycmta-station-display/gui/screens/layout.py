@@ -0,0 +1,356 @@
+import pygame                 # Import pygame library for rects, surfaces and events
+from screens.utils import fit_font_size, get_font, render_text
+
+# Look shared by every screen
+SCREEN_BG = (0, 0, 0)
+BANNER_BG = (40, 40, 40)
+BORDER_COLOR = (255, 255, 255)
+BORDER_THICKNESS = 2
+TEXT_COLOR = (255, 255, 255)
+FONT_NAME = "Helvetica"
+
+# Sizes as fractions of the screen height
+BANNER_FRACTION = 0.10
+SPACER_FRACTION = 0.05
+
+HIT_CELL = 64                 # side of a hit-test grid cell, in pixels
+SQUARE = 'square'             # size of a child as long as its box is wide (row) or high (column)
+
+
+def to_pixels(value, unit):
+    # int: pixels; float: fraction of unit (the screen height)
+    return value if isinstance(value, int) else int(value * unit)
+
+
+class Widget:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Widget
+    #   Input:      size (int, float, SQUARE or None) – length along its box: pixels, fraction of the screen height,
+    #                                                   square, or None for an equal share of the space left
+    #               name (str)                        – key in Layout.nodes
+    #               action (str)                      – returned by Layout.handle_event when the widget is tapped,
+    #                                                   e.g. "goto:SettingsScreen"
+    #   Output:     One leaf of a layout tree, drawn from cached surfaces
+    #   Description: Subclasses paint() their content onto a surface of the widget's size. The surface is cached
+    #                per state() (e.g. hovered or not), so drawing an unchanged widget is one blit. Changing what a
+    #                widget shows calls invalidate(), which drops the cached surfaces; every state change marks it
+    #                dirty so Layout.draw() repaints it in dirty-rect mode.
+    # -----------------------------------------------------------------------------------------------------------------
+    hoverable = False
+
+    def __init__(self, size=None, name=None, action=None):
+        self.size = size
+        self.name = name
+        self.action = action
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.hovered = False
+        self.surfaces = {}    # state() -> rendered surface
+        self.dirty = True     # differs from what was last drawn
+
+    def place(self, rect):
+        if rect != self.rect:
+            self.rect = pygame.Rect(rect)
+            self.invalidate()
+
+    def invalidate(self):
+        self.surfaces.clear()
+        self.dirty = True
+
+    def set_hovered(self, hovered):
+        if hovered != self.hovered:
+            self.hovered = hovered
+            self.dirty = True
+
+    def state(self):
+        return None
+
+    def paint(self, surface):
+        pass
+
+    def draw(self, target):
+        # Blits the widget onto target; returns its rect
+        key = self.state()
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = pygame.Surface(self.rect.size).convert()
+            self.paint(surface)
+        self.dirty = False
+        return target.blit(surface, self.rect)
+
+
+class Fill(Widget):
+    # A plain colored rect, e.g. the line under the banner
+    def __init__(self, color, size=None, name=None):
+        super().__init__(size, name)
+        self.color = color
+
+    def paint(self, surface):
+        surface.fill(self.color)
+
+
+class Banner(Widget):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Banner
+    #   Input:      left_text, center_text, right_text (str) – initial texts
+    #               size, name                               – see Widget
+    #   Output:     The top bar of a screen: left-aligned, centered and right-aligned text on a solid background
+    #   Description: The three texts share the largest font size at which they fit. set_texts() only
+    #                invalidates the banner when a text changed, so a clock that did not tick costs nothing.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, left_text="", center_text="", right_text="", size=None, name=None,
+                 background_color=BANNER_BG, text_color=TEXT_COLOR, font_name=FONT_NAME):
+        super().__init__(size, name)
+        self.texts = (left_text, center_text, right_text)
+        self.background_color = background_color
+        self.text_color = text_color
+        self.font_name = font_name
+
+    def set_texts(self, left_text, center_text, right_text):
+        texts = (left_text, center_text, right_text)
+        if texts != self.texts:
+            self.texts = texts
+            self.invalidate()
+
+    def paint(self, surface):
+        surface.fill(self.background_color)
+        width, height = self.rect.size
+        max_size = get_font(self.font_name, int(height * 0.6)).get_height()
+        font_size = fit_font_size(self.font_name, max_size, self.texts, width - 100)
+        left, center, right = (render_text(self.font_name, font_size, text, self.text_color) for text in self.texts)
+        y = (height - center.get_height()) // 2
+        surface.blit(left, (20, y))
+        surface.blit(center, ((width - center.get_width()) // 2, y))
+        surface.blit(right, (width - right.get_width() - 20, y))
+
+
+class Button(Widget):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Button
+    #   Input:      text (str)                 – label, centered
+    #               font_fraction (float)      – font size as a fraction of the button height
+    #               bg_color, hover_color      – RGB background, normally and while hovered
+    #               text_color (tuple)         – RGB label color
+    #               border_color (tuple)       – RGB border color (default: None = no border)
+    #               border_thickness (int)     – thickness of the border lines
+    #               border_sides (list[str])   – sides with borders: "top", "bottom", "left", "right"
+    #               size, name, action         – see Widget
+    #   Output:     A tappable button; both its normal and its hovered look are rendered once and kept
+    # -----------------------------------------------------------------------------------------------------------------
+    hoverable = True
+
+    def __init__(self, text, font_fraction=0.5, bg_color=(20, 20, 20), text_color=TEXT_COLOR, hover_color=(90, 90, 90),
+                 border_color=None, border_thickness=0, border_sides=(), size=None, name=None, action=None,
+                 font_name=FONT_NAME):
+        super().__init__(size, name, action)
+        self.text = text
+        self.font_fraction = font_fraction
+        self.bg_color = bg_color
+        self.text_color = text_color
+        self.hover_color = hover_color
+        self.border_color = border_color
+        self.border_thickness = border_thickness
+        self.border_sides = tuple(border_sides)
+        self.font_name = font_name
+
+    def state(self):
+        return self.hovered
+
+    def paint(self, surface):
+        surface.fill(self.hover_color if self.hovered else self.bg_color)
+        w, h = self.rect.size
+        t = self.border_thickness
+        if self.border_color and t > 0:
+            sides = {"top": (0, 0, w, t), "bottom": (0, h - t, w, t), "left": (0, 0, t, h), "right": (w - t, 0, t, h)}
+            for side in self.border_sides:
+                pygame.draw.rect(surface, self.border_color, sides[side])
+        if self.text:
+            label = render_text(self.font_name, int(h * self.font_fraction), self.text, self.text_color)
+            surface.blit(label, label.get_rect(center=(w // 2, h // 2)))
+
+
+class Box:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Box
+    #   Input:      children (list[Box or Widget]) – laid out in order
+    #               direction (str)                – 'column' (top to bottom) or 'row' (left to right)
+    #               size (int, float, SQUARE, None) – length along its parent box, see Widget
+    #               padding, spacing (int, float)  – space around and between the children, in pixels or as a
+    #                                                fraction of the screen height
+    #               name (str)                     – key in Layout.nodes; a Box without children just reserves
+    #                                                space, e.g. a lane the trains move in
+    #   Output:     A node of a layout tree
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, children=(), direction='column', size=None, padding=0, spacing=0, name=None):
+        self.children = list(children)
+        self.direction = direction
+        self.size = size
+        self.padding = padding
+        self.spacing = spacing
+        self.name = name
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+    def place(self, rect, unit):
+        # Computes the rect of every node below this one; unit is the screen height
+        self.rect = pygame.Rect(rect)
+        padding = to_pixels(self.padding, unit)
+        spacing = to_pixels(self.spacing, unit)
+        inner = self.rect.inflate(-2 * padding, -2 * padding)
+        column = self.direction == 'column'
+        length, cross = (inner.height, inner.width) if column else (inner.width, inner.height)
+
+        sizes = [None if child.size is None else cross if child.size == SQUARE else to_pixels(child.size, unit)
+                 for child in self.children]
+        flexible = sizes.count(None)
+        left = length - sum(size for size in sizes if size is not None) - spacing * max(0, len(sizes) - 1)
+        share = max(0, left) // flexible if flexible else 0
+
+        offset = inner.top if column else inner.left
+        for child, size in zip(self.children, sizes):
+            size = share if size is None else size
+            if column:
+                rect = pygame.Rect(inner.left, offset, inner.width, size)
+            else:
+                rect = pygame.Rect(offset, inner.top, size, inner.height)
+            if isinstance(child, Box):
+                child.place(rect, unit)
+            else:
+                child.place(rect)
+            offset += size + spacing
+
+    def nodes(self):
+        # Every node below this one, depth first in drawing order
+        for child in self.children:
+            yield child
+            if isinstance(child, Box):
+                yield from child.nodes()
+
+
+class Layout:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      Layout
+    #   Input:      root (Box)    – the screen's layout tree
+    #               cell (int)    – side of a hit-test grid cell, in pixels
+    #   Output:     The geometry, hit-testing, hover state and drawing of a screen's widgets
+    #   Description: resize() computes every rect once per display size and files the tappable widgets in a grid
+    #                of cell x cell buckets, so hit() looks at the few widgets of one bucket. Hover only changes
+    #                on MOUSEMOTION/WINDOWLEAVE events, never by polling the mouse, and only the widgets whose
+    #                hover state changed are marked dirty. compose() keeps the widgets drawn on a background the
+    #                size of the display, so a full repaint is one copy of the widget area instead of a blit per
+    #                widget, and a dirty-rect frame copies just the widgets that changed.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, root, cell=HIT_CELL, background_color=SCREEN_BG):
+        self.root = root
+        self.cell = cell
+        self.size = None
+        nodes = [root] + list(root.nodes())
+        self.nodes = {node.name: node for node in nodes if node.name}
+        self.widgets = [node for node in nodes if isinstance(node, Widget)]
+        self.grid = {}
+        self.hovered = None
+        self.background_color = background_color
+        self.background = None
+        self.area = pygame.Rect(0, 0, 0, 0)   # union of the widget rects
+
+    def __getitem__(self, name):
+        return self.nodes[name]
+
+    def resize(self, size):
+        # Lays the tree out for a display size; returns False (and does nothing) when the size did not change
+        size = tuple(size)
+        if size == self.size:
+            return False
+        self.size = size
+        self.root.place(pygame.Rect((0, 0), size), size[1])
+        self.background = None
+        if self.widgets:
+            self.area = self.widgets[0].rect.unionall([widget.rect for widget in self.widgets])
+        self.grid = {}
+        for widget in self.widgets:
+            if widget.hoverable or widget.action:
+                rect = widget.rect
+                for cx in range(rect.left // self.cell, (rect.right - 1) // self.cell + 1):
+                    for cy in range(rect.top // self.cell, (rect.bottom - 1) // self.cell + 1):
+                        self.grid.setdefault((cx, cy), []).append(widget)
+        self.set_hover(None)
+        return True
+
+    def hit(self, pos):
+        # Topmost tappable widget at pos, or None
+        for widget in reversed(self.grid.get((pos[0] // self.cell, pos[1] // self.cell), ())):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+    def set_hover(self, widget):
+        if widget is not None and not widget.hoverable:
+            widget = None
+        if widget is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.set_hovered(False)
+            if widget is not None:
+                widget.set_hovered(True)
+            self.hovered = widget
+
+    def handle_event(self, event):
+        # Updates the hover state; returns the action of a tapped widget (taps also arrive as MOUSEBUTTONDOWN)
+        if event.type == pygame.MOUSEMOTION:
+            self.set_hover(self.hit(event.pos))
+        elif event.type == pygame.WINDOWLEAVE:
+            self.set_hover(None)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            widget = self.hit(event.pos)
+            if widget is not None:
+                return widget.action
+        return None
+
+    def draw(self, target, full=False):
+        # Draws the dirty widgets (every widget when full); returns the rects drawn
+        return [widget.draw(target) for widget in self.widgets if full or widget.dirty]
+
+    def compose(self):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   compose
+        #   Input:      None
+        #   Output:     (pygame.Surface, list[pygame.Rect] or None) – the background with every widget drawn on it,
+        #                                                             and the rects redrawn since the last call
+        #                                                             (None: the whole background was repainted)
+        # -------------------------------------------------------------------------------------------------------------
+        if self.background is None:
+            self.background = pygame.Surface(self.size).convert()
+            self.background.fill(self.background_color)
+            self.draw(self.background, full=True)
+            return self.background, None
+        return self.background, self.draw(self.background)
+
+    def repaint(self, target):
+        # Full repaint of target: the widget area is copied from the background, the rest (nothing but the
+        # background color) is filled, which costs less than copying it
+        background, _ = self.compose()
+        area = self.area
+        width, height = self.size
+        target.blit(background, area, area)
+        for strip in ((0, 0, width, area.top), (0, area.bottom, width, height - area.bottom),
+                      (0, area.top, area.left, area.height), (area.right, area.top, width - area.right, area.height)):
+            if strip[2] > 0 and strip[3] > 0:
+                target.fill(self.background_color, strip)
+
+
+def screen_layout(banner, button, body):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   screen_layout
+    #   Input:      banner (Banner)   – top bar
+    #               button (Button)   – square button at the right end of the banner
+    #               body (Box)        – everything below the banner
+    #   Output:     Layout            – the frame every screen shares: banner, button, the line under them, body
+    # -----------------------------------------------------------------------------------------------------------------
+    return Layout(Box([
+        Box([banner, button], direction='row', size=BANNER_FRACTION),
+        Fill(BORDER_COLOR, size=BORDER_THICKNESS),
+        body,
+    ]))
+
+
+def banner_button(action, text="S"):
+    # The red square button at the right end of the banner
+    return Button(text, font_fraction=0.6, bg_color=(200, 30, 30), hover_color=(50, 50, 50), size=SQUARE,
+                  action=action)
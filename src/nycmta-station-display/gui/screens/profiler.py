@@ -0,0 +1,133 @@
+import time                   # Import time for high resolution timers
+from array import array       # Import array for the fixed-size sample buffers
+import pygame                 # Import pygame library for the overlay
+from screens.utils import get_font
+
+FRAME_STAGES = ('events', 'update', 'render', 'present')
+
+
+class FrameProfiler:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      FrameProfiler
+    #   Input:      capacity (int)        – number of frames kept (older frames are overwritten)
+    #               stages (tuple[str])   – stage names, in the order they run within a frame
+    #   Output:     Per-stage frame timings in a ring buffer
+    #   Description: The main loop calls begin_frame(), mark(stage) after every stage and end_frame(). Each
+    #                mark() records the time since the previous one, so the stages add up to the frame time.
+    #                Samples go into preallocated arrays; recording a frame allocates nothing.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, capacity=600, stages=FRAME_STAGES):
+        self.capacity = capacity
+        self.stages = tuple(stages)
+        self.samples = {stage: array('d', [0.0]) * capacity for stage in self.stages}
+        self.frame_times = array('d', [0.0]) * capacity
+        self.frame_count = 0
+        self.current = dict.fromkeys(self.stages, 0.0)
+        self._frame_start = 0.0
+        self._last = 0.0
+
+    def begin_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+        for stage in self.stages:
+            self.current[stage] = 0.0
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.current[stage] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        slot = self.frame_count % self.capacity
+        for stage in self.stages:
+            self.samples[stage][slot] = self.current[stage]
+        self.frame_times[slot] = self._last - self._frame_start
+        self.frame_count += 1
+
+    def values(self, stage=None):
+        # Recorded samples of a stage (or whole frames when stage is None), oldest first
+        buffer = self.frame_times if stage is None else self.samples[stage]
+        if self.frame_count <= self.capacity:
+            return list(buffer[:self.frame_count])
+        slot = self.frame_count % self.capacity
+        return list(buffer[slot:]) + list(buffer[:slot])
+
+    def last(self, stage=None):
+        # Most recently completed frame's sample
+        if not self.frame_count:
+            return 0.0
+        buffer = self.frame_times if stage is None else self.samples[stage]
+        return buffer[(self.frame_count - 1) % self.capacity]
+
+    def percentiles(self, stage=None, fractions=(0.50, 0.95, 0.99)):
+        ordered = sorted(self.values(stage))
+        if not ordered:
+            return [0.0] * len(fractions)
+        return [ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] for fraction in fractions]
+
+    def summary(self):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   summary
+        #   Input:      None
+        #   Output:     dict[str, tuple] – stage (and 'frame') -> (p50, p95, p99, max) in seconds
+        # -------------------------------------------------------------------------------------------------------------
+        rows = {}
+        for stage in self.stages + (None,):
+            values = self.values(stage)
+            rows[stage or 'frame'] = (*self.percentiles(stage), max(values, default=0.0))
+        return rows
+
+    def reset(self):
+        self.frame_count = 0
+
+
+class ProfilerOverlay:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ProfilerOverlay
+    #   Input:      profiler (FrameProfiler) – source of the timings
+    #               pos (tuple[int, int])     – top-left corner of the overlay
+    #               font_size (int)           – text size
+    #               refresh (float)           – seconds between text updates, so the numbers stay readable and
+    #                                           the overlay itself stays cheap
+    #   Output:     A small opaque box showing the previous frame's stage times and the p95 over the ring buffer
+    #   Description: draw() is called after the screen rendered and before the frame is presented. The box is
+    #                re-rendered at most every `refresh` seconds and blitted every frame; its rect is added to
+    #                the dirty rects in dirty-rect mode.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, profiler, pos=(10, 10), font_size=18, refresh=0.25):
+        self.profiler = profiler
+        self.pos = pos
+        self.font = get_font(None, font_size)
+        self.refresh = refresh
+        self.box = None
+        self.rendered_at = 0.0
+
+    def render_box(self):
+        profiler = self.profiler
+        lines = [f"{'':>8} {'last':>6} {'p95':>6}"]
+        for stage in profiler.stages + (None,):
+            p95 = profiler.percentiles(stage, (0.95,))[0]
+            lines.append(f"{stage or 'frame':>8} {profiler.last(stage) * 1000:>6.2f} {p95 * 1000:>6.2f}")
+        surfaces = [self.font.render(line, True, (255, 255, 0)) for line in lines]
+        width = max(surface.get_width() for surface in surfaces) + 12
+        height = sum(surface.get_height() for surface in surfaces) + 12
+        if self.box is not None:
+            # Never shrink, so a narrower box does not leave stale pixels behind in dirty-rect mode
+            width, height = max(width, self.box.get_width()), max(height, self.box.get_height())
+        box = pygame.Surface((width, height)).convert()
+        box.fill((0, 0, 0))
+        y = 6
+        for surface in surfaces:
+            box.blit(surface, (6, y))
+            y += surface.get_height()
+        self.box = box
+
+    def draw(self, surface, rects=None):
+        # Draws the overlay; returns rects (with the overlay added) for ScreenManager.present
+        now = time.monotonic()
+        if self.box is None or now - self.rendered_at >= self.refresh:
+            self.render_box()
+            self.rendered_at = now
+        rect = surface.blit(self.box, self.pos)
+        if rects is None:
+            return None
+        return list(rects) + [rect]
@@ -1,12 +1,78 @@
 # screen_manager.py
+import pygame
 from screens.home_screen import HomeScreen
 from screens.settings_screen import SettingsScreen
 
+# Every screen that "goto:<name>" can navigate to
+SCREEN_CLASSES = {
+    "HomeScreen": HomeScreen,
+    "SettingsScreen": SettingsScreen,
+}
+
 class ScreenManager:
-    def __init__(self, screen, frame_rate):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ScreenManager
+    #   Input:      screen (pygame.Surface)  – display surface
+    #               frame_rate (int)         – frame rate the screens animate at
+    #               dirty_rects (bool)       – render only what changed and report it, instead of full frames
+    #               initial_screen (str)     – name of the first screen
+    #               data_service (DataService) – optional source of arrival snapshots handed to every screen
+    #               station_id (str)         – stop_id the screens show arrivals for
+    #   Output:     Owner of every screen instance and of the current-screen switch
+    #   Description: Screens are constructed once and kept alive, so navigating back and forth does not reload
+    #                images, fonts or buttons, and each screen keeps its state. Screens that have not been shown
+    #                yet are built one at a time by preload_next(), which the main loop calls after the first frame
+    #                is on the display.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, screen, frame_rate, dirty_rects=False, initial_screen="HomeScreen",
+                 data_service=None, station_id=None):
         self.screen = screen
         self.frame_rate = frame_rate
-        self.current_screen = HomeScreen(screen, frame_rate)
+        self.dirty_rects = dirty_rects
+        self.data_service = data_service
+        self.station_id = station_id
+        self.schedule = None
+        self.static = None
+        self.screens = {}
+        self.current_screen = self.get_screen(initial_screen)
+        self.current_screen.on_enter()
+
+    def get_screen(self, screen_name):
+        # Registered screen instance, constructed on first use
+        screen = self.screens.get(screen_name)
+        if screen is None:
+            screen = self.screens[screen_name] = SCREEN_CLASSES[screen_name](self.screen, self.frame_rate)
+            screen.data_service = self.data_service
+            screen.station_id = self.station_id
+            screen.schedule = self.schedule
+            screen.static = self.static
+        return screen
+
+    def set_data_service(self, data_service):
+        # Hands a data service to every screen when it was started after the screens were built (kiosk.py)
+        self.data_service = data_service
+        for screen in self.screens.values():
+            screen.data_service = data_service
+
+    def set_static(self, static):
+        # Hands the StaticGTFS cache to every screen once it has been loaded (may be called from another thread)
+        self.static = static
+        for screen in list(self.screens.values()):
+            screen.static = static
+
+    def set_schedule(self, schedule):
+        # Hands a ScheduleEngine to every screen once it has been loaded (may be called from another thread)
+        self.schedule = schedule
+        for screen in list(self.screens.values()):
+            screen.schedule = schedule
+
+    def preload_next(self):
+        # Build one screen that does not exist yet; returns False once every screen is built
+        for screen_name in SCREEN_CLASSES:
+            if screen_name not in self.screens:
+                self.get_screen(screen_name)
+                return True
+        return False
 
     def handle_event(self, event):
         result = self.current_screen.handle_event(event)
@@ -18,10 +84,25 @@ class ScreenManager:
         self.current_screen.update()
 
     def render(self):
+        # Returns the dirty rects to push to the display, or None when the whole display must be flipped
+        if self.dirty_rects:
+            return self.current_screen.render_dirty()
         self.current_screen.render()
+        return None
+
+    def present(self, rects):
+        # Push a frame returned by render() to the display
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
 
     def change_screen(self, screen_name):
-        if screen_name == "HomeScreen":
-            self.current_screen = HomeScreen(self.screen, self.frame_rate)
-        elif screen_name == "SettingsScreen":
-            self.current_screen = SettingsScreen(self.screen, self.frame_rate)
+        if screen_name not in SCREEN_CLASSES:
+            return
+        next_screen = self.get_screen(screen_name)
+        if next_screen is self.current_screen:
+            return
+        self.current_screen.on_exit()
+        self.current_screen = next_screen
+        self.current_screen.on_enter()
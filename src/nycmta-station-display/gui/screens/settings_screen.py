@@ -1,6 +1,4 @@
-import pygame
-import os
-from screens.utils import crop_transparent_border, draw_banner, Button
+from screens.layout import SPACER_FRACTION, Banner, Box, Button, banner_button, screen_layout
 from screens.base_screen import BaseScreen  # You’ll create this base class
 
 class SettingsScreen(BaseScreen):
@@ -8,88 +6,57 @@ class SettingsScreen(BaseScreen):
         super().__init__(screen)
         self.screen = screen
         self.frame_rate = frame_rate
-        self.WIDTH, self.HEIGHT = screen.get_size()
 
-        # Layout constants
-        self.BANNER_HEIGHT = int(self.HEIGHT * 0.10)
-        self.SPACER = int(self.HEIGHT * 0.05)
-        self.BUTTON_HEIGHT = int(self.HEIGHT * 0.10)
-        self.BUTTON_WIDTH = self.WIDTH
-
-        # Colors
-        self.SCREEN_BG = (0, 0, 0)
-        self.BANNER_BG = (40, 40, 40)
-        self.BORDER_COLOR = (255, 255, 255)
-        self.BORDER_THICKNESS = 2
+        # Layout constants (the banner and colors are shared with every screen, see layout.py)
+        self.BUTTON_FRACTION = 0.10
         self.BUTTON_BG_COLOR = (20, 20, 20)
         self.BUTTON_BORDER_COLOR = (200, 200, 200)
-        self.BUTTON_BORDER_THICKNESS = 20
         self.BUTTON_BORDER_SIDES = ["top", "bottom"]
 
-        # Fonts
-        self.banner_font = pygame.font.SysFont("Helvetica", int(self.BANNER_HEIGHT * 0.6))
-        self.button_font = pygame.font.SysFont("Helvetica", int(self.BUTTON_HEIGHT * 0.5))
-
         # Load and scale images
         self.load_images()
 
-        self.home_button = Button(
-            text="S",  # icon-only button
-            pos=(self.WIDTH - self.BANNER_HEIGHT, 0),  # top-right corner
-            size=(self.BANNER_HEIGHT,self.BANNER_HEIGHT),    # square button
-            font=self.banner_font,
-            bg_color=(200, 30, 30),
-            text_color=(255, 255, 255),
-            hover_color=(50, 50, 50),
-            icon=None  # must be a pygame.Surface
-        )
+        self.banner = Banner(left_text="Settings")
+        self.home_button = banner_button("goto:HomeScreen")
 
         # Settings Buttons (initial visible set)
         self.settings_labels = ["Wi-Fi Settings", "Display Options", "Audio Settings", "System Info"]
-        self.setting_buttons = []
-        for i, label in enumerate(self.settings_labels):
-            btn = Button(
-                text=label,
-                pos=(self.SPACER, self.BANNER_HEIGHT + self.SPACER + i * (self.BUTTON_HEIGHT + self.SPACER)),
-                size=(self.BUTTON_WIDTH - 2 * self.SPACER, self.BUTTON_HEIGHT),
-                font=self.button_font,
-                bg_color=self.BUTTON_BG_COLOR,
-                text_color=(255, 255, 255),
-                hover_color=(90, 90, 90),
-                border_color=(200,200,200),
-                border_thickness=2,
-                border_sides=self.BUTTON_BORDER_SIDES
-            )
-            self.setting_buttons.append(btn)
+        self.setting_buttons = [
+            Button(label, font_fraction=0.5, bg_color=self.BUTTON_BG_COLOR, hover_color=(90, 90, 90),
+                   border_color=self.BUTTON_BORDER_COLOR, border_thickness=2, border_sides=self.BUTTON_BORDER_SIDES,
+                   size=self.BUTTON_FRACTION)
+            for label in self.settings_labels
+        ]
+
+        # Geometry is computed here and again only when the display size changes
+        self.layout = screen_layout(self.banner, self.home_button,
+                                    Box(self.setting_buttons, padding=SPACER_FRACTION, spacing=SPACER_FRACTION))
+        self.layout.resize(screen.get_size())
 
     def load_images(self):
         ""
 
+    def on_exit(self):
+        self.layout.set_hover(None)
+
     def handle_event(self, event):
-        if self.home_button.handle_event(event):
-            return "goto:HomeScreen"
-        return None
+        return self.layout.handle_event(event)
 
     def update(self):
         pass
 
     def render(self):
-        self.screen.fill(self.SCREEN_BG)
-
-        draw_banner(
-            screen=self.screen,
-            screen_width=self.WIDTH,
-            banner_height=self.BANNER_HEIGHT,
-            banner_font=self.banner_font,
-            banner_background_color=self.BANNER_BG,
-            banner_border_color=self.BORDER_COLOR,
-            banner_border_thickness=self.BORDER_THICKNESS,
-            left_text="Settings",
-            center_text="",
-            right_text="",
-            right_button=self.home_button
-        )
-
-        for button in self.setting_buttons:
-            button.hovered = button.rect.collidepoint(pygame.mouse.get_pos())
-            button.draw(self.screen)
+        self.layout.resize(self.screen.get_size())
+        self.layout.repaint(self.screen)
+
+    def render_dirty(self):
+        # Everything but the buttons is static, so after the first frame only buttons whose hover state changed
+        self.layout.resize(self.screen.get_size())
+        background, rects = self.layout.compose()
+        if self.full_redraw or rects is None:
+            self.layout.repaint(self.screen)
+            self.full_redraw = False
+            return None
+        for rect in rects:
+            self.screen.blit(background, rect, rect)
+        return rects
@@ -0,0 +1,84 @@
+from array import array       # Import array for the precomputed scroll positions
+import pygame                 # Import pygame library for surfaces and rects
+
+
+def prepare_sprite(image, background_color):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   prepare_sprite
+    #   Input:      image (pygame.Surface)     – per-pixel-alpha image, e.g. a scaled train
+    #               background_color (tuple)   – RGB color the sprite is drawn over
+    #   Output:     pygame.Surface             – opaque, display-format copy with an RLE-accelerated color key
+    #   Description: Alpha-blending a large image every frame is the most expensive blit pygame does. The image
+    #                is composited onto the background color once and converted to the display format; pixels
+    #                of exactly that color become a color key, so sprites can still overlap each other.
+    # -----------------------------------------------------------------------------------------------------------------
+    sprite = pygame.Surface(image.get_size()).convert()
+    sprite.fill(background_color)
+    sprite.blit(image, (0, 0))
+    sprite.set_colorkey(background_color, pygame.RLEACCEL)
+    return sprite
+
+
+def scroll_path(start, end, step):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   scroll_path
+    #   Input:      start, end (float)  – first position and the position past which the cycle restarts
+    #               step (float)        – pixels per frame (negative to scroll left)
+    #   Output:     array('i')          – the x position of every frame of one animation cycle
+    #   Description: Positions are rounded from start + frame * step, so the fractional speed never drifts and
+    #                the per-frame update is an index increment.
+    # -----------------------------------------------------------------------------------------------------------------
+    positions = array('i')
+    frame = 0
+    x = start
+    while (x <= end) if step > 0 else (x >= end):
+        positions.append(int(round(x)))
+        frame += 1
+        x = start + frame * step
+    return positions
+
+
+class SpriteLayer:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      SpriteLayer
+    #   Input:      None
+    #   Output:     A set of moving sprites drawn over a cached background
+    #   Description: set_sprites() replaces what should be on screen - any number of (surface, x, y), e.g. one
+    #                train per live arrival. draw() restores the background under the previous frame's sprites,
+    #                draws the new ones and returns the changed rects; draw_full() draws them over a frame that
+    #                was already repainted.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.sprites = []
+        self.drawn = []
+
+    def set_sprites(self, sprites):
+        self.sprites = list(sprites)
+
+    def forget(self):
+        # The display was repainted; nothing needs to be erased next frame
+        self.drawn = []
+
+    def _blit_all(self, surface):
+        rects = []
+        for image, x, y in self.sprites:
+            rect = image.get_rect(topleft=(int(x), y))
+            surface.blit(image, rect)
+            rects.append(rect)
+        return rects
+
+    def draw_full(self, surface):
+        self.drawn = self._blit_all(surface)
+
+    def draw(self, surface, background):
+        # Erase every sprite first, then draw them all, so overlapping sprites stay intact
+        for old in self.drawn:
+            surface.blit(background, old, old)
+        new_rects = self._blit_all(surface)
+
+        if self.drawn and len(self.drawn) == len(new_rects):
+            dirty = [old.union(new) for old, new in zip(self.drawn, new_rects)]
+        else:
+            dirty = self.drawn + new_rects
+        self.drawn = new_rects
+        return dirty
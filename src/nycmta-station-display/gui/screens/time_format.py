@@ -0,0 +1,76 @@
+import time                   # Import time for the wall clock and the monotonic tick
+from functools import lru_cache # Import lru_cache to memoize formatted strings
+
+CLOCK_FORMAT = "%A, %B %d   %I:%M %p"
+MAX_COUNTDOWN_MINUTES = 180
+
+
+@lru_cache(maxsize=None)
+def countdown_label(minutes):
+    # "3 min"; one string per whole minute, shared by every arrival list
+    return f"{minutes} min"
+
+
+class TimeFormatter:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      TimeFormatter
+    #   Input:      clock_format (str) – strftime format of the banner clock
+    #   Output:     Cached clock text and arrival countdowns, advanced by one tick per frame
+    #   Description: tick() reads the monotonic clock once per frame and derives the wall time from it, so every
+    #                string produced during a frame uses the same "now". The clock text is only re-formatted
+    #                when a minute boundary is crossed (that is also when the monotonic/wall offset is re-synced,
+    #                so clock adjustments are picked up within a minute). Countdowns come from a table of
+    #                per-minute labels instead of formatting a new string for every train on every frame.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, clock_format=CLOCK_FORMAT):
+        self.clock_format = clock_format
+        self.offset = time.time() - time.monotonic()
+        self.now = time.time()
+        self.clock_text = None
+        self.clock_expires = 0.0
+        self.format_count = 0
+        self.tick()
+
+    def tick(self):
+        # Advance to the current time; returns it (POSIX seconds)
+        self.now = self.offset + time.monotonic()
+        if self.now >= self.clock_expires:
+            self.offset = time.time() - time.monotonic()
+            self.now = self.offset + time.monotonic()
+            self.clock_text = time.strftime(self.clock_format, time.localtime(self.now))
+            self.clock_expires = self.now - self.now % 60 + 60
+            self.format_count += 1
+        return self.now
+
+    def clock(self):
+        # Banner clock text as of the last tick
+        return self.clock_text
+
+    def next_minute(self):
+        # POSIX time at which clock() changes next
+        return self.clock_expires
+
+    def minutes_until(self, arrival_time):
+        return max(0, int(arrival_time - self.now) // 60)
+
+    def countdown(self, arrival_time):
+        return countdown_label(min(self.minutes_until(arrival_time), MAX_COUNTDOWN_MINUTES))
+
+    def countdowns(self, arrival_times):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   countdowns
+        #   Input:      arrival_times (iterable[int]) – POSIX arrival times
+        #   Output:     list[str]                     – "N min" for each, as of the last tick
+        # -------------------------------------------------------------------------------------------------------------
+        now = self.now
+        return [countdown_label(min(max(0, int(arrival_time - now) // 60), MAX_COUNTDOWN_MINUTES))
+                for arrival_time in arrival_times]
+
+    def next_countdown_change(self, arrival_times):
+        # POSIX time at which the first of the countdowns changes (or the clock, if that comes first)
+        deadline = self.clock_expires
+        for arrival_time in arrival_times:
+            remaining = arrival_time - self.now
+            if remaining >= 0:
+                deadline = min(deadline, self.now + remaining % 60 + 0.001)
+        return deadline
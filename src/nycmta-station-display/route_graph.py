@@ -0,0 +1,291 @@
+import csv                        # Import csv to read route_stations.txt and transfers.txt
+import os                         # Import os for file path handling
+import sys                        # Import sys for command line arguments
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+
+from arrival_index import ArrivalIndex
+from static_cache import ASSETS_DIR, TABLES
+
+ROUTE_STATIONS_PATH = os.path.join(ASSETS_DIR, TABLES['route_stations'][0])
+TRANSFERS_PATH = os.path.join(ASSETS_DIR, TABLES['transfers'][0])
+
+NO_POSITION = 0xFFFF
+
+
+def parent_station_id(stop_id):
+    # 'G35N' -> 'G35'; parent station ids are returned unchanged
+    return stop_id[:-1] if stop_id[-1:] in ('N', 'S') and len(stop_id) > 3 else stop_id
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class RouteGraph:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      RouteGraph
+    #   Input:      route_station_rows (list[dict]) – rows of route_stations.txt (route_id, stop_sequence, station_id)
+    #               transfer_rows (list[dict])      – rows of transfers.txt (from_stop_id, to_stop_id,
+    #                                                 min_transfer_time)
+    #   Output:     An indexed route/station graph, built once at start-up
+    #   Description: Stations and routes are numbered and every table is a flat array:
+    #                  - route_offsets / route_stations  – each route's stations in stop_sequence order (CSR)
+    #                  - positions                       – route x station -> position on the route (NO_POSITION
+    #                                                      if the route does not stop there), so "does this route
+    #                                                      go from A to B" is two array reads
+    #                  - adjacency_offsets / adjacency    – neighbouring stations along any route (CSR)
+    #                  - transfer_offsets / transfer_targets / transfer_times – walking transfers (CSR)
+    #                Transfer points between every pair of routes are precomputed, so a one-transfer ETA only
+    #                looks at the handful of stations where two routes meet.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, route_station_rows, transfer_rows=()):
+        by_route = defaultdict(list)
+        coordinates = {}
+        for row in route_station_rows:
+            by_route[row['route_id']].append((int(row['stop_sequence']), row['station_id']))
+            if row.get('stop_lat'):
+                coordinates[row['station_id']] = float(row['stop_lat'])
+
+        self.routes = sorted(by_route)
+        self.route_index = {route_id: i for i, route_id in enumerate(self.routes)}
+        self.stations = sorted({station for stops in by_route.values() for _, station in stops})
+        self.station_index = {station: i for i, station in enumerate(self.stations)}
+        station_count = len(self.stations)
+
+        # Route -> stations in sequence order, and the route x station position table
+        self.route_offsets = array('I', [0])
+        self.route_stations = array('H')
+        self.positions = array('H', [NO_POSITION]) * (len(self.routes) * station_count)
+        for r, route_id in enumerate(self.routes):
+            for position, (_, station) in enumerate(sorted(by_route[route_id])):
+                s = self.station_index[station]
+                self.route_stations.append(s)
+                if self.positions[r * station_count + s] == NO_POSITION:
+                    self.positions[r * station_count + s] = position
+            self.route_offsets.append(len(self.route_stations))
+
+        # Which realtime direction ('N'/'S') runs in increasing stop_sequence. The listed order is not always the
+        # same (e.g. the L starts at Canarsie), so it is guessed: NYCT numbers the stations of a line in
+        # southbound order ('G22' -> 'G36'), and latitude decides for routes where that gives no answer.
+        # calibrate() replaces the guess with what a realtime feed shows.
+        self.increasing = {}
+        for r, route_id in enumerate(self.routes):
+            stops = [self.stations[s] for s in self.route_stations[self.route_offsets[r]:self.route_offsets[r + 1]]]
+            votes = 0
+            for a, b in zip(stops, stops[1:]):
+                if a[0] == b[0] and a[1:].isdigit() and b[1:].isdigit():
+                    votes += 1 if int(b[1:]) > int(a[1:]) else -1
+            if votes == 0:
+                votes = 1 if coordinates.get(stops[0], 0.0) >= coordinates.get(stops[-1], 0.0) else -1
+            self.increasing[route_id] = 'S' if votes > 0 else 'N'
+
+        # Station -> routes stopping there
+        station_routes = [[] for _ in range(station_count)]
+        neighbours = [set() for _ in range(station_count)]
+        for r in range(len(self.routes)):
+            stops = self.route_stations[self.route_offsets[r]:self.route_offsets[r + 1]]
+            for i, s in enumerate(stops):
+                if r not in station_routes[s]:
+                    station_routes[s].append(r)
+                if i:
+                    neighbours[s].add(stops[i - 1])
+                    neighbours[stops[i - 1]].add(s)
+        self.station_route_offsets, self.station_routes = self._csr(station_routes)
+        self.adjacency_offsets, self.adjacency = self._csr([sorted(n) for n in neighbours])
+
+        # Walking transfers between different stations (same-station changes are implied)
+        transfers = [dict() for _ in range(station_count)]
+        for row in transfer_rows:
+            s = self.station_index.get(row['from_stop_id'])
+            t = self.station_index.get(row['to_stop_id'])
+            if s is None or t is None:
+                continue
+            transfers[s][t] = int(row.get('min_transfer_time') or 0)
+        for s in range(station_count):
+            transfers[s].setdefault(s, 0)
+        self.transfer_offsets, self.transfer_targets = self._csr([sorted(t) for t in transfers])
+        self.transfer_times = array('I', (transfers[s][t] for s in range(station_count) for t in sorted(transfers[s])))
+
+        # (route, other route) -> [(station on route, station on other route, seconds), ...]
+        self._transfer_points = defaultdict(list)
+        for s in range(station_count):
+            for i in range(self.transfer_offsets[s], self.transfer_offsets[s + 1]):
+                t, seconds = self.transfer_targets[i], self.transfer_times[i]
+                for r in self._routes_at(s):
+                    for other in self._routes_at(t):
+                        if other != r:
+                            self._transfer_points[r, other].append((s, t, seconds))
+
+    @staticmethod
+    def _csr(lists):
+        offsets = array('I', [0])
+        values = array('H')
+        for items in lists:
+            values.extend(items)
+            offsets.append(len(values))
+        return offsets, values
+
+    @classmethod
+    def from_csv(cls, route_stations_path=ROUTE_STATIONS_PATH, transfers_path=TRANSFERS_PATH):
+        return cls(_read_csv(route_stations_path), _read_csv(transfers_path))
+
+    @classmethod
+    def from_static(cls, static):
+        # Build from a loaded StaticGTFS cache instead of parsing the text files
+        tables = [static.tables['route_stations'], static.tables['transfers']]
+        return cls(*([table.row(row) for row in range(len(table))] for table in tables))
+
+    def _routes_at(self, s):
+        return self.station_routes[self.station_route_offsets[s]:self.station_route_offsets[s + 1]]
+
+    def position(self, route_id, station_id):
+        # Position of a station along a route (0 = first stop_sequence), or None
+        r = self.route_index.get(route_id)
+        s = self.station_index.get(parent_station_id(station_id))
+        if r is None or s is None:
+            return None
+        position = self.positions[r * len(self.stations) + s]
+        return None if position == NO_POSITION else position
+
+    def route_stops(self, route_id):
+        r = self.route_index[route_id]
+        return [self.stations[s] for s in self.route_stations[self.route_offsets[r]:self.route_offsets[r + 1]]]
+
+    def routes_at(self, station_id):
+        s = self.station_index.get(parent_station_id(station_id))
+        return [] if s is None else [self.routes[r] for r in self._routes_at(s)]
+
+    def neighbours(self, station_id):
+        s = self.station_index[parent_station_id(station_id)]
+        return [self.stations[t] for t in self.adjacency[self.adjacency_offsets[s]:self.adjacency_offsets[s + 1]]]
+
+    def transfers(self, station_id):
+        # [(station_id, min_transfer_time seconds), ...] reachable on foot, including the station itself
+        s = self.station_index[parent_station_id(station_id)]
+        return [(self.stations[self.transfer_targets[i]], self.transfer_times[i])
+                for i in range(self.transfer_offsets[s], self.transfer_offsets[s + 1])]
+
+    def direction(self, route_id, from_station, to_station):
+        # Realtime direction suffix ('N'/'S') of a route train going from from_station to to_station, or None
+        start = self.position(route_id, from_station)
+        end = self.position(route_id, to_station)
+        if start is None or end is None or start == end:
+            return None
+        increasing = self.increasing[route_id]
+        return increasing if end > start else ('S' if increasing == 'N' else 'N')
+
+    def reaches(self, route_id, direction, from_station, to_station):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   reaches
+        #   Input:      route_id (str)      – route of the train, e.g. 'G'
+        #               direction (str)     – 'N' or 'S', the suffix of the stop_id the train is at
+        #               from_station (str)  – where the train is, e.g. 'G35N' or 'G35'
+        #               to_station (str)    – destination station
+        #   Output:     bool                – True if the route continues to to_station in that direction (O(1))
+        # -------------------------------------------------------------------------------------------------------------
+        return direction is not None and self.direction(route_id, from_station, to_station) == direction
+
+    def calibrate(self, feed):
+        # Learn each route's direction from a realtime feed: consecutive stop_time_updates of a trip tell whether
+        # its direction runs in increasing stop_sequence
+        votes = defaultdict(int)
+        for entity in feed.entity:
+            if not entity.HasField('trip_update'):
+                continue
+            route_id = entity.trip_update.trip.route_id
+            stops = entity.trip_update.stop_time_update
+            if route_id not in self.route_index or len(stops) < 2:
+                continue
+            first, second = self.position(route_id, stops[0].stop_id), self.position(route_id, stops[1].stop_id)
+            direction = stops[0].stop_id[-1:]
+            if first is None or second is None or first == second or direction not in ('N', 'S'):
+                continue
+            votes[route_id, direction if second > first else ('S' if direction == 'N' else 'N')] += 1
+        for route_id in self.routes:
+            if votes[route_id, 'N'] != votes[route_id, 'S']:
+                self.increasing[route_id] = 'N' if votes[route_id, 'N'] > votes[route_id, 'S'] else 'S'
+
+    def transfer_points(self, route_id, other_route_id):
+        # [(station on route_id, station on other_route_id, min_transfer_time), ...]
+        points = self._transfer_points.get((self.route_index[route_id], self.route_index[other_route_id]), ())
+        return [(self.stations[s], self.stations[t], seconds) for s, t, seconds in points]
+
+    def eta(self, schedule, trip_id, route_id, stop_id, destination):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   eta
+        #   Input:      schedule (TripSchedule) – realtime trip times of the current feeds
+        #               trip_id, route_id (str) – the arriving train
+        #               stop_id (str)           – where it is boarded, e.g. 'G35N'
+        #               destination (str)       – destination station, e.g. 'A27'
+        #   Output:     (int, str or None) or None – POSIX arrival time at the destination and the station to change
+        #                                            at (None when the train goes there directly), or None when the
+        #                                            destination is not reachable with at most one transfer
+        # -------------------------------------------------------------------------------------------------------------
+        destination = parent_station_id(destination)
+        direction = stop_id[-1:]
+        if self.reaches(route_id, direction, stop_id, destination):
+            arrival = schedule.time_at(trip_id, destination + direction)
+            return (arrival, None) if arrival else None
+
+        best = None
+        for other_route_id in self.routes_at(destination):
+            if other_route_id == route_id:
+                continue
+            for station, other_station, seconds in self.transfer_points(route_id, other_route_id):
+                if not self.reaches(route_id, direction, stop_id, station):
+                    continue
+                other_direction = self.direction(other_route_id, other_station, destination)
+                if other_direction is None:
+                    continue
+                alight = schedule.time_at(trip_id, station + direction)
+                if not alight:
+                    continue
+                connection = schedule.next_trip(other_station + other_direction, other_route_id, alight + seconds)
+                if connection is None:
+                    continue
+                arrival = schedule.time_at(connection, destination + other_direction)
+                if arrival and (best is None or arrival < best[0]):
+                    best = (arrival, station)
+        return best
+
+
+class TripSchedule:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      TripSchedule
+    #   Input:      feeds (list[gtfs_realtime_pb2.FeedMessage]) – current realtime feeds
+    #   Output:     Per-trip and per-stop realtime times for RouteGraph.eta
+    #   Description: time_at(trip, stop) is a dict lookup; next_trip(stop, route, after) bisects the stop's sorted
+    #                arrivals. Build one per feed refresh.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, feeds):
+        self.index = ArrivalIndex.merge(ArrivalIndex(feed) for feed in feeds)
+        self.trip_times = defaultdict(dict)
+        self._times = {}
+        for stop_id, arrivals in self.index.by_stop.items():
+            self._times[stop_id] = [arrival['arrival_time'] for arrival in arrivals]
+            for arrival in arrivals:
+                self.trip_times[arrival['trip_id']][stop_id] = arrival['arrival_time']
+
+    def time_at(self, trip_id, stop_id):
+        return self.trip_times.get(trip_id, {}).get(stop_id)
+
+    def next_trip(self, stop_id, route_id, after):
+        # trip_id of the first route_id train at stop_id later than `after`, or None
+        arrivals = self.index.by_stop.get(stop_id, [])
+        for i in range(bisect_right(self._times.get(stop_id, []), after), len(arrivals)):
+            if arrivals[i]['route_id'] == route_id:
+                return arrivals[i]['trip_id']
+        return None
+
+
+if __name__ == "__main__":
+    # Usage: python route_graph.py <from station> <to station>
+    graph = RouteGraph.from_csv()
+    print(f"{len(graph.stations)} stations, {len(graph.routes)} routes, {len(graph.adjacency) // 2} track segments, "
+          f"{len(graph.transfer_targets)} transfers")
+    if len(sys.argv) > 2:
+        for route_id in graph.routes_at(sys.argv[1]):
+            print(route_id, graph.direction(route_id, sys.argv[1], sys.argv[2]) or "-")
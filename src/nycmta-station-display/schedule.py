@@ -0,0 +1,284 @@
+import csv                        # Import csv to read the static GTFS text files
+import datetime                   # Import datetime for service dates and local midnights
+import heapq                      # Import heapq to merge departures of several services
+import math                       # Import math for distances between stations
+import os                         # Import os for file path handling
+import sys                        # Import sys for command line arguments
+import time                       # Import time for the current time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+
+from route_graph import ROUTE_STATIONS_PATH, RouteGraph, parent_station_id
+from static_cache import ASSETS_DIR, realtime_trip_id
+
+RAW_DIR = os.path.join(ASSETS_DIR, "gtfs_subway_raw")
+TRIPS_PATH = os.path.join(RAW_DIR, "trips.txt")
+CALENDAR_PATH = os.path.join(RAW_DIR, "calendar.txt")
+CALENDAR_DATES_PATH = os.path.join(RAW_DIR, "calendar_dates.txt")
+AGENCY_PATH = os.path.join(RAW_DIR, "agency.txt")
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+SERVICE_ADDED, SERVICE_REMOVED = '1', '2'
+
+# The feed has no stop_times.txt, so times along a route are estimated from the distance between stations
+RUN_SPEED = 40 / 3.6              # metres per second between stations
+DWELL_TIME = 30                   # seconds spent at every station
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _parse_date(value):
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def origin_seconds(trip_id):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   origin_seconds
+    #   Input:      trip_id (str) – static or realtime trip_id, e.g. '...-Sunday-00_000600_1..S03R'
+    #   Output:     int           – departure from the first stop in seconds after the service day's midnight
+    #   Description: NYCT trip ids carry the origin time in hundredths of a minute ('000600' = 00:06); trips
+    #                after midnight continue past 24:00 of their service day.
+    # -----------------------------------------------------------------------------------------------------------------
+    return int(realtime_trip_id(trip_id).split('_', 1)[0]) * 60 // 100
+
+
+def trip_direction(trip_id):
+    # '000600_1..S03R' -> 'S'
+    return trip_id.rsplit('.', 1)[-1][:1]
+
+
+class ServiceCalendar:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ServiceCalendar
+    #   Input:      calendar_rows (list[dict])       – rows of calendar.txt
+    #               calendar_date_rows (list[dict])  – rows of calendar_dates.txt
+    #   Output:     The service_ids running on a given date
+    #   Description: active_services() follows GTFS exactly: a service runs on a date when its weekday flag is set
+    #                and the date is in its range, unless calendar_dates removes it; calendar_dates can also add
+    #                a service on any date. The shipped calendar only covers a few weeks, so services_for() falls
+    #                back to the weekday pattern alone once a date is outside every range - a weekday schedule
+    #                that is a little out of date beats showing nothing.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, calendar_rows, calendar_date_rows=()):
+        self.services = {}
+        for row in calendar_rows:
+            days = tuple(row[day] == '1' for day in WEEKDAYS)
+            self.services[row['service_id']] = (days, _parse_date(row['start_date']), _parse_date(row['end_date']))
+        self.added = defaultdict(set)
+        self.removed = defaultdict(set)
+        for row in calendar_date_rows:
+            exceptions = self.added if row['exception_type'] == SERVICE_ADDED else self.removed
+            exceptions[_parse_date(row['date'])].add(row['service_id'])
+        self._cache = {}
+
+    @classmethod
+    def from_csv(cls, calendar_path=CALENDAR_PATH, calendar_dates_path=CALENDAR_DATES_PATH):
+        calendar_dates = _read_csv(calendar_dates_path) if os.path.exists(calendar_dates_path) else []
+        return cls(_read_csv(calendar_path), calendar_dates)
+
+    def covers(self, date):
+        return any(start <= date <= end for _, start, end in self.services.values()) or date in self.added
+
+    def active_services(self, date):
+        # frozenset of the service_ids running on date (datetime.date)
+        active = {service_id for service_id, (days, start, end) in self.services.items()
+                  if days[date.weekday()] and start <= date <= end}
+        return frozenset((active - self.removed.get(date, set())) | self.added.get(date, set()))
+
+    def services_for(self, date):
+        # active_services(), or the services whose weekday pattern matches once the calendar has run out
+        services = self._cache.get(date)
+        if services is None:
+            if self.covers(date):
+                services = self.active_services(date)
+            else:
+                services = frozenset(service_id for service_id, (days, _, _) in self.services.items()
+                                     if days[date.weekday()])
+            self._cache[date] = services
+        return services
+
+
+class ScheduleEngine:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      ScheduleEngine
+    #   Input:      trip_rows (list[dict])            – rows of trips.txt
+    #               calendar (ServiceCalendar)        – which services run when
+    #               graph (RouteGraph)                – station order and direction of every route
+    #               coordinates (dict[str, tuple])    – station_id -> (lat, lon), for the running time estimate
+    #               timezone (str)                    – agency timezone the schedule is written in
+    #   Output:     Scheduled departures for when realtime data is stale or lacks a route
+    #   Description: There is no stop_times.txt, so every trip is assumed to run its whole route from its origin
+    #                time (encoded in the trip_id), and the time to each station is estimated once per route and
+    #                direction from the distances between stations. For each service_id a per-stop index is
+    #                built on first use: stop_id -> departure seconds after midnight (sorted array) plus the
+    #                matching trip numbers. departures() bisects the indexes of the services running on the
+    #                query date (and on the previous date, for trips past midnight) and merges the first K.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, trip_rows, calendar, graph, coordinates, timezone='America/New_York'):
+        self.calendar = calendar
+        self.graph = graph
+        self.timezone = ZoneInfo(timezone)
+        self.trip_ids = []
+        self.route_ids = []
+        self.skipped = 0
+
+        # (route, direction) -> seconds from the origin to each station, in running order
+        self.patterns = {}
+        for route_id in graph.routes:
+            stops = graph.route_stops(route_id)
+            increasing = graph.increasing[route_id]
+            for direction in ('N', 'S'):
+                ordered = stops if direction == increasing else stops[::-1]
+                offsets, elapsed = [], 0.0
+                for i, station in enumerate(ordered):
+                    if i:
+                        elapsed += DWELL_TIME + self._distance(coordinates, ordered[i - 1], station) / RUN_SPEED
+                    offsets.append((station + direction, int(elapsed)))
+                self.patterns[route_id, direction] = offsets
+
+        # service_id -> [(trip number, origin seconds, pattern), ...]
+        self.service_trips = defaultdict(list)
+        for row in trip_rows:
+            pattern = self.patterns.get((row['route_id'], trip_direction(row['trip_id'])))
+            if pattern is None:
+                self.skipped += 1
+                continue
+            number = len(self.trip_ids)
+            self.trip_ids.append(realtime_trip_id(row['trip_id']))
+            self.route_ids.append(row['route_id'])
+            self.service_trips[row['service_id']].append((number, origin_seconds(row['trip_id']), pattern))
+        self._indexes = {}
+
+    @staticmethod
+    def _distance(coordinates, a, b):
+        # Metres between two stations (equirectangular approximation, plenty at city scale)
+        (lat1, lon1), (lat2, lon2) = coordinates.get(a, (0.0, 0.0)), coordinates.get(b, (0.0, 0.0))
+        x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+        y = math.radians(lat2 - lat1)
+        return 6371000 * math.hypot(x, y)
+
+    @classmethod
+    def from_csv(cls, trips_path=TRIPS_PATH, calendar=None, graph=None, route_stations_path=ROUTE_STATIONS_PATH,
+                 agency_path=AGENCY_PATH):
+        rows = _read_csv(route_stations_path)
+        coordinates = {row['station_id']: (float(row['stop_lat']), float(row['stop_lon'])) for row in rows}
+        graph = graph or RouteGraph(rows)
+        timezone = _read_csv(agency_path)[0]['agency_timezone'] if os.path.exists(agency_path) else 'America/New_York'
+        return cls(_read_csv(trips_path), calendar or ServiceCalendar.from_csv(), graph, coordinates, timezone)
+
+    def stop_index(self, service_id):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   stop_index
+        #   Input:      service_id (str)                       – e.g. 'Weekday'
+        #   Output:     dict[str, (array('i'), array('I'))]    – stop_id -> (sorted departure seconds after
+        #                                                        midnight, trip numbers in the same order)
+        # -------------------------------------------------------------------------------------------------------------
+        index = self._indexes.get(service_id)
+        if index is None:
+            by_stop = defaultdict(list)
+            for number, origin, pattern in self.service_trips.get(service_id, ()):
+                for stop_id, offset in pattern:
+                    by_stop[stop_id].append((origin + offset, number))
+            index = {}
+            for stop_id, departures in by_stop.items():
+                departures.sort()
+                index[stop_id] = (array('i', [seconds for seconds, _ in departures]),
+                                  array('I', [number for _, number in departures]))
+            self._indexes[service_id] = index
+        return index
+
+    def indexed_departures(self):
+        # Departures held by the per-stop indexes built so far
+        return sum(len(times) for index in self._indexes.values() for times, _ in index.values())
+
+    def prepare(self, now=None):
+        # Builds the indexes departures() needs around now, e.g. from a background thread at start-up
+        today = datetime.datetime.fromtimestamp(time.time() if now is None else now, self.timezone).date()
+        for offset in (-1, 0, 1):
+            for service_id in self.calendar.services_for(today + datetime.timedelta(days=offset)):
+                self.stop_index(service_id)
+        return self
+
+    def midnight(self, date):
+        # POSIX time of the local midnight that starts a service day
+        return int(datetime.datetime.combine(date, datetime.time(), self.timezone).timestamp())
+
+    def departures(self, stop_id, after=None, k=10, routes=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   departures
+        #   Input:      stop_id (str)       – platform stop_id, e.g. 'G35N'
+        #               after (float)       – POSIX time (default: now)
+        #               k (int)             – number of departures
+        #               routes (set[str])   – optional route_ids to keep
+        #   Output:     list[dict]          – trip_id, route_id, arrival_time and scheduled=True, earliest first;
+        #                                     the same records as the realtime arrivals
+        # -------------------------------------------------------------------------------------------------------------
+        after = int(time.time() if after is None else after)
+        today = datetime.datetime.fromtimestamp(after, self.timezone).date()
+        streams = []
+        for date in (today - datetime.timedelta(days=1), today, today + datetime.timedelta(days=1)):
+            midnight = self.midnight(date)
+            for service_id in self.calendar.services_for(date):
+                entry = self.stop_index(service_id).get(stop_id)
+                if entry is None:
+                    continue
+                times, numbers = entry
+                start = bisect_left(times, after - midnight)
+                streams.append(self._stream(times, numbers, start, midnight, routes))
+        departures = []
+        for arrival_time, number in heapq.merge(*streams):
+            departures.append({'trip_id': self.trip_ids[number], 'route_id': self.route_ids[number],
+                               'arrival_time': arrival_time, 'scheduled': True})
+            if len(departures) == k:
+                break
+        return departures
+
+    def _stream(self, times, numbers, start, midnight, routes):
+        route_ids = self.route_ids
+        for i in range(start, len(times)):
+            if routes is None or route_ids[numbers[i]] in routes:
+                yield midnight + times[i], numbers[i]
+
+    def fill(self, arrivals, stop_id, now, limit, stale=False, realtime_routes=None):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   fill
+        #   Input:      arrivals (list[dict])       – realtime arrivals at stop_id, earliest first
+        #               stop_id (str)               – platform stop_id
+        #               now (float)                 – POSIX time
+        #               limit (int)                 – number of arrivals wanted
+        #               stale (bool)                – the realtime data is too old to trust
+        #               realtime_routes (set[str])  – every route with a realtime arrival at the stop (see
+        #                                             ArrivalSnapshot.routes_at); default: the routes in arrivals,
+        #                                             which is only right when arrivals was not cut short
+        #   Output:     list[dict]                  – the realtime arrivals plus scheduled departures of every route
+        #                                             serving the stop that has no realtime arrival (all routes
+        #                                             when stale), earliest first
+        # -------------------------------------------------------------------------------------------------------------
+        if stale:
+            arrivals, realtime_routes = [], set()
+        elif realtime_routes is None:
+            realtime_routes = {train['route_id'] for train in arrivals}
+        missing = set(self.graph.routes_at(parent_station_id(stop_id))) - set(realtime_routes)
+        if not missing:
+            return arrivals[:limit]
+        merged = heapq.merge(arrivals, self.departures(stop_id, now, limit, missing),
+                             key=lambda train: train['arrival_time'])
+        return list(merged)[:limit]
+
+
+if __name__ == "__main__":
+    # Usage: python schedule.py <stop_id> [count]
+    engine = ScheduleEngine.from_csv()
+    stop_id = sys.argv[1] if len(sys.argv) > 1 else 'G35N'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    today = datetime.datetime.now(engine.timezone).date()
+    print(f"Services today: {', '.join(sorted(engine.calendar.services_for(today)))}"
+          f"{'' if engine.calendar.covers(today) else ' (calendar expired, matched by weekday)'}")
+    for departure in engine.departures(stop_id, k=count):
+        print(f"{departure['route_id']:>3} {time.strftime('%a %I:%M %p', time.localtime(departure['arrival_time']))} "
+              f"{departure['trip_id']}")
@@ -0,0 +1,261 @@
+import sys                        # Import sys for command line arguments
+from bisect import bisect_left
+from operator import itemgetter
+
+from google.protobuf.message import DecodeError
+
+from arrival_index import ArrivalIndex
+
+_by_arrival_time = itemgetter('arrival_time')
+
+# Wire types of the protobuf encoding
+WIRE_VARINT, WIRE_FIXED64, WIRE_LENGTH, WIRE_FIXED32 = 0, 1, 2, 5
+
+# Field numbers from gtfs-realtime.proto that the decoder looks at; everything else is skipped by length
+FEED_HEADER, FEED_ENTITY = 1, 2                     # FeedMessage
+HEADER_TIMESTAMP = 3                                # FeedHeader
+ENTITY_TRIP_UPDATE = 3                              # FeedEntity (vehicle = 4 and alert = 5 are never decoded)
+TRIP_UPDATE_TRIP, TRIP_UPDATE_STOP_TIME = 1, 2      # TripUpdate
+TRIP_ID, TRIP_ROUTE_ID = 1, 5                       # TripDescriptor
+STU_ARRIVAL, STU_DEPARTURE, STU_STOP_ID = 2, 3, 4   # TripUpdate.StopTimeUpdate
+EVENT_TIME = 2                                      # TripUpdate.StopTimeEvent
+
+_STOP_ID_TAG = bytes([STU_STOP_ID << 3 | WIRE_LENGTH])
+
+
+def read_varint(buf, pos):
+    # Decodes the base-128 varint at buf[pos]; returns (value, position after it)
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = buf[pos]
+        except IndexError:
+            raise DecodeError("Truncated varint") from None
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise DecodeError("Varint too long")
+
+
+def iter_fields(buf, pos, end):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   iter_fields
+    #   Input:      buf (bytes)        – encoded message
+    #               pos, end (int)     – byte range of the message inside buf
+    #   Output:     iterator of (field_number, wire_type, value) – value is the integer for varint/fixed fields and
+    #                                                              the (start, end) byte range for length-delimited
+    #                                                              fields, which are not copied or decoded
+    # -----------------------------------------------------------------------------------------------------------------
+    while pos < end:
+        key, pos = read_varint(buf, pos)
+        field_number, wire_type = key >> 3, key & 7
+        if wire_type == WIRE_VARINT:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == WIRE_LENGTH:
+            length, pos = read_varint(buf, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == WIRE_FIXED64:
+            value = int.from_bytes(buf[pos:pos + 8], 'little')
+            pos += 8
+        elif wire_type == WIRE_FIXED32:
+            value = int.from_bytes(buf[pos:pos + 4], 'little')
+            pos += 4
+        else:
+            raise DecodeError(f"Unsupported wire type {wire_type}")
+        if pos > end:
+            raise DecodeError("Truncated message")
+        yield field_number, wire_type, value
+
+
+def _to_int64(value):
+    # Varints carry int64 fields as their unsigned two's complement
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class SelectiveDecoder:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      SelectiveDecoder
+    #   Input:      stop_ids (list[str]) – stop_ids the display shows, e.g. ['G35N', 'G35S']
+    #   Output:     A feed parser that only decodes what the watched stops need
+    #   Description: Reads the GTFS-realtime wire format directly instead of building a full FeedMessage. Vehicle
+    #                positions, alerts and extensions are skipped by their length prefix. The encoded stop_id of
+    #                every watched stop is first located in the raw bytes with bytes.find; entities that contain
+    #                none of those offsets are skipped whole, and of the others only the trip_id, route_id and
+    #                the stop_time_updates containing an offset are materialized. decode() returns an ArrivalIndex
+    #                holding the watched stops, with the same arrival records, in the same order, as
+    #                core.get_upcoming_trains on a fully parsed feed.
+    #                Can be passed to FeedPoller as parse=decoder.decode.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, stop_ids):
+        self.stop_ids = list(stop_ids)
+        self._encoded = {stop_id.encode('utf-8'): stop_id for stop_id in self.stop_ids}
+        # The bytes every matching stop_time_update contains: tag, length and the stop_id itself
+        self._needles = [_STOP_ID_TAG + bytes([len(encoded)]) + encoded
+                         for encoded in self._encoded if len(encoded) < 0x80]
+        self._long_ids = len(self._needles) != len(self._encoded)
+        self.entities_seen = 0
+        self.trip_updates_decoded = 0
+
+    def decode(self, content):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   decode
+        #   Input:      content (bytes)   – raw protobuf body of a feed response
+        #   Output:     ArrivalIndex      – arrivals at the watched stops, sorted by arrival_time
+        # -------------------------------------------------------------------------------------------------------------
+        buf = bytes(content)
+        index = ArrivalIndex()
+        by_stop = index.by_stop
+        hits = self._find_hits(buf)
+        if hits is None:
+            for field_number, wire_type, value in iter_fields(buf, 0, len(buf)):
+                if wire_type != WIRE_LENGTH:
+                    continue
+                if field_number == FEED_ENTITY:
+                    self.entities_seen += 1
+                    self._decode_entity(buf, *value, None, by_stop)
+                elif field_number == FEED_HEADER:
+                    index.timestamp = self._decode_timestamp(buf, *value)
+        else:
+            # Hot loop over the top-level fields: only key and length are read, entities that do not contain a
+            # watched stop_id are skipped without looking inside, and the walk ends after the last one
+            end = len(buf)
+            pos = 0
+            hit = 0
+            header_seen = False
+            while pos < end and (hit < len(hits) or not header_seen):
+                key = buf[pos]
+                if key == FEED_ENTITY << 3 | WIRE_LENGTH or key == FEED_HEADER << 3 | WIRE_LENGTH:
+                    length, start = read_varint(buf, pos + 1)
+                    pos = start + length
+                    if pos > end:
+                        raise DecodeError("Truncated message")
+                    if key == FEED_HEADER << 3 | WIRE_LENGTH:
+                        index.timestamp = self._decode_timestamp(buf, start, pos)
+                        header_seen = True
+                        continue
+                    self.entities_seen += 1
+                    while hit < len(hits) and hits[hit] < start:
+                        hit += 1
+                    if hit < len(hits) and hits[hit] < pos:
+                        self._decode_entity(buf, start, pos, hits, by_stop)
+                else:
+                    # Any other field (extensions, multi-byte keys) goes through the generic reader
+                    pos = self._skip_field(buf, pos)
+
+        for arrivals in by_stop.values():
+            arrivals.sort(key=_by_arrival_time)
+        return index
+
+    def _skip_field(self, buf, pos):
+        # Position after the field starting at pos
+        key, pos = read_varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == WIRE_VARINT:
+            return read_varint(buf, pos)[1]
+        if wire_type == WIRE_LENGTH:
+            length, pos = read_varint(buf, pos)
+            return pos + length
+        if wire_type == WIRE_FIXED64:
+            return pos + 8
+        if wire_type == WIRE_FIXED32:
+            return pos + 4
+        raise DecodeError(f"Unsupported wire type {wire_type}")
+
+    def _find_hits(self, buf):
+        # Sorted offsets of every encoded watched stop_id in the feed, or None when the ids cannot be searched for
+        if self._long_ids:
+            return None
+        hits = []
+        for needle in self._needles:
+            pos = buf.find(needle)
+            while pos != -1:
+                hits.append(pos)
+                pos = buf.find(needle, pos + 1)
+        hits.sort()
+        return hits
+
+    def _decode_timestamp(self, buf, start, end):
+        timestamp = 0
+        for field_number, wire_type, value in iter_fields(buf, start, end):
+            if field_number == HEADER_TIMESTAMP and wire_type == WIRE_VARINT:
+                timestamp = value
+        return timestamp
+
+    def _decode_entity(self, buf, start, end, hits, by_stop):
+        # An entity may repeat trip_update; protobuf merges the occurrences, so they are decoded together
+        trip_id = route_id = ''
+        matches = []
+        for field_number, wire_type, value in iter_fields(buf, start, end):
+            if field_number != ENTITY_TRIP_UPDATE or wire_type != WIRE_LENGTH:
+                continue
+            self.trip_updates_decoded += 1
+            for tu_field, tu_wire, tu_value in iter_fields(buf, *value):
+                if tu_wire != WIRE_LENGTH:
+                    continue
+                if tu_field == TRIP_UPDATE_TRIP:
+                    for trip_field, trip_wire, trip_value in iter_fields(buf, *tu_value):
+                        if trip_wire != WIRE_LENGTH:
+                            continue
+                        if trip_field == TRIP_ID:
+                            trip_id = buf[trip_value[0]:trip_value[1]].decode('utf-8')
+                        elif trip_field == TRIP_ROUTE_ID:
+                            route_id = buf[trip_value[0]:trip_value[1]].decode('utf-8')
+                elif tu_field == TRIP_UPDATE_STOP_TIME:
+                    # Only stop_time_updates containing a watched stop_id are decoded
+                    if hits is not None and bisect_left(hits, tu_value[0]) == bisect_left(hits, tu_value[1]):
+                        continue
+                    match = self._decode_stop_time(buf, *tu_value)
+                    if match is not None:
+                        matches.append(match)
+
+        # trip_id and route_id are taken after the whole entity is read, as in the merged FeedMessage
+        for stop_id, arrival_time in matches:
+            arrivals = by_stop.get(stop_id)
+            if arrivals is None:
+                arrivals = by_stop[stop_id] = []
+            arrivals.append({
+                'trip_id': trip_id,
+                'route_id': route_id,
+                'arrival_time': arrival_time
+            })
+
+    def _decode_stop_time(self, buf, start, end):
+        # Returns (stop_id, time) for a stop_time_update at a watched stop, None otherwise (see core.stop_time)
+        stop_id = None
+        arrival_time = departure_time = None
+        events = []
+        for field_number, wire_type, value in iter_fields(buf, start, end):
+            if wire_type != WIRE_LENGTH:
+                continue
+            if field_number == STU_STOP_ID:
+                stop_id = self._encoded.get(buf[value[0]:value[1]])
+            elif field_number in (STU_ARRIVAL, STU_DEPARTURE):
+                events.append((field_number, value))
+        if stop_id is None:
+            return None
+
+        for field_number, (event_start, event_end) in events:
+            for event_field, event_wire, event_value in iter_fields(buf, event_start, event_end):
+                if event_field == EVENT_TIME and event_wire == WIRE_VARINT:
+                    if field_number == STU_ARRIVAL:
+                        arrival_time = _to_int64(event_value)
+                    else:
+                        departure_time = _to_int64(event_value)
+        time = departure_time if departure_time is not None else arrival_time
+        if not time:
+            return None
+        return stop_id, time
+
+
+if __name__ == "__main__":
+    # Usage: python selective_decoder.py feed.pb stop_id [stop_id ...]
+    with open(sys.argv[1], 'rb') as f:
+        decoded = SelectiveDecoder(sys.argv[2:]).decode(f.read())
+    for stop in sys.argv[2:]:
+        for train in decoded.arrivals(stop):
+            print(stop, train['route_id'], train['trip_id'], train['arrival_time'])
@@ -0,0 +1,172 @@
+import json                       # Import json for the snapshot header
+import mmap                       # Import mmap to load snapshots without reading them
+import os                         # Import os for file path handling and atomic renames
+import struct                     # Import struct for the fixed-size file preamble
+import sys                        # Import sys for the byte order and command line arguments
+import time                       # Import time to age cached snapshots
+
+from arrival_table import ArrivalTable, StringPool
+from static_cache import ASSETS_DIR
+
+SNAPSHOT_DIR = os.path.join(ASSETS_DIR, "cache", "snapshots")
+
+MAGIC = b'ARRSNAP1'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sI')  # magic, header length
+MAX_AGE = 6 * 3600                # snapshots older than this (seconds) are not worth showing
+SAVE_INTERVAL = 60                # minimum seconds between two saves of the same feed
+
+# Column name -> array type code, in file order
+COLUMNS = (('stop_codes', 'I'), ('route_codes', 'H'), ('trip_codes', 'I'), ('times', 'q'), ('offsets', 'I'))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def save_table(table, path, feed_name, timestamp):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   save_table
+    #   Input:      table (ArrivalTable) – arrivals of one feed
+    #               path (str)           – file to write
+    #               feed_name (str)      – feed the arrivals came from
+    #               timestamp (int)      – feed header timestamp, used to age the snapshot when it is loaded
+    #   Output:     None
+    #   Description: Writes the table as
+    #                  preamble – magic + header length
+    #                  header   – JSON with the feed, its timestamp, the string pools and the column offsets
+    #                  columns  – the table's typed arrays, 8-byte aligned, ready to be memory-mapped
+    #                to a temporary file that is synced and renamed over the old one, so a power cut never leaves
+    #                a half-written snapshot behind.
+    # -----------------------------------------------------------------------------------------------------------------
+    columns = {}
+    offset = 0
+    for name, _ in COLUMNS:
+        column = getattr(table, name)
+        columns[name] = {'offset': offset, 'length': len(column)}
+        offset = _align(offset + column.itemsize * len(column))
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'feed': feed_name,
+        'timestamp': timestamp,
+        'saved_at': time.time(),
+        'pools': {'stops': table.stops.strings, 'routes': table.routes.strings, 'trips': table.trips.strings},
+        'columns': columns,
+    }, separators=(',', ':')).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, _ in COLUMNS:
+            f.seek(data_start + columns[name]['offset'])
+            f.write(memoryview(getattr(table, name)).cast('B'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_table(path):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   load_table
+    #   Input:      path (str)                  – file written by save_table
+    #   Output:     (ArrivalTable, dict)        – the arrivals, whose columns are views into the mapped file, and
+    #                                             the header (feed, timestamp, saved_at)
+    #   Description: Only the header and string pools are decoded; the columns are used in place.
+    # -----------------------------------------------------------------------------------------------------------------
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < PREAMBLE.size:
+        raise ValueError(f"{path} is truncated")
+    magic, header_length = PREAMBLE.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an arrival snapshot")
+    header = json.loads(mm[PREAMBLE.size:PREAMBLE.size + header_length])
+    if header['version'] != FORMAT_VERSION or header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was written by an incompatible version")
+    data_start = _align(PREAMBLE.size + header_length)
+    # A file cut short (a power cut on an SD card) would otherwise load as columns of different lengths
+    columns = header['columns']
+    end = max(columns[name]['offset'] + struct.calcsize(typecode) * columns[name]['length']
+              for name, typecode in COLUMNS)
+    if len(mm) < data_start + end:
+        raise ValueError(f"{path} is truncated")
+    buffer = memoryview(mm)
+
+    pools = {}
+    for name, strings in header['pools'].items():
+        pool = pools[name] = StringPool()
+        for value in strings:
+            pool.intern(value)
+    columns = {}
+    for name, typecode in COLUMNS:
+        info = header['columns'][name]
+        start = data_start + info['offset']
+        itemsize = struct.calcsize(typecode)
+        columns[name] = buffer[start:start + itemsize * info['length']].cast(typecode)
+
+    table = ArrivalTable.from_columns(pools['stops'], pools['routes'], pools['trips'],
+                                      timestamp=header['timestamp'], **columns)
+    return table, header
+
+
+class SnapshotCache:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      SnapshotCache
+    #   Input:      directory (str)       – where the per-feed snapshots live
+    #               save_interval (float) – minimum seconds between two saves of the same feed
+    #               max_age (float)       – snapshots whose feed timestamp is older than this are ignored
+    #   Output:     The last parsed arrivals of every feed, kept on disk across restarts
+    #   Description: The data service saves each feed's arrivals after a refresh (at most every save_interval
+    #                seconds, since the copy on disk only matters after a restart) and loads them at start-up,
+    #                so a display shows the last known arrivals immediately - or when the network is down -
+    #                instead of a blank screen until the first fetch completes.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, directory=SNAPSHOT_DIR, save_interval=SAVE_INTERVAL, max_age=MAX_AGE):
+        self.directory = directory
+        self.save_interval = save_interval
+        self.max_age = max_age
+        self._saved_at = {}
+
+    def path(self, feed_name):
+        return os.path.join(self.directory, f"{feed_name}.arrivals")
+
+    def save(self, feed_name, feed, force=False):
+        # Saves the arrivals of one parsed feed; returns False when it was saved too recently
+        now = time.monotonic()
+        if not force and now - self._saved_at.get(feed_name, -self.save_interval) < self.save_interval:
+            return False
+        save_table(ArrivalTable([feed]), self.path(feed_name), feed_name, feed.header.timestamp)
+        self._saved_at[feed_name] = now
+        return True
+
+    def load(self, feed_names):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   load
+        #   Input:      feed_names (iterable[str])        – feeds to look for
+        #   Output:     dict[str, (ArrivalTable, int)]    – feed name -> (arrivals, feed timestamp) of every feed
+        #                                                   with a readable snapshot that is not too old
+        # -------------------------------------------------------------------------------------------------------------
+        loaded = {}
+        now = time.time()
+        for feed_name in feed_names:
+            try:
+                table, header = load_table(self.path(feed_name))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            if now - header['timestamp'] <= self.max_age:
+                loaded[feed_name] = (table, header['timestamp'])
+        return loaded
+
+
+if __name__ == "__main__":
+    # Usage: python snapshot_cache.py [cache directory]
+    directory = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith('.arrivals'):
+            table, header = load_table(os.path.join(directory, file_name))
+            age = time.time() - header['timestamp']
+            print(f"{header['feed']:>12} {len(table):>7} arrivals, {age / 60:>7.1f} min old")
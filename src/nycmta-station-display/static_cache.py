@@ -0,0 +1,376 @@
+import csv                        # Import csv to read the GTFS text files when (re)building the cache
+import hashlib                    # Import hashlib to fingerprint source files
+import json                       # Import json for the cache header
+import mmap                       # Import mmap to load the cache without reading it
+import os                         # Import os for file path handling
+import struct                     # Import struct for the fixed-size file preamble
+import sys                        # Import sys for command line arguments
+import zlib                       # Import zlib for crc32, a hash that is stable across runs (unlike hash())
+from array import array
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../assets")
+CACHE_PATH = os.path.join(ASSETS_DIR, "cache", "gtfs_static.bin")
+
+MAGIC = b'GTFSBIN1'
+FORMAT_VERSION = 2
+PREAMBLE = struct.Struct('<8sI')  # magic, header length
+
+# Table name -> (source file relative to ASSETS_DIR, key column)
+TABLES = {
+    'stops': ('gtfs_subway_raw/stops.txt', 'stop_id'),
+    'trips': ('gtfs_subway_raw/trips.txt', 'trip_id'),
+    'routes': ('gtfs_subway_raw/routes.txt', 'route_id'),
+    'transfers': ('gtfs_subway_raw/transfers.txt', 'from_stop_id'),
+    'route_stations': ('gtfs_subway/route_stations.txt', 'route_id'),
+}
+
+
+def realtime_trip_id(trip_id):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   realtime_trip_id
+    #   Input:      trip_id (str) – static trip_id, e.g. 'AFA24GEN-1038-Sunday-00_000600_1..S03R'
+    #   Output:     str           – the id the realtime feeds use for it, e.g. '000600_1..S03R'
+    # -----------------------------------------------------------------------------------------------------------------
+    return trip_id.split('_', 1)[1] if '_' in trip_id else trip_id
+
+
+def _realtime_trips(rows):
+    # One row per realtime trip id; the same origin time/route/direction exists once per service day type
+    seen = {}
+    for row in rows:
+        rt_id = realtime_trip_id(row['trip_id'])
+        if rt_id not in seen:
+            seen[rt_id] = {'trip_id': rt_id, 'route_id': row['route_id'],
+                           'trip_headsign': row['trip_headsign'], 'direction_id': row['direction_id']}
+    return list(seen.values())
+
+
+def route_direction(route_id, direction):
+    # ('G', 'S') or ('G', '1') -> 'G..S', the route and direction part of a realtime trip id
+    return f"{route_id}..{'S' if direction in ('S', '1') else 'N'}"
+
+
+def _route_headsigns(rows):
+    # The most common headsign of every route and direction, for trips that are not in the static schedule
+    counts = {}
+    for row in rows:
+        headsigns = counts.setdefault(route_direction(row['route_id'], row['direction_id']), {})
+        headsigns[row['trip_headsign']] = headsigns.get(row['trip_headsign'], 0) + 1
+    return [{'route_direction': key, 'trip_headsign': max(headsigns, key=headsigns.get)}
+            for key, headsigns in counts.items()]
+
+
+# Tables computed from another table: name -> (source table, key column, row transform)
+DERIVED_TABLES = {
+    'realtime_trips': ('trips', 'trip_id', _realtime_trips),
+    'route_headsigns': ('trips', 'route_direction', _route_headsigns),
+}
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def source_fingerprint(path, with_hash=True):
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        with open(path, 'rb') as f:
+            fingerprint['sha1'] = hashlib.sha1(f.read()).hexdigest()
+    return fingerprint
+
+
+def build_cache(cache_path=CACHE_PATH, assets_dir=ASSETS_DIR):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   build_cache
+    #   Input:      cache_path (str) – where to write the cache
+    #               assets_dir (str) – directory holding the GTFS text files listed in TABLES
+    #   Output:     None
+    #   Description: Compiles the static GTFS files into one binary file:
+    #                  preamble  – magic + header length
+    #                  header    – JSON with the source fingerprints and the offset of every section
+    #                  strings   – every distinct cell value once: uint32 offsets + one UTF-8 blob
+    #                  per table – uint32 string ids, row-major, rows sorted by key so equal keys are adjacent,
+    #                              followed by an open-addressing hash table (uint32 first row + 1 per slot)
+    #                The file is written to a temporary name and renamed, so readers never see a partial cache.
+    # -----------------------------------------------------------------------------------------------------------------
+    string_ids = {}
+    strings = []
+
+    def intern(value):
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    sources = {}
+    loaded = {}
+    for name, (relative_path, key) in TABLES.items():
+        path = os.path.join(assets_dir, relative_path)
+        sources[relative_path] = source_fingerprint(path)
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            loaded[name] = (reader.fieldnames, key, list(reader))
+    for name, (source, key, derive) in DERIVED_TABLES.items():
+        rows = derive(loaded[source][2])
+        loaded[name] = (list(rows[0]) if rows else [key], key, rows)
+
+    sections = []   # (relative offset, bytes)
+    offset = 0
+
+    def add_section(data):
+        nonlocal offset
+        offset = _align(offset)
+        sections.append((offset, data))
+        start = offset
+        offset += len(data)
+        return start
+
+    tables = {}
+    for name, (columns, key, rows) in loaded.items():
+        key_column = columns.index(key)
+        # Stable sort keeps file order (e.g. stop_sequence) among rows sharing a key
+        rows = sorted(rows, key=lambda row: row[key])
+        cells = array('I', (intern(row[column] or '') for row in rows for column in columns))
+
+        keys = {}
+        for number, row in enumerate(rows):
+            keys.setdefault(row[key], number)
+        slot_count = 1
+        while slot_count < 2 * max(1, len(keys)):
+            slot_count *= 2
+        slots = array('I', bytes(4 * slot_count))
+        for value, number in keys.items():
+            slot = zlib.crc32(value.encode('utf-8')) & (slot_count - 1)
+            while slots[slot]:
+                slot = (slot + 1) & (slot_count - 1)
+            slots[slot] = number + 1
+
+        tables[name] = {
+            'columns': columns,
+            'key_column': key_column,
+            'rows': len(rows),
+            'cells': add_section(cells.tobytes()),
+            'slots': add_section(slots.tobytes()),
+            'slot_count': slot_count,
+        }
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = array('I', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    string_table = {
+        'count': len(strings),
+        'offsets': add_section(string_offsets.tobytes()),
+        'blob': add_section(b''.join(encoded)),
+        'blob_size': string_offsets[-1],
+    }
+
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'sources': sources,
+        'strings': string_table,
+        'tables': tables,
+    }).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header)
+        for relative_offset, data in sections:
+            f.seek(data_start + relative_offset)
+            f.write(data)
+    os.replace(tmp_path, cache_path)
+
+
+class StaticTable:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StaticTable
+    #   Input:      cache (StaticGTFS) – the loaded cache
+    #               info (dict)        – this table's entry in the cache header
+    #   Output:     Read-only view of one GTFS table inside the memory-mapped cache
+    #   Description: find(key) hashes the key into the table's slot array and returns the adjacent rows holding
+    #                it; only the cells that are actually read are decoded.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, cache, info):
+        self.cache = cache
+        self.columns = info['columns']
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+        self.width = len(self.columns)
+        self.key_column = info['key_column']
+        self.row_count = info['rows']
+        self.cells = cache.view(info['cells'], 4 * self.width * self.row_count).cast('I')
+        self.slots = cache.view(info['slots'], 4 * info['slot_count']).cast('I')
+        self.mask = info['slot_count'] - 1
+
+    def __len__(self):
+        return self.row_count
+
+    def find(self, key):
+        # range of row numbers whose key column equals key (empty if absent)
+        cells, width, key_column = self.cells, self.width, self.key_column
+        slot = zlib.crc32(key.encode('utf-8')) & self.mask
+        while True:
+            first = self.slots[slot]
+            if not first:
+                return range(0)
+            first -= 1
+            sid = cells[first * width + key_column]
+            if self.cache.string(sid) == key:
+                last = first + 1
+                while last < self.row_count and cells[last * width + key_column] == sid:
+                    last += 1
+                return range(first, last)
+            slot = (slot + 1) & self.mask
+
+    def value(self, row, column):
+        return self.cache.string(self.cells[row * self.width + self.column_index[column]])
+
+    def row(self, row):
+        base = row * self.width
+        string = self.cache.string
+        return {column: string(self.cells[base + i]) for i, column in enumerate(self.columns)}
+
+    def get(self, key, column=None):
+        # First row for key as a dict (or one of its columns), or None
+        rows = self.find(key)
+        if not rows:
+            return None
+        if column is not None:
+            return self.value(rows[0], column)
+        return self.row(rows[0])
+
+    def get_all(self, key):
+        return [self.row(row) for row in self.find(key)]
+
+
+class StaticGTFS:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StaticGTFS
+    #   Input:      cache_path (str) – cache file built by build_cache
+    #   Output:     O(1) lookups into the static GTFS tables
+    #   Description: Memory-maps the cache, so start-up cost does not depend on the size of the tables. Use
+    #                StaticGTFS.load() to rebuild a missing or stale cache first.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, cache_path=CACHE_PATH):
+        self.cache_path = cache_path
+        with open(cache_path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = PREAMBLE.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{cache_path} is not a GTFS cache")
+        self.header = json.loads(self.mm[PREAMBLE.size:PREAMBLE.size + header_length])
+        if self.header['version'] != FORMAT_VERSION or self.header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{cache_path} was built by an incompatible version")
+        self.data_start = _align(PREAMBLE.size + header_length)
+        self.buffer = memoryview(self.mm)
+
+        strings = self.header['strings']
+        self.string_offsets = self.view(strings['offsets'], 4 * (strings['count'] + 1)).cast('I')
+        self.blob = self.view(strings['blob'], strings['blob_size'])
+        self._strings = {}
+
+        self.tables = {name: StaticTable(self, info) for name, info in self.header['tables'].items()}
+        self.stops = self.tables['stops']
+        self.trips = self.tables['trips']
+        self.routes = self.tables['routes']
+        self.transfers = self.tables['transfers']
+        self.route_stations = self.tables['route_stations']
+        self.realtime_trips = self.tables['realtime_trips']
+        self.route_headsigns = self.tables['route_headsigns']
+
+    @classmethod
+    def load(cls, cache_path=CACHE_PATH, assets_dir=ASSETS_DIR, verify_hash=False):
+        # -------------------------------------------------------------------------------------------------------------
+        #   Function:   load
+        #   Input:      cache_path (str)    – cache file
+        #               assets_dir (str)    – directory holding the GTFS text files
+        #               verify_hash (bool)  – also compare the SHA-1 of every source, not only size and mtime
+        #   Output:     StaticGTFS
+        #   Description: Rebuilds the cache when it is missing, unreadable or older than its sources.
+        # -------------------------------------------------------------------------------------------------------------
+        try:
+            cache = cls(cache_path)
+            if cache.is_current(assets_dir, verify_hash):
+                return cache
+            cache.close()
+        except (OSError, ValueError):
+            pass
+        build_cache(cache_path, assets_dir)
+        return cls(cache_path)
+
+    def is_current(self, assets_dir=ASSETS_DIR, verify_hash=False):
+        for relative_path, stored in self.header['sources'].items():
+            try:
+                current = source_fingerprint(os.path.join(assets_dir, relative_path), verify_hash)
+            except OSError:
+                return False
+            if current['size'] != stored['size']:
+                return False
+            if verify_hash:
+                if current['sha1'] != stored['sha1']:
+                    return False
+            elif current['mtime_ns'] != stored['mtime_ns']:
+                return False
+        return True
+
+    def close(self):
+        for table in self.tables.values():
+            table.cells.release()
+            table.slots.release()
+        self.tables = {}
+        self.string_offsets.release()
+        self.blob.release()
+        self.buffer.release()
+        self.mm.close()
+
+    def view(self, relative_offset, length):
+        start = self.data_start + relative_offset
+        return self.buffer[start:start + length]
+
+    def string(self, sid):
+        value = self._strings.get(sid)
+        if value is None:
+            value = self._strings[sid] = str(self.blob[self.string_offsets[sid]:self.string_offsets[sid + 1]],
+                                             'utf-8')
+        return value
+
+    # Convenience lookups used by the display
+    def stop_name(self, stop_id):
+        return self.stops.get(stop_id, 'stop_name')
+
+    def parent_station(self, stop_id):
+        return self.stops.get(stop_id, 'parent_station')
+
+    def trip(self, trip_id):
+        # Accepts static trip_ids as well as the shorter ids used by the realtime feeds
+        return self.trips.get(trip_id) or self.realtime_trips.get(trip_id)
+
+    def headsign(self, trip_id):
+        trip = self.trip(trip_id)
+        return trip['trip_headsign'] if trip else None
+
+    def direction(self, trip_id):
+        trip = self.trip(trip_id)
+        return int(trip['direction_id']) if trip and trip['direction_id'] else None
+
+    def route_headsign(self, route_id, direction):
+        # Usual headsign of a route in a direction ('N'/'S' as in stop_ids, or a direction_id)
+        return self.route_headsigns.get(route_direction(route_id, direction), 'trip_headsign')
+
+    def route_color(self, route_id):
+        return self.routes.get(route_id, 'route_color')
+
+    def route_text_color(self, route_id):
+        return self.routes.get(route_id, 'route_text_color')
+
+
+if __name__ == "__main__":
+    # Usage: python static_cache.py [cache path]
+    path = sys.argv[1] if len(sys.argv) > 1 else CACHE_PATH
+    build_cache(path)
+    print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,407 @@
+import argparse                   # Import argparse for the server command line
+import http.client                # Import http.client to follow the event stream on the display side
+import json                       # Import json to encode arrival payloads
+import logging                    # Import logging to report subscriber problems
+import socket                     # Import socket to interrupt a blocked stream read on stop
+import threading                  # Import threading for the HTTP server and the client reader
+import time                       # Import time for payload timestamps and reconnect delays
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from alerts import AlertRecord, ServiceInfo
+from arrival_history import HISTORY_PATH, ArrivalHistory
+from core import FEED_BASE_URL, FEED_PATHS, feed_urls
+from data_service import DataService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10                # arrivals per stop in a payload
+MAX_LIMIT = 100                   # larger ?limit= values are capped, so they share one cached payload
+KEEPALIVE_INTERVAL = 15.0         # seconds between comment lines on an idle stream
+MAX_PAYLOADS = 256                # (stations, limit) payloads kept; the least recently requested are dropped
+
+
+def parse_stop_ids(path_segment):
+    # 'G35N,G35S' -> ('G35N', 'G35S')
+    return tuple(stop_id for stop_id in unquote(path_segment).split(',') if stop_id)
+
+
+class StationPayloads:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StationPayloads
+    #   Input:      data_service (DataService) – source of arrival snapshots
+    #   Output:     Encoded per-station arrival payloads, built once per snapshot and shared by every subscriber
+    #   Description: get(stop_ids, limit) returns (version, changed_version, body). The body is JSON encoded
+    #                once per snapshot version and key, no matter how many displays show that station;
+    #                changed_version is the last version in which the body actually changed, so streams only
+    #                push when the station's own arrivals changed. Keys are chosen by the clients, so only the
+    #                max_entries most recently requested are kept; a stream whose entry was dropped gets it
+    #                encoded again with the next snapshot, and pushes it as changed once.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, data_service, max_entries=MAX_PAYLOADS):
+        self.data_service = data_service
+        self.max_entries = max_entries
+        self.encode_count = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, stop_ids, limit=DEFAULT_LIMIT):
+        snapshot = self.data_service.snapshot
+        key = (stop_ids, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry[0] == snapshot.version:
+                    return entry
+            body = self.encode(snapshot, stop_ids, limit)
+            changed_version = entry[1] if entry is not None and entry[2] == body else snapshot.version
+            entry = self._entries[key] = (snapshot.version, changed_version, body)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def encode(self, snapshot, stop_ids, limit):
+        self.encode_count += 1
+        start = int(time.time())
+        arrivals = {stop_id: snapshot.arrivals(stop_id, limit, start=start) for stop_id in stop_ids}
+        # Alerts for these stops and the routes arriving there; active periods are checked by the display
+        routes = sorted({train['route_id'] for trains in arrivals.values() for train in trains})
+        stops = [stop for stop_id in stop_ids for stop in (stop_id, stop_id[:-1])]
+        alerts = [{'id': alert.entity_id, 'header': alert.header, 'effect': alert.effect, 'periods': alert.periods,
+                   'routes': alert.routes, 'stops': alert.stops}
+                  for alert in snapshot.service_info.alerts_for(routes, stops, start)]
+        return json.dumps({'timestamp': snapshot.timestamp, 'arrivals': arrivals, 'alerts': alerts},
+                          separators=(',', ':')).encode('utf-8')
+
+
+class _StationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        try:
+            limit = int(query.get('limit', [DEFAULT_LIMIT])[0])
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            self.send_error(400, "limit must be a positive integer")
+            return
+        limit = min(limit, MAX_LIMIT)
+        if len(parts) != 2 or parts[0] not in ('arrivals', 'stream', 'history') or not parse_stop_ids(parts[1]):
+            self.send_error(404)
+            return
+
+        stop_ids = parse_stop_ids(parts[1])
+        if parts[0] == 'arrivals':
+            self.send_arrivals(stop_ids, limit)
+        elif parts[0] == 'history':
+            self.send_history(stop_ids, query)
+        else:
+            self.stream_arrivals(stop_ids, limit)
+
+    def send_arrivals(self, stop_ids, limit):
+        version, _, body = self.server.station_server.payloads.get(stop_ids, limit)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"{version}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_history(self, stop_ids, query):
+        history = self.server.station_server.history
+        if history is None:
+            self.send_error(404, "no arrival history is recorded")
+            return
+        try:
+            hours = float(query['hours'][0]) if 'hours' in query else None
+        except ValueError:
+            self.send_error(400, "hours must be a number")
+            return
+        since = int(time.time() - hours * 3600) if hours is not None else None
+        route_id = query.get('route', [None])[0]
+        stats = [stats.as_dict() for stats in history.stats_at(stop_ids, route_id, since)]
+        body = json.dumps({'timestamp': int(time.time()), 'stats': stats}, separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_arrivals(self, stop_ids, limit):
+        # Server-sent events: one 'arrivals' event now and one per change of these stations, until disconnect
+        station_server = self.server.station_server
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        sent_version = -1
+        station_server.subscriber_opened()
+        try:
+            while not station_server.stopping.is_set():
+                version, changed_version, body = station_server.payloads.get(stop_ids, limit)
+                if changed_version > sent_version:
+                    self.wfile.write(b'id: %d\nevent: arrivals\ndata: %s\n\n' % (version, body))
+                    self.wfile.flush()
+                    sent_version = version
+                    station_server.events_sent += 1
+                elif sent_version < version:
+                    sent_version = version
+                if station_server.wait_for_update(version, KEEPALIVE_INTERVAL) == version:
+                    self.wfile.write(b': keepalive\n\n')
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            station_server.subscriber_closed()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StationHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128      # displays reconnect all at once after a server restart
+
+
+class StationServer:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      StationServer
+    #   Input:      data_service (DataService) – the one feed pipeline every display shares
+    #               host (str)                 – interface to bind ('0.0.0.0' to serve displays on the LAN)
+    #               port (int)                 – port to bind (0 picks a free port)
+    #               history (ArrivalHistory)   – optional history of observed arrivals to serve
+    #   Output:     A small HTTP API serving per-station arrivals to any number of displays
+    #   Description: GET /arrivals/<stop_id>[,<stop_id>...]?limit=N returns the current arrivals as JSON.
+    #                GET /stream/<stop_id>[,...]?limit=N is a server-sent-event stream that pushes the same JSON
+    #                whenever those stations' arrivals change. The feeds are fetched and parsed once by the data
+    #                service, and each station's payload is encoded once per refresh (see StationPayloads), so
+    #                adding a display costs one socket write per change instead of a fetch and a parse.
+    #                With a history, GET /history/<stop_id>[,...]?route=R&hours=H returns the headway and
+    #                prediction error statistics of every route at those stops (see arrival_history.HeadwayStats)
+    #                over the last H hours, or the whole history.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, data_service, host='127.0.0.1', port=0, history=None):
+        self.data_service = data_service
+        self.history = history
+        self.payloads = StationPayloads(data_service)
+        self.stopping = threading.Event()
+        self.subscriber_count = 0
+        self.events_sent = 0
+        self._count_lock = threading.Lock()
+
+        self.httpd = _StationHTTPServer((host, port), _StationRequestHandler)
+        self.httpd.station_server = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def wait_for_update(self, version, timeout):
+        # Version of the newest snapshot once it is newer than version, or version after timeout/stop
+        if self.stopping.is_set():
+            return version
+        return self.data_service.wait_for_update(version, timeout, cancel=self.stopping).version
+
+    def subscriber_opened(self):
+        with self._count_lock:
+            self.subscriber_count += 1
+
+    def subscriber_closed(self):
+        with self._count_lock:
+            self.subscriber_count -= 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="station-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.stopping.set()
+        # Wake every stream out of wait_for_update so it notices the stop
+        self.data_service.wake()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+class RemoteSnapshot:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      RemoteSnapshot
+    #   Input:      version (int)                 – server snapshot version
+    #               payload (dict)                – decoded 'arrivals' event
+    #   Output:     The subset of ArrivalSnapshot a display needs, for the stations it subscribed to
+    # -----------------------------------------------------------------------------------------------------------------
+    __slots__ = ('version', 'timestamp', 'by_stop', 'service_info')
+
+    def __init__(self, version=0, payload=None):
+        payload = payload or {}
+        self.version = version
+        self.timestamp = payload.get('timestamp', 0)
+        self.by_stop = payload.get('arrivals', {})
+        self.service_info = ServiceInfo(AlertRecord(alert['id'], 'remote', alert['header'], alert['effect'],
+                                                    tuple(map(tuple, alert['periods'])), tuple(alert['routes']),
+                                                    tuple(alert['stops']), 0)
+                                        for alert in payload.get('alerts', ()))
+
+    def arrivals(self, stop_ids, limit=None, start=None, end=None):
+        if isinstance(stop_ids, str):
+            stop_ids = [stop_ids]
+        arrivals = [train for stop_id in stop_ids for train in self.by_stop.get(stop_id, ())
+                    if (start is None or train['arrival_time'] >= start)
+                    and (end is None or train['arrival_time'] <= end)]
+        if len(stop_ids) > 1:
+            arrivals.sort(key=lambda train: train['arrival_time'])
+        return arrivals[:limit] if limit is not None else arrivals
+
+    def routes_at(self, stop_id, start=None, end=None):
+        # Only as complete as the payload: the server sends the first `limit` arrivals of every stop
+        return {train['route_id'] for train in self.arrivals(stop_id, start=start, end=end)}
+
+
+class RemoteDataService:
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Class:      RemoteDataService
+    #   Input:      base_url (str)         – StationServer URL, e.g. 'http://192.168.1.10:8100/'
+    #               stop_ids (list[str])   – stations this display shows
+    #               limit (int)            – arrivals per stop
+    #   Output:     A drop-in for DataService that subscribes to a StationServer instead of polling the feeds
+    #   Description: A reader thread follows the server's event stream and swaps in a new RemoteSnapshot per
+    #                event, so screens read `snapshot` exactly as with a local DataService. Reconnects with
+    #                exponential backoff when the server goes away.
+    # -----------------------------------------------------------------------------------------------------------------
+    def __init__(self, base_url, stop_ids, limit=DEFAULT_LIMIT):
+        url = urlsplit(base_url)
+        self.address = (url.hostname, url.port or 80)
+        self.path = f"{url.path.rstrip('/')}/stream/{','.join(stop_ids)}?limit={limit}"
+        self.snapshot = RemoteSnapshot()
+        self.in_flight = False
+        self.refresh_count = 0
+        self.received_at = None
+        self._published = threading.Condition()
+        self._stop = threading.Event()
+        self._socket = None
+        self._thread = None
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="remote-data-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+        sock = self._socket
+        if sock is not None:
+            # Wakes the reader thread out of its blocking read
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wait_for_update(self, version=0, timeout=None, cancel=None):
+        with self._published:
+            self._published.wait_for(lambda: (self.snapshot.version > version or self._stop.is_set()
+                                              or (cancel is not None and cancel.is_set())), timeout)
+        return self.snapshot
+
+    def wake(self):
+        with self._published:
+            self._published.notify_all()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            connection = http.client.HTTPConnection(*self.address, timeout=KEEPALIVE_INTERVAL * 2)
+            try:
+                connection.connect()
+                self._socket = connection.sock
+                if self._stop.is_set():
+                    break
+                connection.request('GET', self.path, headers={'Accept': 'text/event-stream'})
+                response = connection.getresponse()
+                if response.status != 200:
+                    raise OSError(f"HTTP {response.status}")
+                failures = 0
+                self._read_events(response.fp)
+            except Exception as exc:
+                if self._stop.is_set():
+                    break
+                failures += 1
+                logger.warning("Station stream %s failed: %s", self.path, exc)
+            finally:
+                self._socket = None
+                connection.close()
+            self._stop.wait(min(60, 2 ** failures) if failures else 1)
+
+    def _read_events(self, stream):
+        event_id, data = None, []
+        for line in iter(stream.readline, b''):
+            if self._stop.is_set():
+                return
+            line = line.rstrip(b'\r\n')
+            if line.startswith(b'id:'):
+                event_id = int(line[3:])
+            elif line.startswith(b'data:'):
+                data.append(line[5:].strip())
+            elif not line and data:
+                self._publish(RemoteSnapshot(event_id or 0, json.loads(b''.join(data))))
+                event_id, data = None, []
+
+    def _publish(self, snapshot):
+        self.snapshot = snapshot
+        self.refresh_count += 1
+        self.received_at = time.time()
+        self.wake()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve per-station arrivals to many displays from one feed pipeline")
+    parser.add_argument('feeds', nargs='*', default=['G'], help=f"any of {', '.join(FEED_PATHS)}")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--feed-url', default=FEED_BASE_URL)
+    parser.add_argument('--interval', type=float, default=30, help="feed refresh interval in seconds")
+    parser.add_argument('--history', nargs='?', const=HISTORY_PATH, metavar='PATH',
+                        help=f"record headway and prediction statistics, kept in PATH (default {HISTORY_PATH})")
+    args = parser.parse_args(argv)
+
+    history = ArrivalHistory(args.history) if args.history else None
+    service = DataService(feed_urls(args.feeds, args.feed_url), default_interval=args.interval,
+                          history=history).start()
+    server = StationServer(service, args.host, args.port, history)
+    print(f"Serving arrivals of {', '.join(args.feeds)} at {server.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        service.stop()
+        if history is not None:
+            history.close()
+
+
+if __name__ == "__main__":
+    # Usage: python station_server.py [feed ...] [--port 8100]
+    #        then e.g. curl http://localhost:8100/arrivals/G35N,G35S  or  app.py --server http://host:8100/
+    #        with --history:  curl http://localhost:8100/history/G35N,G35S?hours=3
+    main()
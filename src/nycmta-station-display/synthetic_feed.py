@@ -0,0 +1,165 @@
+import csv                        # Import csv to read the static route/station list
+import os                         # Import os for file path handling
+import random                     # Import random for reproducible fake schedules
+import sys                        # Import sys for command line arguments
+import time                       # Import time for the default feed timestamp
+from collections import defaultdict
+
+import gtfs_realtime_pb2
+from core import stop_time
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../assets")
+ROUTE_STATIONS_PATH = os.path.join(ASSETS_DIR, "gtfs_subway", "route_stations.txt")
+
+
+def load_route_stations(path=ROUTE_STATIONS_PATH):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   load_route_stations
+    #   Input:      path (str)              – route_stations.txt (route_id, stop_sequence, station_id, ...)
+    #   Output:     dict[str, list[str]]    – route_id -> parent station ids in stop_sequence order
+    # -----------------------------------------------------------------------------------------------------------------
+    routes = defaultdict(list)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            routes[row['route_id']].append((int(row['stop_sequence']), row['station_id']))
+    return {route_id: [station for _, station in sorted(stops)] for route_id, stops in routes.items()}
+
+
+def make_feed(routes=None, trips_per_direction=20, now=None, seed=0, with_vehicles=True, alerts=0):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   make_feed
+    #   Input:      routes (list[str])           – route_ids to include (default: every route in route_stations.txt)
+    #               trips_per_direction (int)    – trains in service per route and direction
+    #               now (int)                    – feed timestamp (default: current time)
+    #               seed (int)                   – random seed, so the same arguments give the same feed
+    #               with_vehicles (bool)         – also emit a VehiclePosition entity per trip, like NYCT feeds
+    #               alerts (int)                 – number of service Alert entities to add
+    #   Output:     gtfs_realtime_pb2.FeedMessage
+    #   Description: Builds a realistic-looking NYCT feed from the static route/station list, for benchmarks and
+    #                offline runs when no recorded .pb file is available. Every train is placed somewhere along
+    #                its line and gets a stop_time_update for each remaining stop ('<station>N' / '<station>S').
+    # -----------------------------------------------------------------------------------------------------------------
+    rng = random.Random(seed)
+    now = int(now if now is not None else time.time())
+    route_stations = load_route_stations()
+    if routes is None:
+        routes = sorted(route_stations)
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '1.0'
+    feed.header.timestamp = now
+
+    entity_id = 0
+    for route_id in routes:
+        stations = route_stations[route_id]
+        for direction in ('S', 'N'):
+            line = stations if direction == 'S' else stations[::-1]
+            for i in range(trips_per_direction):
+                origin = rng.randrange(0, 144000)
+                trip_id = f"{origin:06d}_{route_id}..{direction}{rng.randrange(10):02d}R"
+                position = rng.randrange(len(line))
+                arrival_time = now + rng.randrange(0, 120)
+
+                entity_id += 1
+                entity = feed.entity.add()
+                entity.id = str(entity_id)
+                trip_update = entity.trip_update
+                trip_update.trip.trip_id = trip_id
+                trip_update.trip.route_id = route_id
+                trip_update.trip.start_date = time.strftime('%Y%m%d', time.localtime(now))
+                for station in line[position:]:
+                    stu = trip_update.stop_time_update.add()
+                    stu.stop_id = station + direction
+                    stu.arrival.time = arrival_time
+                    stu.departure.time = arrival_time + 30
+                    arrival_time += rng.randrange(60, 180)
+
+                if with_vehicles:
+                    entity_id += 1
+                    entity = feed.entity.add()
+                    entity.id = str(entity_id)
+                    vehicle = entity.vehicle
+                    vehicle.trip.trip_id = trip_id
+                    vehicle.trip.route_id = route_id
+                    vehicle.current_stop_sequence = position + 1
+                    vehicle.stop_id = line[position] + direction
+                    vehicle.timestamp = now - rng.randrange(0, 60)
+
+    for i in range(alerts):
+        entity = feed.entity.add()
+        entity.id = f"alert:{seed}:{i}"
+        alert = entity.alert
+        period = alert.active_period.add()
+        period.start = now - rng.randrange(0, 3600)
+        period.end = now + rng.randrange(600, 7200)
+        for route_id in rng.sample(routes, min(len(routes), rng.randrange(1, 3))):
+            alert.informed_entity.add().route_id = route_id
+        if rng.random() < 0.3:
+            route_id = rng.choice(routes)
+            alert.informed_entity.add().stop_id = rng.choice(route_stations[route_id]) + rng.choice('NS')
+        alert.effect = rng.choice([gtfs_realtime_pb2.Alert.SIGNIFICANT_DELAYS, gtfs_realtime_pb2.Alert.REDUCED_SERVICE,
+                                   gtfs_realtime_pb2.Alert.DETOUR])
+        text = alert.header_text.translation.add()
+        text.language = 'en'
+        text.text = f"Delays on {', '.join(e.route_id for e in alert.informed_entity if e.route_id)} " \
+                    f"while we address a signal problem (#{i})"
+    return feed
+
+
+def make_snapshots(count, interval=30, change_ratio=0.2, seed=0, **kwargs):
+    # -----------------------------------------------------------------------------------------------------------------
+    #   Function:   make_snapshots
+    #   Input:      count (int)           – number of snapshots
+    #               interval (int)        – seconds between snapshots
+    #               change_ratio (float)  – share of trips that pick up a new delay in each snapshot
+    #               seed (int)            – random seed
+    #               **kwargs              – passed on to make_feed for the first snapshot
+    #   Output:     list[gtfs_realtime_pb2.FeedMessage]
+    #   Description: Simulates consecutive refreshes of one feed: time moves forward, stops that were passed are
+    #                dropped, finished trips disappear, some trips are delayed and new trips enter service.
+    # -----------------------------------------------------------------------------------------------------------------
+    rng = random.Random(seed)
+    feed = make_feed(seed=seed, **kwargs)
+    routes = sorted({e.trip_update.trip.route_id for e in feed.entity if e.HasField('trip_update')})
+    snapshots = [feed]
+
+    for i in range(1, count):
+        previous = feed
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.CopyFrom(previous)
+        now = feed.header.timestamp + interval
+        feed.header.timestamp = now
+
+        for index in range(len(feed.entity) - 1, -1, -1):
+            entity = feed.entity[index]
+            if not entity.HasField('trip_update'):
+                continue
+            stus = entity.trip_update.stop_time_update
+            while len(stus) and stop_time(stus[0]) < now:
+                del stus[0]
+            if not len(stus):
+                del feed.entity[index]
+                continue
+            if rng.random() < change_ratio:
+                delay = rng.randrange(15, 90)
+                for stu in stus:
+                    stu.arrival.time += delay
+                    stu.departure.time += delay
+
+        # A few new trains enter service on random routes
+        for j in range(rng.randrange(0, 4)):
+            fresh = make_feed([rng.choice(routes)], trips_per_direction=1, now=now, seed=rng.random(),
+                              with_vehicles=False)
+            entity = feed.entity.add()
+            entity.CopyFrom(fresh.entity[0])
+            entity.id = f"{i}-{j}"
+            entity.trip_update.trip.trip_id += f"-{i}-{j}"
+        snapshots.append(feed)
+    return snapshots
+
+
+if __name__ == "__main__":
+    # Usage: python synthetic_feed.py <output.pb> [route_id ...]
+    routes = sys.argv[2:] or None
+    with open(sys.argv[1], 'wb') as f:
+        f.write(make_feed(routes).SerializeToString())